@@ -1,44 +1,90 @@
-from fastapi import APIRouter, HTTPException, Depends, Body, BackgroundTasks
-from typing import List, Dict, Optional
-from app.models.passenger import Passenger, PassengerCreate, PassengerUpdate
+from fastapi import APIRouter, HTTPException, Depends, Body, BackgroundTasks, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Optional, Set
+from app.models.passenger import (
+    Passenger,
+    PassengerCreate,
+    PassengerUpdate,
+    PassengerStatus,
+    STATUS_TRANSITIONS,
+    BatchBoardRequest,
+    BatchDepartRequest,
+    BatchArriveRequest,
+    BatchItemResult,
+    BatchResult,
+    MAX_BATCH_SIZE,
+)
 from app.core.database import (
     get_db,
-    get_all_passengers,
+    persistence,
+    restore_store,
+    list_passengers,
+    passenger_pages,
     get_passenger,
     create_passenger,
     update_passenger,
     delete_passenger,
     insert_passengers_to_db,
-    get_station_ids,
-    get_station_names  # Import the new function
+    get_waiting_passengers,
+    expire_passengers,
+    transition_passengers,
+    get_passenger_statuses,
+    get_cache_stats,
+    flush_writes,
 )
-from supabase import Client
-import random
-import uuid
-from faker import Faker
-from datetime import datetime, timezone, timedelta
+from app.simulation.patience import patience_scheduler
+from app.simulation.demand import DemandMatrix, DemandWeights
+from app.simulation.generator import PassengerGenerator, PassengerBatch, as_rows, batch_size
+from app.simulation.scheduler import ArrivalProfile, GenerationScheduler
+from app.simulation.engine import SimulationEngine, TickResult, TrainRoute, loop_routes
+from app.core.config import settings
+from app.core.stations import station_registry
+from app.core.aggregates import passenger_aggregates
+from app.core.stats import passenger_stats, GENERATED, ARRIVED, IMPATIENT
+from app.core.coordination import coordinator
+from app.core.serialization import RowsResponse, dumps_ndjson, model_response
+from app.core import changes, events
+from app.core.events import passenger_events, Subscriber
+from app.core.metrics import LoopTimer, queue_depth
+from app.core.storage import PassengerStore
+from datetime import datetime, timezone
 import logging
 import asyncio
+import time
 
-# Configure logging
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
-handler = logging.StreamHandler()
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-handler.setFormatter(formatter)
-logger.addHandler(handler)
 
 router = APIRouter()
 
-# --- Global Variables for Statistics ---
-total_passengers_generated = 0
-passengers_arrived = 0  # For successfully arrived passengers
-passengers_impatient = 0  # For passengers who left due to patience.
+passenger_generator = PassengerGenerator(seed=settings.generator_seed)
+if persistence is not None:
+    # Resume the random stream after a restart, so a seeded run continues instead of repeating itself.
+    persistence.register_state("generator", passenger_generator.get_state, passenger_generator.set_state)
+    # The counters' file may not survive a restart (it is usually under /tmp).
+    persistence.register_state("stats", passenger_stats.totals, passenger_stats.restore)
+demand_matrix = DemandMatrix(DemandWeights(
+    popularity=settings.station_popularity,
+    hourly=settings.station_hourly_popularity,
+    pairs=settings.demand_pairs,
+    positions=settings.station_positions,
+    distance_decay=settings.demand_distance_decay,
+))
+background_tasks: List[asyncio.Task] = []
+background_loops: Dict[str, asyncio.Task] = {}  # Loops started by the coordinator, by name
+simulation_engine: Optional[SimulationEngine] = None  # Set on the worker that runs the simulation
+
+patience_timer = LoopTimer("patience")
+queue_depth.labels("patience").set_function(patience_scheduler.__len__)
+
+# --- Statistics ---
+# Generated/arrived/impatient counters live in `passenger_stats`, shared by all worker processes.
 
 
 def calculate_satisfaction() -> float:
     """Calculates the overall passenger satisfaction percentage."""
-    global total_passengers_generated, passengers_arrived, passengers_impatient
+    totals = passenger_stats.totals()
+    total_passengers_generated = totals["generated"]
+    passengers_impatient = totals["impatient"]
     if total_passengers_generated == 0:
         return 100.0  # If no passengers, assume 100% satisfaction
 
@@ -56,141 +102,322 @@ def generate_passengers(
         destination_station_ids: List[str],
         generation_rate: int,
         num_passengers: int = None,
+        columnar: bool = False,
+        destinations: Optional[List[str]] = None,
+) -> PassengerBatch:
+    """Generates a batch of passengers (row dicts, or column lists if `columnar`).
 
-) -> List[Dict]:
-    """Generates passenger dictionaries."""
-    global total_passengers_generated
-    fake = Faker()
-    passengers = []
+    `destinations`, if given, holds each passenger's destination and replaces
+    the uniform choice from `destination_station_ids`.
+    """
 
     if num_passengers is None:
-        num_to_generate = int(generation_rate * random.uniform(0.5, 1.5))
+        num_to_generate = passenger_generator.batch_count(generation_rate)
     else:
         num_to_generate = num_passengers
 
-    for _ in range(num_to_generate):
-        total_passengers_generated += 1  # Increment here
-
-        passenger = {
-            "id": str(uuid.uuid4()),
-            "origin_station_id": station_id,
-            "destination_station_id": random.choice(destination_station_ids),
-            "first_name": fake.first_name(),
-            "last_name": fake.last_name(),
-            "age": random.randint(5, 90),
-            "ticket_type": random.choice(["adult", "child", "senior", "student", "concession"]),
-            "luggage_size": random.choice(["none", "small", "medium", "large"]),
-            "email": fake.email(),
-            "phone_number": fake.phone_number(),
-            "spawn_time": datetime.now(timezone.utc).isoformat(),
-            "status": "waiting",
-            "current_station_id": station_id,  # Set current station to origin
-            "train_id": None,
-            "patience": random.randint(30, 120),  # Example: Patience between 30-120 seconds
-            "board_time": None,
-            "arrival_time": None,
-        }
-        passengers.append(passenger)
-
-    return passengers
+    passenger_stats.add(GENERATED, num_to_generate)
+    batch = passenger_generator.generate(station_id, destination_station_ids, num_to_generate, columnar=columnar,
+                                         destinations=destinations)
+    if persistence is not None:
+        persistence.record_state("generator")
+        persistence.record_state("stats")
+    return batch
 
 
 async def generate_and_insert_passengers(
         station_id: str,
         destination_station_ids: List[str],
         generation_rate: int,
-        db: Client,
-        num_passengers: Optional[int] = None
+        db: PassengerStore,
+        num_passengers: Optional[int] = None,
+        passengers: Optional[PassengerBatch] = None,
 ):
-    """Generates passengers and inserts them into the database."""
-    passengers = generate_passengers(station_id, destination_station_ids, generation_rate, num_passengers)
-    if passengers:
-        result = await insert_passengers_to_db(passengers, db)
+    """Generates passengers and inserts them into the database.
+
+    A pre-generated batch (rows or columns) can be passed as `passengers`.
+    """
+    if passengers is None:
+        passengers = generate_passengers(station_id, destination_station_ids, generation_rate, num_passengers)
+    if batch_size(passengers):
+        result = await insert_passengers_to_db(as_rows(passengers), db)
+        for row in result:
+            track_patience(row)
+        changes.publish(events.CREATED, result)
+        if simulation_engine is not None:
+            simulation_engine.add_passengers(result)
         return result
     return None
 
 
-async def continuous_passenger_generation(db: Client):
-    """Continuously generates passengers in the background."""
-    while True:
-        try:
-            station_ids = await get_station_ids(db)
-            if not station_ids:
-                logger.warning("No stations found.  Skipping passenger generation.")
-                await asyncio.sleep(60)  # Wait longer if no stations
-                continue
+async def continuous_passenger_generation(db: PassengerStore):
+    """Continuously generates passengers in the background.
+
+    Arrivals are drawn per station from the configured Poisson rates and
+    inserted concurrently by a `GenerationScheduler`.
+    """
+    scheduler = GenerationScheduler(
+        generate=lambda station_id, destinations, n: generate_passengers(
+            station_id, [], 0, n, columnar=True, destinations=destinations
+        ),
+        insert=lambda station_id, batch: generate_and_insert_passengers(station_id, [], 0, db, passengers=batch),
+        profile=ArrivalProfile(
+            settings.default_arrival_rate,
+            settings.station_arrival_rates,
+            settings.arrival_profile,
+        ),
+        rng=passenger_generator.rng,
+        interval=settings.generation_interval,
+        max_inflight=settings.max_inflight_inserts,
+        max_pending=settings.max_pending_per_station,
+        station_filter=coordinator.owns_station,
+        timer=LoopTimer("generation"),
+        demand=demand_matrix,
+    )
+    queue_depth.labels("generation").set_function(lambda: scheduler.pending)
+
+    async def station_ids() -> List[str]:
+        return (await station_registry.get(db)).ids
+
+    await scheduler.run(station_ids)
+
+
+def track_patience(passenger: Dict) -> None:
+    """Hands a passenger to the patience scheduler if this worker expires its station."""
+    if coordinator.owns_station(passenger.get("current_station_id")):
+        patience_scheduler.track(passenger)
+    else:
+        patience_scheduler.discard(passenger["id"])
 
-            for station_id in station_ids:
-                generation_rate = 1
-                destination_station_ids = [sid for sid in station_ids if sid != station_id]
-                if not destination_station_ids:
-                    continue  # Skip if only one station
-                await generate_and_insert_passengers(station_id, destination_station_ids, generation_rate, db)
-                logger.info(f"Generated passengers at station {station_id}")
 
-            await asyncio.sleep(10)  # Generate passengers every 10 seconds (adjust as needed)
+PATIENCE_INTERVAL = 5  # Seconds between patience checks
+PATIENCE_SYNC_OVERLAP = 30  # Seconds re-read on each incremental sync to cover in-flight inserts
 
-        except Exception as e:
-            logger.exception("Error in continuous passenger generation:")
-            await asyncio.sleep(60)  # Wait longer on error
 
+async def sweep_patience(db: PassengerStore, since: Optional[str] = None, now: Optional[float] = None) -> int:
+    """One patience pass: picks up waiting passengers spawned since `since` (all of them if None),
+    then expires those whose deadline is before `now`. Returns the number expired."""
+    now = time.time() if now is None else now
+    rows = await get_waiting_passengers(db, since)
+    for row in rows:
+        track_patience(row)
+    patience_timer.rows("read", len(rows))
 
-async def check_passenger_patience(db: Client):
-    """Checks for impatient passengers and updates their status."""
-    global total_passengers_generated, passengers_arrived, passengers_impatient
+    expired_ids = patience_scheduler.pop_expired(now)
+    patience_timer.rows("expired", len(expired_ids))
+    if not expired_ids:
+        return 0
+    try:
+        expired = await expire_passengers(db, expired_ids)
+    except Exception:
+        # Put them back so the next tick retries the batch.
+        for passenger_id in expired_ids:
+            patience_scheduler.schedule_deadline(passenger_id, now)
+        raise
+    passenger_stats.add(IMPATIENT, len(expired))
+    changes.publish(events.EXPIRED, expired)
+    if simulation_engine is not None:
+        simulation_engine.remove_passengers(row["id"] for row in expired)
+    return len(expired)
+
+
+async def check_passenger_patience(db: PassengerStore):
+    """Expires waiting passengers whose patience has run out.
+
+    Deadlines live in `patience_scheduler`, which is seeded once from the
+    database and then kept up to date by the insert/update/delete paths, so a
+    tick only costs as much as the number of passengers that expire in it.
+    Passengers created through other workers are picked up by an incremental
+    read of the ones spawned since the previous tick. When this worker adopts
+    more station shards the next tick reads every waiting passenger again,
+    so the adopted stations' passengers are scheduled too.
+    """
+    watermark: Optional[float] = None
+    seeded_shards: Set[int] = set()
     while True:
+        started = patience_timer.start()
         try:
-            now = datetime.now(timezone.utc)
-            # Find passengers who are waiting and whose patience has run out
-            expired_passengers_data = (
-                db.table("passengers")
-                .select("id, spawn_time, patience")
-                .eq("status", "waiting")
-                .execute()
-            )
-            if expired_passengers_data.data:
-                for passenger in expired_passengers_data.data:
-                    spawn_time = datetime.fromisoformat(passenger['spawn_time'])
-                    # --- HANDLE NONE PATIENCE ---
-                    if passenger['patience'] is not None:  # Check for None!
-                        if (now - spawn_time) > timedelta(seconds=passenger['patience']):
-                            passengers_impatient += 1
-                            # Update the passenger's status to 'impatient' AND delete  <-- THIS IS THE KEY CHANGE
-                            try:  # Add a try...except here
-                                # First, attempt to update the status (optional, but good for record-keeping)
-                                update_data = (
-                                    db.table("passengers")
-                                    .update({"status": "impatient"})
-                                    .eq("id", passenger["id"])
-                                    .execute()
-                                )
-                                # Then, delete the passenger
-                                delete_data = (
-                                    db.table("passengers")
-                                    .delete()
-                                    .eq("id", passenger["id"])
-                                    .execute()
-                                )
-                                if not delete_data.data:
-                                     logger.warning(f"No passenger found with ID {passenger['id']} to delete.")
-
-                            except Exception as update_error: #Catching specific update error
-                                logger.exception(f"Error updating/deleting passenger status for ID {passenger['id']}:")
-
-            await asyncio.sleep(5)  # Check every 5 seconds
+            now = time.time()
+            if not coordinator.owned_shards <= seeded_shards:
+                watermark = None
+            since = None
+            if watermark is not None:
+                since = datetime.fromtimestamp(watermark - PATIENCE_SYNC_OVERLAP, timezone.utc).isoformat()
+            shards = set(coordinator.owned_shards)
+            await sweep_patience(db, since, now)
+            if watermark is None:
+                seeded_shards = shards
+                logger.info(f"Patience scheduler seeded with {len(patience_scheduler)} waiting passengers")
+            watermark = now
+
+            patience_timer.finish(started, PATIENCE_INTERVAL)
+            await asyncio.sleep(PATIENCE_INTERVAL)
 
         except Exception as e:
             logger.exception("Error in check_passenger_patience:")
+            patience_timer.error()
             await asyncio.sleep(60) #wait longer on error.
 
 
-# --- FastAPI Endpoints ---
-@router.on_event("startup")
+def build_simulation_engine(station_ids: List[str]) -> SimulationEngine:
+    """Creates the train simulation from the configured routes (or one loop over all stations).
+
+    Routes without stations are left out, so the engine may have no trains.
+    """
+    if settings.simulation_routes:
+        routes = []
+        for train_id, stations in settings.simulation_routes.items():
+            if not stations:
+                logger.warning(f"Route of train {train_id} has no stations; leaving it out of the simulation")
+                continue
+            routes.append(TrainRoute(train_id, stations, settings.train_capacity, settings.train_travel_ticks,
+                                     settings.train_dwell_ticks))
+    else:
+        routes = loop_routes(station_ids, settings.simulation_trains, settings.train_capacity,
+                             settings.train_travel_ticks, settings.train_dwell_ticks)
+    return SimulationEngine(routes, tick_seconds=settings.simulation_tick_seconds)
+
+
+SIMULATION_FIELDS = ["status", "origin_station_id", "current_station_id", "destination_station_id", "train_id",
+                     "spawn_time"]
+SIMULATION_SYNC_INTERVAL = 5.0  # Seconds between incremental reads of passengers created by other workers
+
+
+async def write_back_tick(db: PassengerStore, engine: SimulationEngine, result: TickResult) -> None:
+    """Persists one tick's boardings, departures and arrivals as batched transitions."""
+    now = datetime.now(timezone.utc).isoformat()
+    batches = [
+        (ids, PassengerStatus.waiting, {"train_id": train_id, "board_time": now})
+        for train_id, ids in result.boarded.items()
+    ]
+    if result.departed:
+        batches.append((result.departed, PassengerStatus.boarding, {}))
+    batches.extend(
+        (ids, PassengerStatus.in_transit, {"current_station_id": station_id, "arrival_time": now})
+        for station_id, ids in result.arrived.items()
+    )
+    for ids, from_status, data in batches:
+        for offset in range(0, len(ids), MAX_BATCH_SIZE):
+            outcome = await apply_transition(db, ids[offset:offset + MAX_BATCH_SIZE], from_status, data)
+            if outcome.failed:
+                # Changed or removed behind the engine's back: stop simulating them.
+                engine.remove_passengers(item.id for item in outcome.results if not item.ok)
+
+
+async def load_simulation(db: PassengerStore) -> Optional[SimulationEngine]:
+    """Builds the train simulation and loads the passengers it moves (None if there are no trains)."""
+    stations = await station_registry.get(db)
+    engine = build_simulation_engine(stations.ids)
+    if not engine.train_ids:
+        return None
+    for status in (PassengerStatus.waiting, PassengerStatus.boarding, PassengerStatus.in_transit):
+        async for rows in passenger_pages(db, 5000, status=status.value, fields=SIMULATION_FIELDS):
+            engine.add_passengers(rows)
+    return engine
+
+
+async def run_simulation(db: PassengerStore):
+    """Advances the train simulation every tick and writes its state changes back in batches."""
+    global simulation_engine
+    while True:
+        try:
+            engine = await load_simulation(db)
+            if engine is not None:
+                break
+            logger.warning("No stations or routes to simulate.  Retrying in 60 seconds.")
+        except Exception:
+            logger.exception("Error starting the train simulation:")
+        await asyncio.sleep(60)
+    simulation_engine = engine
+    logger.info(f"Simulation started with {len(engine.train_ids)} trains and {engine.active} passengers")
+
+    timer = LoopTimer("simulation")
+    last_sync = time.time()
+    while True:
+        started = timer.start()
+        try:
+            if time.time() - last_sync >= SIMULATION_SYNC_INTERVAL:
+                since = datetime.fromtimestamp(last_sync - PATIENCE_SYNC_OVERLAP, timezone.utc).isoformat()
+                last_sync = time.time()
+                engine.add_passengers(await get_waiting_passengers(db, since))
+            result = engine.step()
+            if result:
+                await write_back_tick(db, engine, result)
+            timer.rows("boarded", sum(len(ids) for ids in result.boarded.values()))
+            timer.rows("departed", len(result.departed))
+            timer.rows("arrived", sum(len(ids) for ids in result.arrived.values()))
+        except Exception:
+            logger.exception("Error in train simulation tick:")
+            timer.error()
+        delay = max(0.0, engine.tick_seconds - (time.monotonic() - started))
+        timer.finish(started, delay)
+        await asyncio.sleep(delay)
+
+
+AGGREGATE_FIELDS = ["status", "current_station_id", "train_id", "origin_station_id", "spawn_time"]
+
+
+async def seed_aggregates(db: PassengerStore, page_size: int = 5000):
+    """Loads the passengers already in storage into the aggregates, once, page by page."""
+    try:
+        async for rows in passenger_pages(db, page_size, fields=AGGREGATE_FIELDS):
+            for row in rows:
+                if row["id"] not in passenger_aggregates:
+                    passenger_aggregates.observe(row, new=True)
+        logger.info(f"Aggregates seeded with {len(passenger_aggregates)} passengers")
+    except Exception:
+        logger.exception("Error seeding passenger aggregates:")
+
+
+def resync_aggregates(db: PassengerStore) -> None:
+    """Rebuilds the aggregates from storage after missing other workers' changes."""
+    passenger_aggregates.clear()
+    background_tasks.append(asyncio.create_task(seed_aggregates(db)))
+
+
+def start_loop(name: str, coro) -> None:
+    """Starts a background loop unless it is already running."""
+    if name in background_loops:
+        coro.close()
+        return
+    background_loops[name] = asyncio.create_task(coro)
+
+
+def start_background_loops(db: PassengerStore) -> None:
+    """Starts the loops this worker should run; called again when it adopts more station shards."""
+    # Only the worker(s) chosen by the coordinator generate and expire passengers.
+    start_loop("generation", continuous_passenger_generation(db))
+    start_loop("patience", check_passenger_patience(db))
+    # Trains cross shards and the journal is shared, so in sharded mode only the holder of shard 0
+    # simulates the trains and takes the snapshots.
+    if coordinator.mode != "sharded" or 0 in coordinator.owned_shards:
+        if settings.simulation_enabled:
+            start_loop("simulation", run_simulation(db))
+        if persistence is not None:
+            start_loop("snapshots", persistence.run())
+
+
 async def startup_event():
-    """Starts the background tasks on application startup."""
-    db: Client = get_db()  # Get the database client
-    asyncio.create_task(continuous_passenger_generation(db))
-    asyncio.create_task(check_passenger_patience(db))
+    """Starts the background tasks on application startup (from the app's lifespan; runs once)."""
+    if background_tasks:
+        return
+    db: PassengerStore = get_db()  # Get the database client
+    await restore_store()  # Before anything reads the store
+    background_tasks.append(asyncio.create_task(seed_aggregates(db)))
+    background_tasks.append(asyncio.create_task(changes.run(lambda: resync_aggregates(db))))
+    background_tasks.append(asyncio.create_task(coordinator.run(lambda: start_background_loops(db))))
+
+
+async def shutdown_event():
+    """Stops the background loops and hands their locks to another worker."""
+    for task in [*background_tasks, *background_loops.values()]:
+        task.cancel()
+    background_tasks.clear()
+    background_loops.clear()
+    coordinator.release()
+
+
+# --- FastAPI Endpoints ---
 
 
 @router.post("/generate/{station_id}", response_model=List[Passenger])
@@ -199,23 +426,23 @@ async def generate_passengers_endpoint(
         generation_rate: int = Body(...),
         destination_station_ids: List[str] = Body(...),
         num_passengers: Optional[int] = Body(None),
-        db: Client = Depends(get_db)
+        db: PassengerStore = Depends(get_db)
 ):
     """Generates and inserts passengers."""
     try:
         # --- VALIDATION ---
-        valid_station_ids = await get_station_ids(db)
-        if station_id not in valid_station_ids:
+        stations = await station_registry.get(db)
+        if station_id not in stations:
             raise HTTPException(status_code=400, detail="Invalid origin station ID")
         for dest_id in destination_station_ids:
-            if dest_id not in valid_station_ids:
+            if dest_id not in stations:
                 raise HTTPException(status_code=400, detail=f"Invalid destination station ID: {dest_id}")
         # --- END VALIDATION ---
 
         result = await generate_and_insert_passengers(station_id, destination_station_ids, generation_rate, db,
                                                       num_passengers)
         if result:
-            return [Passenger(**p) for p in result.data]
+            return RowsResponse(result)
         else:
             raise HTTPException(status_code=500, detail="Failed to insert passengers")
     except HTTPException as http_exc:
@@ -226,12 +453,61 @@ async def generate_passengers_endpoint(
         raise HTTPException(status_code=500, detail="An unexpected error occurred")
 
 
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 10000
+PASSENGER_FIELDS = set(Passenger.model_fields)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Parses a comma-separated `fields=` projection, rejecting unknown columns."""
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in PASSENGER_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+
+async def stream_passengers(db: PassengerStore, page_size: int, **filters):
+    """Yields every matching passenger as NDJSON, fetching one page at a time."""
+    async for rows in passenger_pages(db, page_size, **filters):
+        yield dumps_ndjson(rows)
+
+
 @router.get("/", response_model=List[Passenger])
-async def read_passengers(db: Client = Depends(get_db)):
-    """Retrieves all passengers."""
+async def read_passengers(
+        status: Optional[PassengerStatus] = None,
+        station_id: Optional[str] = Query(None, description="Current station of the passenger"),
+        train_id: Optional[str] = None,
+        after: Optional[str] = Query(None, description="Cursor: only passengers with an ID after this one"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        fields: Optional[str] = Query(None, description="Comma-separated columns to return (id is always included)"),
+        stream: bool = Query(False, description="Stream every matching passenger as NDJSON, `limit` rows per fetch"),
+        db: PassengerStore = Depends(get_db),
+):
+    """Retrieves passengers, one page at a time ordered by ID.
+
+    The cursor for the next page is returned in the `X-Next-Cursor` header
+    whenever the page has rows. A page can hold fewer than `limit` rows
+    before the end (Supabase caps responses at 1000), so only a page without
+    rows, and without the header, is the last one.
+    """
     try:
-        passengers = await get_all_passengers(db)
-        return passengers
+        filters = {
+            "status": status.value if status else None,
+            "station_id": station_id,
+            "train_id": train_id,
+            "fields": parse_fields(fields),
+        }
+        if stream:
+            return StreamingResponse(stream_passengers(db, limit, **filters), media_type="application/x-ndjson")
+
+        rows = await list_passengers(db, after=after, limit=limit, **filters)
+        headers = {"X-Next-Cursor": rows[-1]["id"]} if rows else None
+        return RowsResponse(rows, headers=headers)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception("An unexpected error occurred while getting passenger:")
         raise HTTPException(status_code=500, detail=str(e))
@@ -241,49 +517,261 @@ async def get_satisfaction():
     """Returns the current overall passenger satisfaction percentage."""
     return {"satisfaction": calculate_satisfaction()}
 
+@router.get("/stats")
+async def get_stats():
+    """Returns passenger totals across all workers and rates over the last minute and 5 minutes."""
+    last_5m = passenger_stats.window_totals(300)
+    return {
+        "totals": passenger_stats.totals(),
+        "per_minute_1m": passenger_stats.rate_per_minute(60),
+        "per_minute_5m": {name: n / 5 for name, n in last_5m.items()},
+        # Share of passengers generated in the last 5 minutes that gave up
+        "impatience_rate_5m": last_5m["impatient"] / last_5m["generated"] if last_5m["generated"] else 0.0,
+    }
+
+@router.get("/cache/stats")
+async def get_passenger_cache_stats():
+    """Returns the single-passenger cache's size, hit/miss/eviction counters and hit rate."""
+    stats = get_cache_stats()
+    if stats is None:
+        return {"enabled": False}
+    return {"enabled": True, **stats}
+
+@router.post("/writes/flush", status_code=204)
+async def flush_passenger_writes(db: PassengerStore = Depends(get_db)):
+    """Writes out buffered passenger writes now (e.g. before reading the database directly)."""
+    await flush_writes(db)
+
+@router.get("/aggregates")
+async def get_aggregates():
+    """Returns per-station counts by status, satisfaction and wait times, and per-train loads."""
+    return RowsResponse(passenger_aggregates.snapshot())
+
+@router.get("/aggregates/stations/{station_id}")
+async def get_station_aggregates(station_id: str):
+    """Returns the aggregates of one station."""
+    stats = passenger_aggregates.station(station_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="No passengers seen at this station")
+    return RowsResponse(stats)
+
+@router.get("/aggregates/trains/{train_id}")
+async def get_train_aggregates(train_id: str):
+    """Returns the number of passengers boarding or riding a train."""
+    return {"train_id": train_id, "load": passenger_aggregates.train_load(train_id)}
+
+@router.get("/simulation")
+async def get_simulation():
+    """Returns train positions and loads if this worker runs the simulation."""
+    if simulation_engine is None:
+        return {"running": False}
+    return RowsResponse({"running": True, **simulation_engine.snapshot()})
+
+async def feed_snapshot(db: PassengerStore, subscriber: Subscriber) -> Dict:
+    """Current state for a feed subscriber: the passengers at its stations and on its trains,
+    or the aggregates if it follows everything."""
+    if subscriber.everything:
+        return {"aggregates": passenger_aggregates.snapshot()}
+    limit = settings.feed_snapshot_limit
+    fields = list(events.EVENT_FIELDS)
+    return {
+        "stations": {
+            station_id: await list_passengers(db, station_id=station_id, limit=limit, fields=fields)
+            for station_id in subscriber.stations
+        },
+        "trains": {
+            train_id: await list_passengers(db, train_id=train_id, limit=limit, fields=fields)
+            for train_id in subscriber.trains
+        },
+    }
+
+@router.get("/feed")
+async def passenger_feed(
+        station_id: List[str] = Query([], description="Stations to follow (repeatable)"),
+        train_id: List[str] = Query([], description="Trains to follow (repeatable)"),
+        db: PassengerStore = Depends(get_db),
+):
+    """Streams passenger state changes as Server-Sent Events.
+
+    The stream starts with a `snapshot` event, followed by `passengers` events,
+    each holding the changes of one short window. A client that falls too far
+    behind gets a fresh `snapshot` instead of the backlog. Without filters
+    every change is sent.
+    """
+    stations = await station_registry.get(db)
+    unknown = [sid for sid in station_id if sid not in stations]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Invalid station ID: {unknown[0]}")
+    frames = passenger_events.stream(
+        lambda subscriber: feed_snapshot(db, subscriber),
+        stations=station_id,
+        trains=train_id,
+        keepalive=settings.feed_keepalive,
+    )
+    return StreamingResponse(frames, media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @router.get("/{passenger_id}", response_model=Passenger)
-async def read_passenger(passenger_id: str, db: Client = Depends(get_db)):
+async def read_passenger(passenger_id: str, db: PassengerStore = Depends(get_db)):
     """Retrieves a single passenger by ID."""
     try:
         passenger = await get_passenger(db, passenger_id)
         if not passenger:
             raise HTTPException(status_code=404, detail="Passenger not found")
-        return passenger
+        return model_response(passenger)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception("An unexpected error occurred while getting passenger by id:")
-
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/", response_model=Passenger, status_code=201)
-async def create_passenger_endpoint(passenger: PassengerCreate, db: Client = Depends(get_db)):
+async def create_passenger_endpoint(passenger: PassengerCreate, db: PassengerStore = Depends(get_db)):
     """Creates a new passenger."""
     try:
         new_passenger = await create_passenger(db, passenger)
-        return new_passenger
+        row = new_passenger.model_dump()
+        track_patience(row)
+        changes.publish(events.CREATED, [row])
+        if simulation_engine is not None:
+            simulation_engine.add_passengers([row])
+        return model_response(new_passenger, status_code=201)
     except Exception as e:
         logger.exception("An unexpected error occurred while creating passenger:")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Shared counters bumped when a passenger reaches one of these statuses.
+STATUS_COUNTERS = {PassengerStatus.arrived: ARRIVED, PassengerStatus.impatient: IMPATIENT}
+
+
 @router.put("/{passenger_id}", response_model=Passenger)
-async def update_passenger_endpoint(passenger_id: str, passenger: PassengerUpdate, db: Client = Depends(get_db)):
+async def update_passenger_endpoint(passenger_id: str, passenger: PassengerUpdate, db: PassengerStore = Depends(get_db)):
     """Updates an existing passenger."""
     try:
+        counter = STATUS_COUNTERS.get(passenger.status)
+        previous_status = None
+        if counter is not None:
+            # Only count a change of status, not a repeated update to the same one.
+            previous_status = (await get_passenger_statuses(db, [passenger_id])).get(passenger_id)
         updated_passenger = await update_passenger(db, passenger_id, passenger)
         if not updated_passenger:
             raise HTTPException(status_code=404, detail="Passenger not found")
-        return updated_passenger
+        if counter is not None and previous_status != passenger.status.value:
+            passenger_stats.add(counter)
+        row = updated_passenger.model_dump()
+        track_patience(row)
+        changes.publish(events.UPDATED, [row])
+        if simulation_engine is not None:
+            # Re-read the passenger's state into the engine.
+            simulation_engine.remove_passengers([passenger_id])
+            simulation_engine.add_passengers([row])
+        return model_response(updated_passenger)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception("An unexpected error occurred while updating passenger:")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+TRANSITION_EVENTS = {
+    PassengerStatus.boarding: events.BOARDED,
+    PassengerStatus.in_transit: events.DEPARTED,
+    PassengerStatus.arrived: events.ARRIVED,
+}
+
+
+async def apply_transition(
+        db: PassengerStore,
+        passenger_ids: List[str],
+        from_status: PassengerStatus,
+        data: Dict,
+) -> BatchResult:
+    """Moves passengers one step along their lifecycle in a single storage operation.
+
+    Passengers that are missing or not in `from_status` are reported as
+    failed items instead of failing the whole batch.
+    """
+    to_status = STATUS_TRANSITIONS[from_status]
+    passenger_ids = list(dict.fromkeys(passenger_ids))  # Drop duplicates, keep order
+    updated = await transition_passengers(db, passenger_ids, from_status.value, {**data, "status": to_status.value})
+    updated_ids = {row["id"] for row in updated}
+    changes.publish(TRANSITION_EVENTS[to_status], updated)
+
+    for passenger_id in updated_ids:
+        patience_scheduler.discard(passenger_id)  # No longer waiting
+    if to_status == PassengerStatus.arrived:
+        passenger_stats.add(ARRIVED, len(updated_ids))
+
+    failed_ids = [pid for pid in passenger_ids if pid not in updated_ids]
+    statuses = await get_passenger_statuses(db, failed_ids) if failed_ids else {}
+    results = []
+    for passenger_id in passenger_ids:
+        if passenger_id in updated_ids:
+            results.append(BatchItemResult(id=passenger_id, ok=True, status=to_status))
+        elif passenger_id not in statuses:
+            results.append(BatchItemResult(id=passenger_id, ok=False, error="Passenger not found"))
+        else:
+            current = statuses[passenger_id]
+            results.append(BatchItemResult(
+                id=passenger_id,
+                ok=False,
+                status=current,
+                error=f"Invalid transition: {current} -> {to_status.value}",
+            ))
+    return BatchResult(updated=len(updated_ids), failed=len(passenger_ids) - len(updated_ids), results=results)
+
+
+@router.post("/batch/board", response_model=BatchResult)
+async def batch_board_endpoint(request: BatchBoardRequest, db: PassengerStore = Depends(get_db)):
+    """Boards waiting passengers onto a train."""
+    try:
+        data = {"train_id": request.train_id, "board_time": datetime.now(timezone.utc).isoformat()}
+        result = await apply_transition(db, request.passenger_ids, PassengerStatus.waiting, data)
+        return model_response(result)
+    except Exception as e:
+        logger.exception("An unexpected error occurred while boarding passengers:")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/batch/depart", response_model=BatchResult)
+async def batch_depart_endpoint(request: BatchDepartRequest, db: PassengerStore = Depends(get_db)):
+    """Marks boarded passengers as in transit."""
+    try:
+        result = await apply_transition(db, request.passenger_ids, PassengerStatus.boarding, {})
+        return model_response(result)
+    except Exception as e:
+        logger.exception("An unexpected error occurred while departing passengers:")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/batch/arrive", response_model=BatchResult)
+async def batch_arrive_endpoint(request: BatchArriveRequest, db: PassengerStore = Depends(get_db)):
+    """Marks passengers in transit as arrived at a station."""
+    try:
+        stations = await station_registry.get(db)
+        if request.station_id not in stations:
+            raise HTTPException(status_code=400, detail="Invalid station ID")
+        data = {"current_station_id": request.station_id, "arrival_time": datetime.now(timezone.utc).isoformat()}
+        result = await apply_transition(db, request.passenger_ids, PassengerStatus.in_transit, data)
+        return model_response(result)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("An unexpected error occurred while marking passengers arrived:")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.delete("/{passenger_id}", status_code=204)
-async def delete_passenger_endpoint(passenger_id: str, db: Client = Depends(get_db)):
+async def delete_passenger_endpoint(passenger_id: str, db: PassengerStore = Depends(get_db)):
     """Deletes a passenger."""
     try:
-        await delete_passenger(db, passenger_id)
+        row = await delete_passenger(db, passenger_id)
+        if row:
+            changes.publish(events.DELETED, [row])
+        patience_scheduler.discard(passenger_id)
+        if simulation_engine is not None:
+            simulation_engine.remove_passengers([passenger_id])
         return  # 204 No Content
     except Exception as e:
         logger.exception("An unexpected error occurred while deleting passenger:")
@@ -291,10 +779,21 @@ async def delete_passenger_endpoint(passenger_id: str, db: Client = Depends(get_
 
 
 @router.get("/stations/ids", response_model=List[str])
-async def get_all_station_ids(db: Client = Depends(get_db)):
+async def get_all_station_ids(db: PassengerStore = Depends(get_db)):
     """Retrieves all station IDs (utility endpoint)."""
     try:
-        return await get_station_ids(db)
+        return (await station_registry.get(db)).ids
     except Exception as e:
         logger.exception("An unexpected error occurred while getting station ids")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/stations/refresh", response_model=List[str])
+async def refresh_station_cache(db: PassengerStore = Depends(get_db)):
+    """Invalidates the cached station list and reloads it (call after editing stations)."""
+    try:
+        station_registry.invalidate()
+        return (await station_registry.get(db)).ids
+    except Exception as e:
+        logger.exception("An unexpected error occurred while refreshing stations")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,150 @@
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.simulation.patience import to_epoch
+
+# Statuses that count towards a train's load.
+ON_TRAIN_STATUSES = ("boarding", "in_transit")
+
+
+@dataclass
+class StationStats:
+    """Running totals for one station."""
+    counts: Counter = field(default_factory=Counter)  # Current passengers at the station by status
+    generated: int = 0  # Passengers that originated here
+    arrived: int = 0  # ... and reached their destination
+    impatient: int = 0  # ... and gave up waiting
+    wait_seconds: float = 0.0  # Total time spent waiting by passengers that boarded
+    boarded: int = 0
+
+    def satisfaction(self) -> float:
+        if self.generated == 0:
+            return 100.0
+        return (self.generated - self.impatient) / self.generated * 100
+
+    def average_wait(self) -> Optional[float]:
+        return self.wait_seconds / self.boarded if self.boarded else None
+
+    def as_dict(self) -> Dict:
+        return {
+            "counts": {status: n for status, n in self.counts.items() if n},
+            "generated": self.generated,
+            "arrived": self.arrived,
+            "impatient": self.impatient,
+            "satisfaction": self.satisfaction(),
+            "average_wait_seconds": self.average_wait(),
+        }
+
+
+# Per-passenger state the deltas are computed from:
+# (status, current_station_id, train_id, origin_station_id, spawn epoch)
+PassengerKey = Tuple[str, Optional[str], Optional[str], Optional[str], float]
+
+
+class PassengerAggregates:
+    """Station x status counts, train loads and per-station satisfaction.
+
+    Maintained incrementally: every write path reports the rows it changed and
+    the aggregates apply the difference from the passenger's previous state,
+    which is kept in a small per-passenger tuple. Reads never scan passengers.
+    Every worker applies the changes of all workers (see `app.core.changes`),
+    so any worker can serve them.
+    """
+
+    def __init__(self):
+        self._passengers: Dict[str, PassengerKey] = {}
+        self._stations: Dict[str, StationStats] = defaultdict(StationStats)
+        self._train_load: Counter = Counter()
+
+    def __len__(self) -> int:
+        return len(self._passengers)
+
+    def __contains__(self, passenger_id: str) -> bool:
+        return passenger_id in self._passengers
+
+    def clear(self) -> None:
+        self._passengers.clear()
+        self._stations.clear()
+        self._train_load.clear()
+
+    def _add(self, key: PassengerKey) -> None:
+        status, station_id, train_id, _, _ = key
+        self._stations[station_id].counts[status] += 1
+        if train_id is not None and status in ON_TRAIN_STATUSES:
+            self._train_load[train_id] += 1
+
+    def _subtract(self, key: PassengerKey) -> None:
+        status, station_id, train_id, _, _ = key
+        self._stations[station_id].counts[status] -= 1
+        if train_id is not None and status in ON_TRAIN_STATUSES:
+            self._train_load[train_id] -= 1
+            if self._train_load[train_id] <= 0:
+                del self._train_load[train_id]
+
+    def observe(self, row: Dict, new: bool = False) -> None:
+        """Applies a created or updated passenger row.
+
+        `new` marks freshly generated/created passengers, which count towards
+        their origin station's `generated` total.
+        """
+        passenger_id = row["id"]
+        previous = self._passengers.get(passenger_id)
+        status = row.get("status", previous[0] if previous else "waiting")
+        if hasattr(status, "value"):
+            status = status.value
+        spawn = row.get("spawn_time")
+        key = (
+            status,
+            row.get("current_station_id", previous[1] if previous else None),
+            row.get("train_id", previous[2] if previous else None),
+            row.get("origin_station_id", previous[3] if previous else None),
+            to_epoch(spawn) if spawn is not None else (previous[4] if previous else 0.0),
+        )
+        if previous is not None:
+            self._subtract(previous)
+        elif new:
+            self._stations[key[3]].generated += 1
+        self._passengers[passenger_id] = key
+        self._add(key)
+
+        previous_status = previous[0] if previous else None
+        if previous_status == status:
+            return
+        origin = self._stations[key[3]]
+        if status == "boarding" and previous_status in (None, "waiting"):
+            board_time = row.get("board_time")
+            if board_time is not None:
+                origin.wait_seconds += max(0.0, to_epoch(board_time) - key[4])
+                origin.boarded += 1
+        elif status == "arrived":
+            origin.arrived += 1
+
+    def observe_many(self, rows: Iterable[Dict], new: bool = False) -> None:
+        for row in rows:
+            self.observe(row, new=new)
+
+    def remove(self, passenger_id: str, impatient: bool = False) -> None:
+        """Drops a deleted passenger; `impatient` records that it left because of patience."""
+        key = self._passengers.pop(passenger_id, None)
+        if key is None:
+            return
+        self._subtract(key)
+        if impatient:
+            self._stations[key[3]].impatient += 1
+
+    def station(self, station_id: str) -> Optional[Dict]:
+        stats = self._stations.get(station_id)
+        return stats.as_dict() if stats is not None else None
+
+    def train_load(self, train_id: str) -> int:
+        return self._train_load.get(train_id, 0)
+
+    def snapshot(self) -> Dict:
+        return {
+            "stations": {sid: stats.as_dict() for sid, stats in self._stations.items() if sid is not None},
+            "trains": dict(self._train_load),
+        }
+
+
+passenger_aggregates = PassengerAggregates()
@@ -0,0 +1,174 @@
+import contextlib
+import fcntl
+import logging
+import mmap
+import os
+import struct
+from typing import List, Tuple
+
+from app.core.config import settings
+from app.core.coordination import process_alive
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"TRAINBUS"
+_HEADER = struct.Struct("<8sIIQ")  # magic, version, slots, capacity
+_VERSION = 1
+_HEADER_SIZE = 32
+_SLOT_HEADER = 16  # pid, bytes written (uint64 each)
+_LENGTH = struct.Struct("<I")  # Each message is prefixed by its length
+
+
+class WorkerBroadcast:
+    """Messages from every worker process to all the others, through a memory-mapped file.
+
+    Like `SharedStats`, a process claims a slot once (under a file lock) and
+    from then on is its only writer. A slot is a ring buffer of length-
+    prefixed messages plus the total number of bytes ever written to it.
+    Readers remember how far they got in every other slot and copy out what
+    was written since, so `send` never waits for anyone. A reader that falls
+    more than a ring behind has lost messages; `receive` says so, and the
+    caller resyncs from storage.
+
+    Slot layout: pid, bytes written (uint64 words), then `capacity` bytes of ring.
+    """
+
+    def __init__(self, path: str, slots: int = 64, capacity: int = 1 << 20):
+        self.path = path
+        self.slots = slots
+        self.capacity = -(-capacity // 8) * 8  # Keeps every slot's header words aligned
+        self._slot_size = _SLOT_HEADER + self.capacity
+        self._size = _HEADER_SIZE + slots * self._slot_size
+        self._mmap = self._open()
+        self._words = memoryview(self._mmap).cast("Q")
+        self.peers = 0  # Other live processes, as of the last `receive`
+        self.lost = 0  # Times this process fell behind a peer
+        self._attach()
+        # A forked child (e.g. a pre-loading process manager) must not share its parent's slot.
+        os.register_at_fork(after_in_child=self._attach)
+
+    def _word(self, slot: int, index: int) -> int:
+        return self._words[(_HEADER_SIZE + slot * self._slot_size) // 8 + index]
+
+    def _set_word(self, slot: int, index: int, value: int) -> None:
+        self._words[(_HEADER_SIZE + slot * self._slot_size) // 8 + index] = value
+
+    def _attach(self) -> None:
+        self.slot = self._claim_slot()
+        # Start from what is there now: history before this process started is not replayed.
+        self._cursors = [self._word(slot, 1) for slot in range(self.slots)]
+        self.peers = self._count_peers()
+
+    def _header(self) -> bytes:
+        return _HEADER.pack(_MAGIC, _VERSION, self.slots, self.capacity).ljust(_HEADER_SIZE, b"\0")
+
+    def _open(self) -> mmap.mmap:
+        try:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError:
+            logger.exception(f"Cannot open broadcast file {self.path}; changes will not reach other workers")
+            self._file_backed = False
+            buffer = mmap.mmap(-1, self._size)
+            buffer[:_HEADER_SIZE] = self._header()
+            return buffer
+        self._file_backed = True
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                header = os.pread(fd, _HEADER_SIZE, 0)
+                if header != self._header() or os.fstat(fd).st_size != self._size:
+                    # New file or a different layout: start empty (the file is sparse until written).
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, self._size)
+                    os.pwrite(fd, self._header(), 0)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            return mmap.mmap(fd, self._size)
+        finally:
+            os.close(fd)
+
+    def _claim_slot(self) -> int:
+        """Claims the first slot that is free or whose process has exited.
+
+        A reclaimed slot keeps its byte count, so other readers' positions in it stay valid.
+        """
+        pid = os.getpid()
+        with open(self.path, "rb") if self._file_backed else contextlib.nullcontext() as lock_file:
+            if lock_file is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            for slot in range(self.slots):
+                owner = self._word(slot, 0)
+                if owner == pid or owner == 0 or not process_alive(owner):
+                    self._set_word(slot, 0, pid)
+                    return slot
+        raise RuntimeError(f"All {self.slots} broadcast slots are in use; raise TRAINSIM_STATS_SLOTS")
+
+    def _count_peers(self) -> int:
+        peers = 0
+        for slot in range(self.slots):
+            owner = self._word(slot, 0)
+            if slot != self.slot and owner != 0 and process_alive(owner):
+                peers += 1
+        return peers
+
+    def _ring(self, slot: int) -> int:
+        return _HEADER_SIZE + slot * self._slot_size + _SLOT_HEADER
+
+    def send(self, payload: bytes) -> None:
+        """Appends one message to this process's ring (lock-free: only this process writes its slot)."""
+        data = _LENGTH.pack(len(payload)) + payload
+        if len(data) > self.capacity:
+            raise ValueError(f"Message of {len(data)} bytes does not fit in the {self.capacity}-byte ring")
+        written = self._word(self.slot, 1)
+        ring = self._ring(self.slot)
+        offset = written % self.capacity
+        first = min(len(data), self.capacity - offset)
+        self._mmap[ring + offset:ring + offset + first] = data[:first]
+        if first < len(data):
+            self._mmap[ring:ring + len(data) - first] = data[first:]
+        self._set_word(self.slot, 1, written + len(data))  # Published only once the bytes are in place
+
+    def _copy(self, slot: int, start: int, end: int) -> bytes:
+        ring = self._ring(slot)
+        offset = start % self.capacity
+        length = end - start
+        first = min(length, self.capacity - offset)
+        data = self._mmap[ring + offset:ring + offset + first]
+        if first < length:
+            data += self._mmap[ring:ring + length - first]
+        return data
+
+    def receive(self) -> Tuple[List[bytes], bool]:
+        """Returns the messages other processes sent since the last call, and whether any were lost."""
+        messages: List[bytes] = []
+        lost = False
+        for slot in range(self.slots):
+            if slot == self.slot:
+                continue
+            cursor, written = self._cursors[slot], self._word(slot, 1)
+            if written == cursor:
+                continue
+            if written < cursor or written - cursor > self.capacity:
+                lost = lost or written > cursor  # A shrunk count means a new file: nothing to miss
+                self._cursors[slot] = written
+                continue
+            data = self._copy(slot, cursor, written)
+            if self._word(slot, 1) - cursor > self.capacity:
+                lost = True  # Overwritten while it was being copied
+                self._cursors[slot] = self._word(slot, 1)
+                continue
+            offset = 0
+            while offset < len(data):
+                (length,) = _LENGTH.unpack_from(data, offset)
+                messages.append(data[offset + _LENGTH.size:offset + _LENGTH.size + length])
+                offset += _LENGTH.size + length
+            self._cursors[slot] = written
+        if lost:
+            self.lost += 1
+        self.peers = self._count_peers()
+        return messages, lost
+
+
+worker_broadcast = WorkerBroadcast(
+    settings.broadcast_path, slots=settings.stats_slots, capacity=settings.broadcast_buffer_bytes
+)
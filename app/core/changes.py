@@ -0,0 +1,78 @@
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional
+
+import orjson
+
+from app.core.aggregates import passenger_aggregates
+from app.core.broadcast import worker_broadcast
+from app.core.config import settings
+from app.core.events import CREATED, EVENT_FIELDS, EXPIRED, REMOVALS, passenger_events
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_ROWS = 1000  # Rows per broadcast message
+CHANGE_FIELDS = (*EVENT_FIELDS, "spawn_time", "board_time")  # What the feed and the aggregates read
+
+
+def _compact(row: Dict) -> Dict:
+    compact = {"id": row["id"]}
+    for name in CHANGE_FIELDS:
+        if name in row:
+            compact[name] = row[name]
+    return compact
+
+
+def apply(event_type: str, rows: List[Dict], remote: bool = False) -> None:
+    """Applies passenger changes to this worker's aggregates and live feed."""
+    if event_type == CREATED:
+        for row in rows:
+            # A remote creation can arrive after a later change made elsewhere; keep the later state.
+            if not (remote and row["id"] in passenger_aggregates):
+                passenger_aggregates.observe(row, new=True)
+    elif event_type in REMOVALS:
+        for row in rows:
+            passenger_aggregates.remove(row["id"], impatient=event_type == EXPIRED)
+    else:
+        passenger_aggregates.observe_many(rows)
+    passenger_events.publish_many(event_type, rows)
+
+
+def publish(event_type: str, rows: List[Dict]) -> None:
+    """Applies passenger changes made by this worker and broadcasts them to the other workers.
+
+    Every worker applies every change, so the aggregates and feeds of all
+    workers agree. Changes are only encoded when another worker is running,
+    so a single worker pays nothing for the broadcast.
+    """
+    apply(event_type, rows)
+    if not worker_broadcast.peers:
+        return
+    for offset in range(0, len(rows), MESSAGE_ROWS):
+        message = {"type": event_type, "rows": [_compact(row) for row in rows[offset:offset + MESSAGE_ROWS]]}
+        try:
+            worker_broadcast.send(orjson.dumps(message))
+        except ValueError:
+            logger.exception("Passenger changes too large to broadcast; raise TRAINSIM_BROADCAST_BUFFER_BYTES:")
+
+
+async def run(resync: Optional[Callable[[], None]] = None) -> None:
+    """Applies the other workers' changes every `broadcast_interval` seconds.
+
+    If this worker fell so far behind that changes were lost, feed clients
+    get a fresh snapshot and `resync` is called to rebuild the aggregates.
+    """
+    while True:
+        await asyncio.sleep(settings.broadcast_interval)
+        try:
+            messages, lost = worker_broadcast.receive()
+            if lost:
+                logger.warning("Missed passenger changes from other workers; resyncing")
+                passenger_events.resync()
+                if resync is not None:
+                    resync()
+            for message in messages:
+                change = orjson.loads(message)
+                apply(change["type"], change["rows"], remote=True)
+        except Exception:
+            logger.exception("Error applying passenger changes from other workers:")
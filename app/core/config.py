@@ -1,12 +1,101 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from dotenv import load_dotenv
+from typing import Dict, List, Optional
+import os
+import tempfile
 
 load_dotenv()  # Explicitly load the .env file
 
 
 class Settings(BaseSettings):
-    supabase_url: str
-    supabase_key: str
+    # "supabase" (default) or "memory" for an indexed in-process store.
+    storage_backend: str = "supabase"
+    supabase_url: str = ""
+    supabase_key: str = ""
+    memory_station_count: int = 10  # Synthetic stations seeded into the memory store
+
+    # Blocking Supabase calls run in a thread pool; these bound how many run at once.
+    db_max_workers: int = 32
+    db_max_read_concurrency: int = 24
+    db_max_write_concurrency: int = 8
+
+    # Read-through cache for single-passenger lookups (0 disables it). Writes made through this
+    # process invalidate entries immediately; other workers' writes show up within the TTL.
+    passenger_cache_size: int = 10000
+    passenger_cache_ttl: float = 1.0
+
+    # Optional write-behind buffer: single-passenger writes are merged per passenger and
+    # flushed every `write_behind_interval` seconds or once `write_behind_max_batch` are pending.
+    write_behind_enabled: bool = False
+    write_behind_interval: float = 0.5
+    write_behind_max_batch: int = 500
+
+    # Persistence (empty disables it): every passenger write is appended to a journal in this
+    # directory. With the memory backend the store is also snapshotted there every
+    # `snapshot_interval` seconds and on shutdown, and restored from snapshot + journal on startup.
+    # With Supabase only the last one or two intervals of journal are kept (and the generator state).
+    persistence_dir: str = ""
+    journal_flush_interval: float = 0.2
+    journal_fsync: bool = False  # Sync every journal flush to disk
+    snapshot_interval: float = 300.0
+
+    station_cache_ttl: float = 60.0  # Seconds before the cached station list is refreshed
+
+    # Counters shared by all worker processes live in this memory-mapped file.
+    stats_path: str = os.path.join(tempfile.gettempdir(), "trainsim-stats.bin")
+    stats_slots: int = 64  # Maximum number of worker processes
+
+    # Passenger changes are broadcast to the other workers through this memory-mapped file (one
+    # ring of `broadcast_buffer_bytes` per worker), so every worker's aggregates and feed see them all.
+    broadcast_path: str = os.path.join(tempfile.gettempdir(), "trainsim-broadcast.bin")
+    broadcast_buffer_bytes: int = 1 << 20
+    broadcast_interval: float = 0.1  # Seconds between reads of the other workers' changes
+
+    # Which worker runs the background loops: "leader" (one worker, with failover),
+    # "sharded" (stations split across workers) or "all" (every worker).
+    background_mode: str = "leader"
+    background_shards: int = 1  # Set to the worker count in "sharded" mode
+    coordination_dir: str = os.path.join(tempfile.gettempdir(), "trainsim")
+    coordination_retry_interval: float = 5.0
+    coordination_failover_grace: float = 30.0
+
+    # Train simulation (runs alongside the other background loops when enabled).
+    simulation_enabled: bool = False
+    simulation_tick_seconds: float = 1.0
+    simulation_trains: int = 4  # Trains spread around one loop over all stations...
+    simulation_routes: Dict[str, List[str]] = {}  # ...unless routes are given: {"train-id": [station IDs]}
+    train_capacity: int = 300
+    train_travel_ticks: int = 30
+    train_dwell_ticks: int = 3
+
+    # Level of the application's logs; per-cycle details of the background loops are logged at DEBUG.
+    log_level: str = "INFO"
+
+    generator_seed: Optional[int] = None  # Set for reproducible passenger attributes (IDs are always random)
+
+    # Background generation: Poisson arrivals per station, in passengers per second.
+    generation_interval: float = 10.0
+    default_arrival_rate: float = 0.1
+    station_arrival_rates: Dict[str, float] = {}  # JSON object, e.g. {"station-id": 0.5}
+    arrival_profile: List[float] = []  # Optional 24 hourly (UTC) rate multipliers
+    max_inflight_inserts: int = 8
+    max_pending_per_station: int = 10000
+
+    # Origin-destination demand of generated passengers. A destination's weight is its popularity
+    # (default 1) x its hourly multiplier (24 UTC values) x any explicit origin->destination
+    # multiplier x distance ** -demand_distance_decay (when both stations have a position).
+    station_popularity: Dict[str, float] = {}  # {"station-id": 2.0}
+    station_hourly_popularity: Dict[str, List[float]] = {}  # {"station-id": [24 multipliers]}
+    demand_pairs: Dict[str, Dict[str, float]] = {}  # {"origin-id": {"destination-id": 3.0}}
+    station_positions: Dict[str, List[float]] = {}  # {"station-id": [x, y]}
+    demand_distance_decay: float = 0.0
+
+    # Live feed (GET /passengers/feed): events are merged over this window before being sent,
+    # and a client more than `feed_max_queue` frames behind is resynced from a snapshot.
+    feed_window: float = 0.25
+    feed_max_queue: int = 256
+    feed_keepalive: float = 15.0
+    feed_snapshot_limit: int = 1000  # Passengers per station/train in a snapshot
 
     model_config = SettingsConfigDict(env_prefix="TRAINSIM_") # Keep the prefix
 
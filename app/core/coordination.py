@@ -0,0 +1,188 @@
+import asyncio
+import fcntl
+import logging
+import os
+import time
+import zlib
+from typing import Callable, Dict, Optional, Set
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class FileLock:
+    """Non-blocking exclusive lock on a file, released automatically if the process dies."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def owner_pid(self) -> Optional[int]:
+        """PID recorded by the last holder, if any."""
+        try:
+            with open(self.path) as f:
+                return int(f.read().strip() or 0) or None
+        except (OSError, ValueError):
+            return None
+
+    def try_acquire(self) -> bool:
+        if self._fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.pwrite(fd, str(os.getpid()).encode(), 0)
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)  # Closing the descriptor drops the flock
+            self._fd = None
+
+
+def process_alive(pid: int) -> bool:
+    """Whether a process with this PID exists."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def station_shard(station_id: str, shards: int) -> int:
+    """Stable shard of a station (the same in every process, unlike `hash`)."""
+    return zlib.crc32(station_id.encode()) % shards
+
+
+class WorkerCoordinator:
+    """Decides which uvicorn worker runs the background generation and expiry loops.
+
+    Modes:
+      * "leader": one worker holds `leader.lock` and runs everything; the others
+        poll the lock and the first to get it takes over when the leader exits.
+      * "sharded": stations are split into `shards` by a stable hash and each
+        worker holds the lock of the shard(s) it works on. A shard whose holder
+        exited (or that nobody claimed within `failover_grace` seconds) is
+        taken over by a worker that already has one.
+      * "all": every worker runs everything (single-worker deployments).
+
+    Locks are `flock`s, so a crashed worker releases them immediately. They
+    only coordinate workers on one host.
+    """
+
+    def __init__(
+            self,
+            directory: str,
+            mode: str = "leader",
+            shards: int = 1,
+            retry_interval: float = 5.0,
+            failover_grace: float = 30.0,
+    ):
+        if mode not in ("leader", "sharded", "all"):
+            raise ValueError(f"Unknown background mode: {mode!r}")
+        self.mode = mode
+        self.shards = max(1, shards)
+        self.retry_interval = retry_interval
+        self.failover_grace = failover_grace
+        os.makedirs(directory, exist_ok=True)
+        self._leader_lock = FileLock(os.path.join(directory, "leader.lock"))
+        self._shard_locks: Dict[int, FileLock] = {
+            shard: FileLock(os.path.join(directory, f"shard-{shard}.lock")) for shard in range(self.shards)
+        }
+        self.owned_shards: Set[int] = set()
+        self.started = False  # Whether `run` has called its `start` callback
+        self._started_shards: Set[int] = set()  # Shards owned when it last did
+        self._running = False
+        self._started_at = time.monotonic()
+
+    @property
+    def active(self) -> bool:
+        """Whether this worker currently runs any background work."""
+        if self.mode == "all":
+            return True
+        if self.mode == "leader":
+            return self._leader_lock.held
+        return bool(self.owned_shards)
+
+    def owns_station(self, station_id: Optional[str]) -> bool:
+        """Whether this worker generates and expires passengers for `station_id`."""
+        if self.mode != "sharded":
+            return self.active
+        return station_id is not None and station_shard(station_id, self.shards) in self.owned_shards
+
+    def try_acquire(self) -> bool:
+        """Tries to take (more) work; returns whether this worker is active afterwards."""
+        if self.mode == "leader":
+            if not self._leader_lock.held and self._leader_lock.try_acquire():
+                logger.info(f"Worker {os.getpid()} is now the background leader")
+        elif self.mode == "sharded":
+            grace_over = time.monotonic() - self._started_at > self.failover_grace
+            for shard, lock in self._shard_locks.items():
+                if lock.held:
+                    continue
+                if self.owned_shards:
+                    # Already working: only adopt shards whose holder died or that nobody took.
+                    previous = lock.owner_pid()
+                    orphaned = previous is not None and not process_alive(previous)
+                    if not orphaned and not grace_over:
+                        continue
+                if lock.try_acquire():
+                    self.owned_shards.add(shard)
+                    logger.info(f"Worker {os.getpid()} took station shard {shard}/{self.shards}")
+                    if len(self.owned_shards) == 1 and not grace_over:
+                        break  # Leave the remaining shards to the other workers
+        return self.active
+
+    async def run(self, start: Callable[[], None]) -> None:
+        """Calls `start` once this worker becomes active, then keeps adopting orphaned work.
+
+        In sharded mode `start` is called again whenever this worker takes
+        more shards, so it must be idempotent. Only one `run` is active per
+        coordinator; further calls return immediately.
+        """
+        if self._running:
+            return
+        self._running = True
+        try:
+            while True:
+                try:
+                    if self.try_acquire() and (not self.started or self.owned_shards - self._started_shards):
+                        start()
+                        self.started = True
+                        self._started_shards = set(self.owned_shards)
+                    if self.mode == "all" or (self.mode == "leader" and self.started):
+                        return  # Nothing more to acquire; the lock is held until the process exits
+                except Exception:
+                    logger.exception("Error in background task coordination:")
+                await asyncio.sleep(self.retry_interval)
+        finally:
+            self._running = False
+
+    def release(self) -> None:
+        self._leader_lock.release()
+        for lock in self._shard_locks.values():
+            lock.release()
+        self.owned_shards.clear()
+        self.started = False
+        self._started_shards = set()
+
+
+coordinator = WorkerCoordinator(
+    settings.coordination_dir,
+    mode=settings.background_mode,
+    shards=settings.background_shards,
+    retry_interval=settings.coordination_retry_interval,
+    failover_grace=settings.coordination_failover_grace,
+)
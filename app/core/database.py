@@ -1,103 +1,243 @@
 from fastapi import Depends, HTTPException
-from supabase import create_client, Client
 from app.core.config import settings
-from typing import List, Optional, Dict
+from app.core.metrics import db_errors, db_latency, queue_depth, timed, watch_cache
+from app.core.journal import PassengerJournal
+from app.core.persistence import Persistence
+from app.core.storage import CachedStore, JournaledStore, MemoryStore, PassengerStore, WriteBehindStore, create_store
+from typing import AsyncIterator, List, Optional, Dict, Sequence
 from app.models.passenger import Passenger, PassengerCreate, PassengerUpdate
 import logging
+import os
 
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
-handler = logging.StreamHandler()
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-handler.setFormatter(formatter)
-logger.addHandler(handler)
 
-supabase: Client = create_client(settings.supabase_url, settings.supabase_key)
+store: PassengerStore = create_store(settings)
+persistence: Optional[Persistence] = None
+if settings.persistence_dir:
+    # Directly above storage, so the journal records writes as they are applied.
+    journal = PassengerJournal(
+        os.path.join(settings.persistence_dir, "journal"), settings.journal_flush_interval, settings.journal_fsync
+    )
+    persistence = Persistence(
+        settings.persistence_dir, journal, store if isinstance(store, MemoryStore) else None, settings.snapshot_interval
+    )
+    queue_depth.labels("journal").set_function(journal.__len__)
+    store = JournaledStore(store, journal)
+passenger_cache: Optional[CachedStore] = None
+if settings.passenger_cache_size > 0:
+    # Below the write-behind buffer, so flushed writes invalidate it and the buffer's lookups hit it.
+    store = passenger_cache = CachedStore(store, settings.passenger_cache_size, settings.passenger_cache_ttl)
+if settings.write_behind_enabled:
+    # Buffer single-passenger writes and send them to storage in merged batches.
+    store = WriteBehindStore(store, settings.write_behind_interval, settings.write_behind_max_batch)
 
-def get_db() -> Client:
-    """Dependency function to get the Supabase client."""
-    return supabase
+if isinstance(store, WriteBehindStore):
+    queue_depth.labels("write_behind").set_function(store.__len__)
+if passenger_cache is not None:
+    watch_cache(passenger_cache)
 
-async def get_all_passengers(db: Client) -> List[Passenger]:
+def instrumented(func):
+    """Records the duration and failures of a storage function under its name."""
+    return timed(db_latency.labels(func.__name__), db_errors.labels(func.__name__))(func)
+
+def get_db() -> PassengerStore:
+    """Dependency function to get the configured passenger store."""
+    return store
+
+def get_cache_stats() -> Optional[Dict]:
+    """Returns the passenger cache's hit/miss/eviction counters (None if the cache is disabled)."""
+    return passenger_cache.stats() if passenger_cache is not None else None
+
+@instrumented
+async def flush_writes(db: PassengerStore) -> None:
+    """Writes out any buffered passenger writes now."""
+    try:
+        await db.flush()
+    except Exception as e:
+        logger.exception("Error flushing passenger writes:")
+        raise HTTPException(status_code=500, detail="Failed to flush passenger writes")
+
+async def restore_store() -> None:
+    """Restores the passengers and registered state from the latest snapshot and journal, if enabled."""
+    if persistence is not None:
+        await persistence.restore()
+
+async def shutdown_store() -> None:
+    """Flushes buffered writes, takes a final snapshot if this worker takes them, and releases the
+    store's resources (called on application shutdown)."""
+    try:
+        await store.flush()
+    except Exception:
+        logger.exception("Error flushing passenger writes on shutdown:")
+    if persistence is not None and persistence.owner:
+        try:
+            await persistence.snapshot()
+        except Exception:
+            logger.exception("Error writing snapshot on shutdown:")
+    store.close()
+
+@instrumented
+async def get_all_passengers(db: PassengerStore) -> List[Passenger]:
     """Retrieves all passengers from the database."""
     try:
-        data = db.table("passengers").select("*").execute()
-        return [Passenger(**item) for item in data.data]
+        rows = await db.get_all_passengers()
+        return [Passenger(**item) for item in rows]
     except Exception as e:
         logger.exception("Error getting all passengers:")
         raise HTTPException(status_code=500, detail="Failed to retrieve passengers")
 
-async def get_passenger(db: Client, passenger_id: str) -> Optional[Passenger]:
+@instrumented
+async def get_passenger(db: PassengerStore, passenger_id: str) -> Optional[Passenger]:
     """Retrieves a passenger by ID."""
     try:
-        data = db.table("passengers").select("*").eq("id", passenger_id).execute()
-        if not data.data:
+        row = await db.get_passenger(passenger_id)
+        if not row:
             return None
-        return Passenger(**data.data[0])
+        return Passenger(**row)
     except Exception as e:
         logger.exception(f"Error getting passenger with ID {passenger_id}:")
         raise HTTPException(status_code=500, detail="Failed to retrieve passenger")
 
-async def create_passenger(db: Client, passenger: PassengerCreate) -> Passenger:
+@instrumented
+async def list_passengers(
+        db: PassengerStore,
+        status: Optional[str] = None,
+        station_id: Optional[str] = None,
+        train_id: Optional[str] = None,
+        after: Optional[str] = None,
+        limit: int = 1000,
+        fields: Optional[Sequence[str]] = None,
+) -> List[Dict]:
+    """Retrieves one page of passenger rows ordered by ID, starting after the `after` cursor."""
+    try:
+        return await db.list_passengers(
+            status=status, station_id=station_id, train_id=train_id, after=after, limit=limit, fields=fields
+        )
+    except Exception as e:
+        logger.exception("Error listing passengers:")
+        raise HTTPException(status_code=500, detail="Failed to retrieve passengers")
+
+async def passenger_pages(db: PassengerStore, page_size: int = 1000, **filters) -> AsyncIterator[List[Dict]]:
+    """Yields every matching passenger row, one `list_passengers` page at a time.
+
+    A store may return fewer rows than asked for (Supabase caps every
+    response at 1000), so only an empty page ends the walk.
+    """
+    after = None
+    while True:
+        rows = await list_passengers(db, after=after, limit=page_size, **filters)
+        if not rows:
+            return
+        yield rows
+        after = rows[-1]["id"]
+
+@instrumented
+async def create_passenger(db: PassengerStore, passenger: PassengerCreate) -> Passenger:
     """Creates a new passenger."""
     try:
         # Set current_station_id to origin_station_id on creation
-        passenger_data = passenger.dict()
+        passenger_data = passenger.model_dump(mode="json")
         passenger_data["current_station_id"] = passenger_data["origin_station_id"]
-        data = db.table("passengers").insert(passenger_data).execute()
-        return Passenger(**data.data[0])
+        row = await db.create_passenger(passenger_data)
+        return Passenger(**row)
     except Exception as e:
         logger.exception("Error creating passenger:")
         raise HTTPException(status_code=500, detail="Failed to create passenger")
 
-async def update_passenger(db: Client, passenger_id: str, passenger: PassengerUpdate) -> Optional[Passenger]:
+@instrumented
+async def update_passenger(db: PassengerStore, passenger_id: str, passenger: PassengerUpdate) -> Optional[Passenger]:
     """Updates an existing passenger."""
     try:
-        data = db.table("passengers").update(passenger.dict(exclude_unset=True)).eq("id", passenger_id).execute()
-        if not data.data:
+        row = await db.update_passenger(passenger_id, passenger.model_dump(mode="json", exclude_unset=True))
+        if not row:
             return None
-        return Passenger(**data.data[0])
+        return Passenger(**row)
     except Exception as e:
         logger.exception(f"Error updating passenger with ID {passenger_id}:")
         raise HTTPException(status_code=500, detail="Failed to update passenger")
 
-async def delete_passenger(db: Client, passenger_id: str) -> None:
-    """Deletes a passenger."""
+@instrumented
+async def delete_passenger(db: PassengerStore, passenger_id: str) -> Optional[Dict]:
+    """Deletes a passenger and returns the deleted row, if there was one."""
     try:
-        data = db.table("passengers").delete().eq("id", passenger_id).execute()
-        if not data.data: #check if data is not None
+        row = await db.delete_passenger(passenger_id)
+        if not row:
             logger.warning(f"No passenger found with ID {passenger_id} to delete.")
+        return row
 
     except Exception as e:
         logger.exception(f"Error deleting passenger with ID {passenger_id}:")
         raise HTTPException(status_code=500, detail="Failed to delete passenger")
 
-async def insert_passengers_to_db(passengers: List[Dict], db:Client):
-    """Inserts a list of passengers into the Supabase database."""
+@instrumented
+async def insert_passengers_to_db(passengers: List[Dict], db: PassengerStore) -> List[Dict]:
+    """Inserts a list of passengers in one storage operation and returns the stored rows."""
     try:
-        data = db.table("passengers").insert(passengers).execute()
-        return data
+        return await db.insert_passengers(passengers)
     except Exception as e:
         logger.exception("Error inserting passengers:")
         raise HTTPException(status_code=500, detail="Failed to insert passengers")
 
+@instrumented
+async def transition_passengers(
+        db: PassengerStore,
+        passenger_ids: List[str],
+        from_status: str,
+        data: Dict,
+) -> List[Dict]:
+    """Applies `data` to the listed passengers that are in `from_status`, in one storage operation."""
+    try:
+        return await db.transition_passengers(passenger_ids, from_status, data)
+    except Exception as e:
+        logger.exception(f"Error updating passengers from status {from_status}:")
+        raise HTTPException(status_code=500, detail="Failed to update passengers")
+
+@instrumented
+async def get_passenger_statuses(db: PassengerStore, passenger_ids: List[str]) -> Dict[str, str]:
+    """Fetches the current status of the listed passengers."""
+    try:
+        return await db.get_passenger_statuses(passenger_ids)
+    except Exception as e:
+        logger.exception("Error getting passenger statuses:")
+        raise HTTPException(status_code=500, detail="Failed to retrieve passenger statuses")
+
+@instrumented
+async def get_waiting_passengers(db: PassengerStore, since: Optional[str] = None) -> List[Dict]:
+    """Fetches the patience fields of waiting passengers (optionally only those spawned since `since`)."""
+    try:
+        return await db.get_waiting_passengers(since)
+    except Exception as e:
+        logger.exception("Error getting waiting passengers:")
+        raise HTTPException(status_code=500, detail="Failed to retrieve waiting passengers")
+
+@instrumented
+async def expire_passengers(db: PassengerStore, passenger_ids: List[str]) -> List[Dict]:
+    """Marks still-waiting passengers as impatient and deletes them, in batches.
+
+    Returns the rows that were actually expired; passengers that stopped waiting
+    in the meantime are left untouched.
+    """
+    try:
+        return await db.expire_passengers(passenger_ids)
+    except Exception as e:
+        logger.exception("Error expiring passengers:")
+        raise HTTPException(status_code=500, detail="Failed to expire passengers")
+
 
-async def get_station_ids(db: Client = Depends(get_db)) -> List[str]:
-    """Fetches all station IDs from the Supabase database."""
+@instrumented
+async def get_station_ids(db: PassengerStore = Depends(get_db)) -> List[str]:
+    """Fetches all station IDs."""
     try:
-        data = db.table("stations").select("id").execute()
-        return [item['id'] for item in data.data]
+        return await db.get_station_ids()
     except Exception as e:
         logger.exception("Error getting station IDs:")
         raise HTTPException(status_code=500, detail="Failed to retrieve station IDs")
 
-async def get_station_names(db: Client) -> Dict[str, str]:
+@instrumented
+async def get_station_names(db: PassengerStore) -> Dict[str, str]:
     """Fetches all station IDs and names, returning a dictionary."""
     try:
-        data = db.table("stations").select("id, name").execute()
-        if data.error:
-            raise Exception(data.error)
-        return {item['id']: item['name'] for item in data.data}  # Create the dictionary
+        return await db.get_station_names()
     except Exception as e:
         logger.exception("Error getting station names:")
-        raise HTTPException(status_code=500, detail="Failed to retrieve station names")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to retrieve station names")
@@ -0,0 +1,252 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set
+
+import orjson
+
+from app.core.config import settings
+from app.core.metrics import queue_depth
+
+logger = logging.getLogger(__name__)
+
+# Event types. Every event carries the passenger's compact state, so clients can upsert on any of them.
+CREATED = "created"
+UPDATED = "updated"
+BOARDED = "boarded"
+DEPARTED = "departed"
+ARRIVED = "arrived"
+EXPIRED = "expired"
+DELETED = "deleted"
+REMOVALS = (EXPIRED, DELETED)
+
+EVENT_FIELDS = ("status", "origin_station_id", "current_station_id", "destination_station_id", "train_id")
+
+RESYNC = object()  # Queued in place of the backlog when a subscriber falls behind
+
+
+def _value(value):
+    return getattr(value, "value", value)  # Enum members from model dumps
+
+
+class Subscriber:
+    """One feed client: its filters and a bounded queue of encoded frames.
+
+    A subscriber with no station or train filter receives every event.
+    """
+
+    def __init__(self, stations: Iterable[str] = (), trains: Iterable[str] = (), max_queue: int = 256):
+        self.stations = frozenset(stations)
+        self.trains = frozenset(trains)
+        self.queue: asyncio.Queue = asyncio.Queue(max_queue)
+        self.dropped = 0  # Frames discarded by resyncs
+
+    @property
+    def everything(self) -> bool:
+        return not self.stations and not self.trains
+
+    def offer(self, frame) -> None:
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # Too slow to keep up: drop the backlog and let the client resync from a snapshot.
+            while not self.queue.empty():
+                if self.queue.get_nowait() is not RESYNC:
+                    self.dropped += 1
+            self.dropped += 1
+            self.queue.put_nowait(RESYNC)
+
+
+class EventHub:
+    """Fans passenger state changes out to feed subscribers.
+
+    Write paths call `publish`, which only records the latest event per
+    passenger (and nothing at all while nobody is subscribed). Every
+    `window` seconds the pending events are grouped by station and train,
+    each group is encoded once, and the same bytes are queued for every
+    subscriber of that station or train, so the cost of a flush grows with
+    the number of events and subscriptions rather than events x viewers.
+
+    Changes made by other workers arrive through `app.core.changes`, so a
+    subscriber sees every change whichever worker serves its connection.
+    """
+
+    def __init__(self, window: float = 0.25, max_queue: int = 256):
+        self.window = window
+        self.max_queue = max_queue
+        self._pending: Dict[str, Dict] = {}
+        self._routes: Dict[str, Set] = {}  # Passenger ID -> ("station"/"train", ID) keys touched this window
+        self._everything: Set[Subscriber] = set()
+        self._by_station: Dict[str, Set[Subscriber]] = defaultdict(set)
+        self._by_train: Dict[str, Set[Subscriber]] = defaultdict(set)
+        self._subscribers = 0
+        self._task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.flushes = 0
+
+    def __len__(self) -> int:
+        return self._subscribers
+
+    @property
+    def active(self) -> bool:
+        return self._subscribers > 0
+
+    @property
+    def pending(self) -> int:
+        """Number of passengers with an event waiting for the next flush."""
+        return len(self._pending)
+
+    def subscribers(self) -> Set[Subscriber]:
+        subscribers = set(self._everything)
+        for index in (self._by_station, self._by_train):
+            for group in index.values():
+                subscribers.update(group)
+        return subscribers
+
+    def queued(self) -> int:
+        """Number of frames waiting in subscriber queues."""
+        return sum(subscriber.queue.qsize() for subscriber in self.subscribers())
+
+    def resync(self) -> None:
+        """Sends every subscriber a fresh snapshot (after changes were missed)."""
+        self._pending, self._routes = {}, {}
+        for subscriber in self.subscribers():
+            subscriber.offer(RESYNC)
+
+    # --- Subscriptions ---
+
+    def subscribe(self, stations: Iterable[str] = (), trains: Iterable[str] = ()) -> Subscriber:
+        subscriber = Subscriber(stations, trains, self.max_queue)
+        self._subscribers += 1
+        if subscriber.everything:
+            self._everything.add(subscriber)
+        for station_id in subscriber.stations:
+            self._by_station[station_id].add(subscriber)
+        for train_id in subscriber.trains:
+            self._by_train[train_id].add(subscriber)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers -= 1
+        self._everything.discard(subscriber)
+        for index, keys in ((self._by_station, subscriber.stations), (self._by_train, subscriber.trains)):
+            for key in keys:
+                subscribers = index.get(key)
+                if subscribers is not None:
+                    subscribers.discard(subscriber)
+                    if not subscribers:
+                        del index[key]
+
+    # --- Publishing ---
+
+    def publish(self, event_type: str, row: Dict) -> None:
+        """Records a state change of one passenger (a row dict with at least "id")."""
+        if not self.active:
+            return
+        passenger_id = row["id"]
+        event = {"type": event_type, "id": passenger_id}
+        for name in EVENT_FIELDS:
+            if name in row:
+                event[name] = _value(row[name])
+        routes = self._routes.setdefault(passenger_id, set())
+        if event.get("current_station_id") is not None:
+            routes.add(("station", event["current_station_id"]))
+        if event.get("train_id") is not None:
+            routes.add(("train", event["train_id"]))
+
+        previous = self._pending.get(passenger_id)
+        if previous is not None:
+            # Coalesce: keep the latest state, but a passenger created in this window stays "created"
+            # and one created and removed in the same window is never sent at all.
+            if previous["type"] == CREATED:
+                if event_type in REMOVALS:
+                    del self._pending[passenger_id]
+                    del self._routes[passenger_id]
+                    return
+                event["type"] = CREATED
+            event = {**previous, **event}
+        self._pending[passenger_id] = event
+        self.published += 1
+
+    def publish_many(self, event_type: str, rows: Iterable[Dict]) -> None:
+        if not self.active:
+            return
+        for row in rows:
+            self.publish(event_type, row)
+
+    # --- Delivery ---
+
+    @staticmethod
+    def encode(data, event: str = "passengers") -> bytes:
+        """Encodes `data` (a list of events, or a snapshot) as one Server-Sent Events frame."""
+        return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+    def flush(self) -> int:
+        """Delivers the pending events to their subscribers; returns the number of events."""
+        pending, routes = self._pending, self._routes
+        if not pending:
+            return 0
+        self._pending, self._routes = {}, {}
+        self.flushes += 1
+
+        if self._everything:
+            frame = self.encode(list(pending.values()))
+            for subscriber in self._everything:
+                subscriber.offer(frame)
+
+        groups: Dict = defaultdict(list)
+        for passenger_id, event in pending.items():
+            for key in routes.get(passenger_id, ()):
+                groups[key].append(event)
+        for (kind, key), events in groups.items():
+            subscribers = (self._by_station if kind == "station" else self._by_train).get(key)
+            if not subscribers:
+                continue
+            frame = self.encode(events)
+            for subscriber in subscribers:
+                subscriber.offer(frame)
+        return len(pending)
+
+    async def run(self) -> None:
+        """Flushes every `window` seconds while anyone is subscribed."""
+        while self.active:
+            await asyncio.sleep(self.window)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Error flushing passenger events:")
+        self._pending, self._routes = {}, {}
+
+    async def stream(
+            self,
+            snapshot: Callable[[Subscriber], Awaitable[Dict]],
+            stations: Iterable[str] = (),
+            trains: Iterable[str] = (),
+            keepalive: float = 15.0,
+    ):
+        """Subscribes and yields SSE frames: a snapshot, then deltas (and a new snapshot after a resync).
+
+        The subscription lasts as long as the generator, so it ends when the client disconnects.
+        """
+        subscriber = self.subscribe(stations, trains)
+        try:
+            yield self.encode(await snapshot(subscriber), event="snapshot")
+            while True:
+                try:
+                    frame = await asyncio.wait_for(subscriber.queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if frame is RESYNC:
+                    yield self.encode(await snapshot(subscriber), event="snapshot")
+                else:
+                    yield frame
+        finally:
+            self.unsubscribe(subscriber)
+
+
+passenger_events = EventHub(settings.feed_window, settings.feed_max_queue)
+queue_depth.labels("feed_events").set_function(lambda: passenger_events.pending)
+queue_depth.labels("feed_frames").set_function(passenger_events.queued)
@@ -0,0 +1,173 @@
+import asyncio
+import fcntl
+import logging
+import os
+import re
+import struct
+import time
+from typing import Dict, Iterator, List, Optional
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# Record types. Together they describe every change to the `passengers` table.
+INSERT = "insert"  # rows: the stored rows
+UPDATE = "update"  # ids, data: the same columns set on every listed passenger
+DELETE = "delete"  # ids
+STATE = "state"  # name, value: in-process state to restore with the passengers (e.g. the generator's RNG)
+START = "start"  # pid, seed: first record written by a process
+
+_LENGTH = struct.Struct("<I")  # Each record is its orjson payload prefixed by the payload length
+_SEGMENT = re.compile(r"journal-(\d{8})\.log$")
+
+
+def segment_name(segment: int) -> str:
+    return f"journal-{segment:08d}.log"
+
+
+def read_segment(path: str) -> Iterator[Dict]:
+    """Yields the records of one segment file, stopping at a torn record at the end (a crash mid-write)."""
+    with open(path, "rb") as file:
+        data = file.read()
+    offset = 0
+    while offset + _LENGTH.size <= len(data):
+        (length,) = _LENGTH.unpack_from(data, offset)
+        end = offset + _LENGTH.size + length
+        if end > len(data):
+            logger.warning(f"Ignoring a truncated record at the end of {path}")
+            return
+        yield orjson.loads(data[offset + _LENGTH.size:end])
+        offset = end
+
+
+class PassengerJournal:
+    """Append-only log of passenger writes, split into numbered segment files.
+
+    `append` only encodes the record into an in-memory buffer; the buffer
+    is written out every `flush_interval` seconds (and on `flush`/`close`),
+    each flush as one `write` under a file lock so several processes can
+    share a segment. With `fsync` each flush is also synced to disk.
+
+    A snapshot starts a new segment (`roll`); the segments before it are
+    no longer needed once the snapshot is written (`prune`). Only one
+    process rolls and prunes; the others notice the new segment on their
+    next flush and move over to it.
+    """
+
+    def __init__(self, directory: str, flush_interval: float = 0.2, fsync: bool = False):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+        segments = self.segments()
+        self.segment = segments[-1] if segments else 1
+        self._fd: Optional[int] = None
+        self._buffer: List[bytes] = []
+        self._task: Optional[asyncio.Task] = None
+        self.records = 0  # Records appended by this process
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def segments(self) -> List[int]:
+        """Returns the numbers of the segment files on disk, oldest first."""
+        return sorted(int(match.group(1)) for match in map(_SEGMENT.match, os.listdir(self.directory)) if match)
+
+    def path(self, segment: int) -> str:
+        return os.path.join(self.directory, segment_name(segment))
+
+    # --- Writing ---
+
+    def append(self, record_type: str, **fields) -> None:
+        payload = orjson.dumps({"type": record_type, "ts": time.time(), **fields})
+        self._buffer.append(_LENGTH.pack(len(payload)) + payload)
+        self.records += 1
+        if self._task is None or self._task.done():
+            try:
+                self._task = asyncio.get_running_loop().create_task(self._run())
+            except RuntimeError:
+                pass  # No event loop (scripts, shutdown): written on the next flush
+
+    async def _run(self) -> None:
+        while self._buffer:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Error writing the passenger journal:")
+
+    def flush(self) -> None:
+        """Writes the buffered records to the current segment."""
+        if not self._buffer:
+            return
+        data = b"".join(self._buffer)
+        while True:
+            if self._fd is None:
+                self._open_segment()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            # Checked under the lock, which `prune` also takes: another process may have rolled.
+            if os.fstat(self._fd).st_nlink > 0 and not os.path.exists(self.path(self.segment + 1)):
+                break
+            self._close_segment()
+        try:
+            os.write(self._fd, data)
+            if self.fsync:
+                os.fsync(self._fd)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._buffer = []
+
+    def _open_segment(self) -> None:
+        segments = self.segments()
+        if segments and segments[-1] > self.segment:
+            self.segment = segments[-1]
+        self._fd = os.open(self.path(self.segment), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def roll(self) -> int:
+        """Flushes and starts a new segment; returns its number."""
+        self.flush()
+        self._close_segment()
+        self.segment = max([self.segment, *self.segments()]) + 1
+        # Created right away, so the other processes switch to it on their next flush.
+        os.close(os.open(self.path(self.segment), os.O_WRONLY | os.O_CREAT, 0o644))
+        return self.segment
+
+    def prune(self, before: int) -> None:
+        """Deletes the segments numbered below `before`."""
+        for segment in self.segments():
+            if segment < before:
+                path = self.path(segment)
+                with open(path, "rb") as file:
+                    fcntl.flock(file, fcntl.LOCK_EX)  # Waits for a process still writing to it
+                    os.remove(path)
+
+    def _close_segment(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            self._close_segment()
+
+    # --- Reading ---
+
+    def read(self, start: int = 1) -> Iterator[Dict]:
+        """Yields the records of every segment from `start` on, in order (buffered records excluded)."""
+        for segment in self.segments():
+            if segment >= start:
+                yield from read_segment(self.path(segment))
+
+
+async def apply_record(store, record: Dict) -> None:
+    """Applies one journal record to a `PassengerStore` (STATE and START records are skipped)."""
+    record_type = record["type"]
+    if record_type == INSERT:
+        await store.insert_passengers(record["rows"])
+    elif record_type == UPDATE:
+        await store.update_passengers(record["ids"], record["data"])
+    elif record_type == DELETE:
+        await store.delete_passengers(record["ids"])
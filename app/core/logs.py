@@ -0,0 +1,16 @@
+import logging
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+def configure_logging(level: str = "INFO") -> None:
+    """Sends the application's log records (every `app.*` logger) to stderr at `level`.
+
+    Safe to call more than once; the handler is only installed the first time.
+    """
+    logger = logging.getLogger("app")
+    logger.setLevel(level.upper())
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        logger.addHandler(handler)
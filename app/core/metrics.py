@@ -0,0 +1,171 @@
+import functools
+import os
+import time
+from typing import Dict, Optional
+
+from prometheus_client import Counter, Gauge, Histogram, disable_created_metrics
+from prometheus_client.core import REGISTRY, CounterMetricFamily, GaugeMetricFamily
+
+# Metrics live in prometheus_client's default registry (next to its process and GC collectors) and are
+# per worker process; `GET /metrics` renders them with `generate_latest`.
+disable_created_metrics()  # A `_created` gauge per series would double the scrape for nothing
+
+# Upper bounds in seconds: from sub-millisecond lookups up to slow storage round trips.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+
+
+def timed(latency: Histogram, errors: Optional[Counter] = None):
+    """Decorates a coroutine function to record its duration (and failures) in the given series."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                if errors is not None:
+                    errors.inc()
+                raise
+            finally:
+                latency.observe(time.perf_counter() - started)
+
+        return wrapper
+
+    return decorator
+
+
+class LoopTimer:
+    """Records the iterations of one background loop.
+
+    Call `start()` when an iteration begins and `finish(started, delay)` when
+    it ends, with the delay until the next one should begin. Lag is how late
+    the next iteration then actually starts, i.e. how long the event loop
+    kept it waiting past its due time.
+    """
+
+    def __init__(self, loop: str):
+        self.loop = loop
+        self.duration = loop_duration.labels(loop)
+        self.lag = loop_lag.labels(loop)
+        self.errors = loop_errors.labels(loop)
+        self._rows: Dict[str, Histogram] = {}
+        self._due: Optional[float] = None
+
+    def start(self) -> float:
+        now = time.monotonic()
+        if self._due is not None:
+            self.lag.observe(max(0.0, now - self._due))
+            self._due = None
+        return now
+
+    def finish(self, started: float, delay: float) -> None:
+        now = time.monotonic()
+        self.duration.observe(now - started)
+        self._due = now + delay
+
+    def error(self) -> None:
+        self.errors.inc()
+        self._due = None  # The error back-off is not lag
+
+    def rows(self, kind: str, count: int) -> None:
+        """Records how many rows of a kind (read, expired, ...) this iteration handled."""
+        series = self._rows.get(kind)
+        if series is None:
+            series = self._rows[kind] = loop_rows.labels(self.loop, kind)
+        series.observe(count)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording the latency and status of every HTTP request.
+
+    Requests are labelled by route template (e.g. `/passengers/{passenger_id}`),
+    not by raw path, so the number of series stays bounded. Latency runs until
+    the response headers are sent, which for streamed responses is the time to
+    the first chunk rather than the length of the stream.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        recorded = False
+
+        def record(status: int) -> None:
+            nonlocal recorded
+            recorded = True
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            http_latency.labels(method, template).observe(time.perf_counter() - started)
+            http_requests.labels(method, template, str(status)).inc()
+
+        async def send_recorded(message):
+            if message["type"] == "http.response.start":
+                record(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_recorded)
+        except Exception:
+            if not recorded:
+                record(500)
+            raise
+
+
+class CacheCollector:
+    """Exports a `CachedStore`'s counters, read from the cache itself at scrape time."""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def collect(self):
+        stats = self.cache.stats()
+        lookups = CounterMetricFamily(
+            "trainsim_passenger_cache_lookups", "Single-passenger cache lookups by outcome", labels=("result",))
+        for result in ("hits", "misses", "coalesced"):
+            lookups.add_metric((result,), stats[result])
+        yield lookups
+        yield CounterMetricFamily(
+            "trainsim_passenger_cache_evictions", "Rows dropped to keep the cache within its size", value=stats["evictions"])
+        yield CounterMetricFamily(
+            "trainsim_passenger_cache_expirations", "Rows dropped after their TTL", value=stats["expirations"])
+        yield CounterMetricFamily(
+            "trainsim_passenger_cache_invalidations", "Rows dropped by writes", value=stats["invalidations"])
+        yield GaugeMetricFamily("trainsim_passenger_cache_entries", "Rows held by the cache", value=stats["size"])
+
+
+worker_info = Gauge("trainsim_worker_info", "Process ID of the worker that served this scrape", ("pid",))
+worker_info.labels(str(os.getpid())).set(1)
+
+http_latency = Histogram(
+    "trainsim_http_request_duration_seconds", "Time until the response starts, by route", ("method", "route"),
+    buckets=LATENCY_BUCKETS)
+http_requests = Counter(
+    "trainsim_http_requests_total", "HTTP requests by route and status code", ("method", "route", "status"))
+
+db_latency = Histogram(
+    "trainsim_db_operation_duration_seconds", "Duration of storage operations", ("operation",),
+    buckets=LATENCY_BUCKETS)
+db_errors = Counter("trainsim_db_operation_errors_total", "Storage operations that failed", ("operation",))
+
+loop_duration = Histogram(
+    "trainsim_loop_iteration_duration_seconds", "Duration of background loop iterations", ("loop",),
+    buckets=LATENCY_BUCKETS)
+loop_lag = Histogram(
+    "trainsim_loop_lag_seconds", "How late background loop iterations start", ("loop",), buckets=LATENCY_BUCKETS)
+loop_errors = Counter("trainsim_loop_errors_total", "Background loop iterations that failed", ("loop",))
+loop_rows = Histogram(
+    "trainsim_loop_rows", "Rows handled per background loop iteration", ("loop", "kind"), buckets=ROW_BUCKETS)
+
+queue_depth = Gauge("trainsim_queue_depth", "Items waiting in in-process queues and buffers", ("queue",))
+
+
+def watch_cache(cache) -> None:
+    """Exports the counters of the single-passenger cache."""
+    REGISTRY.register(CacheCollector(cache))
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import os
+import re
+import shutil
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.core.journal import DELETE, INSERT, START, STATE, UPDATE, PassengerJournal, apply_record
+from app.core.metrics import LoopTimer
+from app.core.storage import MemoryStore
+from app.simulation.snapshot import META_FILE, read_snapshot, write_snapshot
+from app.simulation.table import PassengerTable
+
+logger = logging.getLogger(__name__)
+
+_SNAPSHOT = re.compile(r"snapshot-(\d{8})$")
+
+
+class Persistence:
+    """Snapshots of the in-process state plus the passenger journal.
+
+    A snapshot holds the memory store's passengers and every registered piece
+    of state (such as the generator's RNG), and records which journal segment
+    follows it. `restore` maps the latest snapshot and replays the journal
+    from that segment, so a restart costs the size of the snapshot plus the
+    writes made since, not a scan of every passenger.
+
+    With a durable store (`store` is None) only the journal is kept: every
+    `interval` seconds it is rolled into a new segment that starts with the
+    registered state, and segments older than the previous one are dropped.
+    The last one or two segments can be replayed elsewhere (see
+    `benchmarks/replay.py`), and `restore` still recovers the state.
+
+    Every worker appends to the journal, but only one of them may `run` the
+    snapshots, since rolling and pruning act on the shared files.
+    """
+
+    def __init__(self, directory: str, journal: PassengerJournal, store: Optional[MemoryStore] = None,
+                 interval: float = 300.0):
+        self.directory = directory
+        self.journal = journal
+        self.store = store
+        self.interval = interval
+        self._state: Dict[str, Tuple[Callable[[], object], Callable[[object], None]]] = {}
+        self._lock = asyncio.Lock()
+        self.owner = False  # Whether this process takes the snapshots (set by `run`)
+        os.makedirs(directory, exist_ok=True)
+        snapshots = self.snapshots()
+        if snapshots and journal.segment < snapshots[-1]:
+            journal.segment = snapshots[-1]  # Its segments were all pruned: continue where the snapshot expects
+
+    def register_state(self, name: str, get: Callable[[], object], set: Callable[[object], None]) -> None:
+        """Adds JSON-safe state to snapshots; `set` receives it back on restore."""
+        self._state[name] = (get, set)
+
+    def record_state(self, name: str) -> None:
+        """Journals the current value of a registered state, so a restore resumes from it."""
+        self.journal.append(STATE, name=name, value=self._state[name][0]())
+
+    # --- Snapshots ---
+
+    def path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"snapshot-{segment:08d}")
+
+    def snapshots(self) -> List[int]:
+        """Returns the journal segments of the complete snapshots on disk, oldest first."""
+        segments = []
+        for name in os.listdir(self.directory):
+            match = _SNAPSHOT.match(name)
+            if match and os.path.exists(os.path.join(self.directory, name, META_FILE)):
+                segments.append(int(match.group(1)))
+        return sorted(segments)
+
+    async def snapshot(self) -> Optional[str]:
+        """Writes a snapshot and drops the journal segments and snapshots it supersedes."""
+        if self.store is None:
+            segment = self.journal.roll()
+            for name in self._state:
+                self.record_state(name)  # Each segment carries the state it starts from
+            self.journal.prune(segment - 1)
+            return None
+        async with self._lock:
+            # Taken without yielding to the event loop, so no write falls between the roll and the copy.
+            segment = self.journal.roll()
+            image = self.store.export()
+            meta = {"journal_segment": segment, "created": time.time(),
+                    "state": {name: get() for name, (get, _) in self._state.items()}}
+            path = self.path(segment)
+            await asyncio.get_running_loop().run_in_executor(None, write_snapshot, path, image, meta)
+            self.journal.prune(segment)
+            for older in self.snapshots():
+                if older < segment:
+                    shutil.rmtree(self.path(older), ignore_errors=True)
+            return path
+
+    async def run(self) -> None:
+        """Takes a snapshot every `interval` seconds (in one process only)."""
+        self.owner = True
+        timer = LoopTimer("snapshot")
+        while True:
+            await asyncio.sleep(self.interval)
+            started = timer.start()
+            try:
+                await self.snapshot()
+                if self.store is not None:
+                    timer.rows("passengers", len(self.store))
+            except Exception:
+                logger.exception("Error writing snapshot:")
+                timer.error()
+            timer.finish(started, self.interval)
+
+    # --- Restore ---
+
+    async def restore(self) -> Dict:
+        """Loads the latest snapshot, replays the journal written after it and restores registered state."""
+        started = time.perf_counter()
+        summary = {"snapshot": None, "passengers": 0, "replayed": 0, "failed": 0}
+        state: Dict = {}
+        start_segment = 1
+        snapshots = self.snapshots() if self.store is not None else []
+        if snapshots:
+            path = self.path(snapshots[-1])
+            image, meta = await asyncio.get_running_loop().run_in_executor(None, read_snapshot, path)
+            self.store.restore(PassengerTable.from_export(image))
+            start_segment = meta["journal_segment"]
+            state.update(meta.get("state", {}))
+            summary["snapshot"] = path
+        for record in self.journal.read(start_segment):
+            if record["type"] == STATE:
+                state[record["name"]] = record["value"]
+            elif record["type"] in (INSERT, UPDATE, DELETE) and self.store is not None:
+                # A durable store already holds these writes; only the state is needed from them.
+                try:
+                    await apply_record(self.store, record)
+                    summary["replayed"] += 1
+                except Exception:
+                    logger.exception(f"Skipping journal record that could not be replayed ({record['type']}):")
+                    summary["failed"] += 1
+        if self.store is not None:
+            summary["passengers"] = len(self.store)
+        for name, value in state.items():
+            if name in self._state:
+                self._state[name][1](value)
+        self.journal.append(START, pid=os.getpid())
+        summary["seconds"] = time.perf_counter() - started
+        logger.info(f"Restored {summary['passengers']} passengers in {summary['seconds'] * 1000:.1f} ms "
+                    f"({summary['replayed']} journal records replayed)")
+        return summary
@@ -0,0 +1,40 @@
+from typing import Any, Iterable, Mapping, Optional
+
+import orjson
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialises rows (dicts of JSON types, datetimes, enums) straight to JSON bytes."""
+    return orjson.dumps(content, default=_default)
+
+
+def dumps_ndjson(rows: Iterable[Mapping]) -> bytes:
+    """Serialises rows as newline-delimited JSON."""
+    return b"".join(orjson.dumps(row, default=_default, option=orjson.OPT_APPEND_NEWLINE) for row in rows)
+
+
+class RowsResponse(Response):
+    """JSON response for rows the storage layer has already validated.
+
+    Returning a `Response` bypasses FastAPI's `response_model` validation, so
+    rows are encoded once by orjson instead of being rebuilt as models,
+    re-validated and then encoded. Inbound bodies are still validated.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def model_response(model: BaseModel, status_code: int = 200, headers: Optional[Mapping[str, str]] = None) -> Response:
+    """Serialises an already-built model once with its compiled serializer."""
+    return Response(model.model_dump_json(), status_code=status_code, headers=headers, media_type="application/json")
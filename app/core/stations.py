@@ -0,0 +1,88 @@
+import asyncio
+import time
+from typing import Dict, FrozenSet, List, Optional
+
+from app.core.config import settings
+from app.core.database import get_station_names
+from app.core.storage import PassengerStore
+
+
+class StationRegistry:
+    """Cached station IDs and names with TTL refresh.
+
+    Lookups are a set/dict access. Once loaded, an expired cache keeps serving
+    the previous data while one background refresh runs, so requests never wait
+    on the `stations` table; only the first load (or a load after
+    `invalidate()`) is awaited. Concurrent refreshes share a single fetch.
+    """
+
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = ttl
+        self.version = 0  # Bumped whenever the set of stations changes
+        self._ids: List[str] = []
+        self._id_set: FrozenSet[str] = frozenset()
+        self._names: Dict[str, str] = {}
+        self._loaded_at: Optional[float] = None
+        self._refresh: Optional[asyncio.Task] = None
+
+    @property
+    def ids(self) -> List[str]:
+        return self._ids
+
+    @property
+    def names(self) -> Dict[str, str]:
+        return self._names
+
+    def __contains__(self, station_id: str) -> bool:
+        return station_id in self._id_set
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def invalidate(self) -> None:
+        """Drops the cached stations; the next `get` reloads them."""
+        self._loaded_at = None
+
+    def update(self, names: Dict[str, str]) -> None:
+        """Replaces the cached stations."""
+        if set(names) != self._id_set:
+            self.version += 1
+        self._names = dict(names)
+        self._ids = list(names)
+        self._id_set = frozenset(names)
+        self._loaded_at = time.monotonic()
+
+    def _start_refresh(self, db: PassengerStore) -> asyncio.Task:
+        if self._refresh is None:
+            self._refresh = asyncio.create_task(self._load(db))
+            # Background refresh failures are logged by get_station_names; keep serving stale data.
+            self._refresh.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return self._refresh
+
+    async def refresh(self, db: PassengerStore) -> None:
+        """Reloads the stations, joining a refresh that is already running."""
+        await asyncio.shield(self._start_refresh(db))
+
+    async def _load(self, db: PassengerStore) -> None:
+        try:
+            self.update(await get_station_names(db))
+        finally:
+            self._refresh = None
+
+    async def get(self, db: PassengerStore) -> "StationRegistry":
+        """Returns the registry, loading it first if needed and refreshing it when expired."""
+        if not self.loaded:
+            await self.refresh(db)
+        elif self.is_stale():
+            self._start_refresh(db)
+        return self
+
+
+station_registry = StationRegistry(settings.station_cache_ttl)
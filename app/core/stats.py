@@ -0,0 +1,165 @@
+import contextlib
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import time
+from typing import Dict
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.coordination import process_alive
+
+logger = logging.getLogger(__name__)
+
+# Counter indexes.
+GENERATED = 0
+ARRIVED = 1
+IMPATIENT = 2
+COUNTER_NAMES = ("generated", "arrived", "impatient")
+
+WINDOW_SECONDS = 300  # Longest rolling window that can be queried
+
+_MAGIC = b"TRAINSTA"
+_HEADER = struct.Struct("<8sIIII")  # magic, version, slots, counters, window
+_VERSION = 1
+_HEADER_WORDS = 4  # Header padded to 32 bytes / four uint64 words
+
+
+class SharedStats:
+    """Passenger counters shared by every worker process through a memory-mapped file.
+
+    The file holds one slot per process. A process claims a slot once (under a
+    file lock) and from then on is its only writer, so `add` is a couple of
+    plain integer increments with no lock. Readers sum all slots. Besides the
+    running totals each slot keeps a ring of per-second buckets, which gives
+    rolling rates over the last `WINDOW_SECONDS`.
+
+    Slot layout (uint64 words): pid, totals[counters], then `window` buckets
+    of (epoch second, counts[counters]).
+    """
+
+    def __init__(self, path: str, slots: int = 64, counters: int = len(COUNTER_NAMES), window: int = WINDOW_SECONDS):
+        self.path = path
+        self.slots = slots
+        self.counters = counters
+        self.window = window
+        self._bucket_words = 1 + counters
+        self._slot_words = 1 + counters + window * self._bucket_words
+        self._size = (_HEADER_WORDS + slots * self._slot_words) * 8
+        self._mmap = self._open()
+        self._words = memoryview(self._mmap).cast("Q")
+        self._array = np.frombuffer(self._mmap, dtype=np.uint64)
+        self._attach()
+        # A forked child (e.g. a pre-loading process manager) must not share its parent's slot.
+        os.register_at_fork(after_in_child=self._attach)
+
+    def _attach(self) -> None:
+        self.slot = self._claim_slot()
+        base = _HEADER_WORDS + self.slot * self._slot_words
+        self._totals = self._words[base + 1:base + 1 + self.counters]
+        self._ring = self._words[base + 1 + self.counters:base + self._slot_words]
+
+    def _header(self) -> bytes:
+        return _HEADER.pack(_MAGIC, _VERSION, self.slots, self.counters, self.window).ljust(_HEADER_WORDS * 8, b"\0")
+
+    def _open(self) -> mmap.mmap:
+        try:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError:
+            logger.exception(f"Cannot open stats file {self.path}; counters will be process-local")
+            self._file_backed = False
+            buffer = mmap.mmap(-1, self._size)
+            buffer[:_HEADER_WORDS * 8] = self._header()
+            return buffer
+        self._file_backed = True
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                header = os.pread(fd, _HEADER_WORDS * 8, 0)
+                if header != self._header() or os.fstat(fd).st_size != self._size:
+                    # New file or a different layout: start from zero.
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, self._size)
+                    os.pwrite(fd, self._header(), 0)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            return mmap.mmap(fd, self._size)
+        finally:
+            os.close(fd)
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Excludes the other processes' slot claims and restores."""
+        with open(self.path, "rb") if self._file_backed else contextlib.nullcontext() as lock_file:
+            if lock_file is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _claim_slot(self) -> int:
+        """Claims the first slot that is free or whose process has exited.
+
+        A reclaimed slot keeps its totals, so counts from dead workers are not lost.
+        """
+        pid = os.getpid()
+        with self._locked():
+            for slot in range(self.slots):
+                offset = _HEADER_WORDS + slot * self._slot_words
+                owner = self._words[offset]
+                if owner == pid or owner == 0 or not process_alive(owner):
+                    self._words[offset] = pid
+                    return slot
+        raise RuntimeError(f"All {self.slots} stats slots are in use; raise TRAINSIM_STATS_SLOTS")
+
+    def add(self, counter: int, n: int = 1) -> None:
+        """Adds `n` to a counter (lock-free: only this process writes its slot)."""
+        if n <= 0:
+            return
+        self._totals[counter] += n
+        second = int(time.time())
+        bucket = (second % self.window) * self._bucket_words
+        ring = self._ring
+        if ring[bucket] != second:
+            for i in range(1, self._bucket_words):
+                ring[bucket + i] = 0
+            ring[bucket] = second
+        ring[bucket + 1 + counter] += n
+
+    def _slot_array(self) -> np.ndarray:
+        return self._array[_HEADER_WORDS:].reshape(self.slots, self._slot_words)
+
+    def totals(self) -> Dict[str, int]:
+        """Returns every counter summed over all processes."""
+        sums = self._slot_array()[:, 1:1 + self.counters].sum(axis=0)
+        return {name: int(sums[i]) for i, name in enumerate(COUNTER_NAMES[:self.counters])}
+
+    def restore(self, totals: Dict[str, int]) -> None:
+        """Raises the totals to at least `totals` (saved before a restart that lost the file).
+
+        Every worker restores the same saved values, so only what is missing
+        is added, and nothing if the file survived.
+        """
+        with self._locked():
+            current = self.totals()
+            for i, name in enumerate(COUNTER_NAMES[:self.counters]):
+                missing = int(totals.get(name, 0)) - current[name]
+                if missing > 0:
+                    self._totals[i] += missing
+
+    def window_totals(self, seconds: int) -> Dict[str, int]:
+        """Returns every counter summed over all processes for the last `seconds` seconds."""
+        seconds = min(seconds, self.window)
+        buckets = self._slot_array()[:, 1 + self.counters:].reshape(self.slots, self.window, self._bucket_words)
+        now = int(time.time())
+        recent = buckets[:, :, 0] > now - seconds
+        sums = (buckets[:, :, 1:] * recent[:, :, None]).sum(axis=(0, 1))
+        return {name: int(sums[i]) for i, name in enumerate(COUNTER_NAMES[:self.counters])}
+
+    def rate_per_minute(self, seconds: int) -> Dict[str, float]:
+        """Returns each counter's average rate per minute over the last `seconds` seconds."""
+        return {name: n * 60 / seconds for name, n in self.window_totals(seconds).items()}
+
+
+passenger_stats = SharedStats(settings.stats_path, slots=settings.stats_slots)
@@ -0,0 +1,36 @@
+from app.core.storage.base import PassengerStore
+from app.core.storage.cache import CachedStore
+from app.core.storage.journaled import JournaledStore
+from app.core.storage.memory_store import MemoryStore
+from app.core.storage.supabase_store import SupabaseStore
+from app.core.storage.write_behind import WriteBehindStore
+
+__all__ = [
+    "PassengerStore",
+    "CachedStore",
+    "JournaledStore",
+    "MemoryStore",
+    "SupabaseStore",
+    "WriteBehindStore",
+    "create_store",
+]
+
+
+def create_store(settings) -> PassengerStore:
+    """Builds the passenger store selected by `settings.storage_backend`."""
+    if settings.storage_backend == "supabase":
+        from supabase import create_client
+
+        if not settings.supabase_url or not settings.supabase_key:
+            raise ValueError("TRAINSIM_SUPABASE_URL and TRAINSIM_SUPABASE_KEY are required for the supabase backend")
+        client = create_client(settings.supabase_url, settings.supabase_key)
+        return SupabaseStore(
+            client,
+            max_workers=settings.db_max_workers,
+            max_reads=settings.db_max_read_concurrency,
+            max_writes=settings.db_max_write_concurrency,
+        )
+    if settings.storage_backend == "memory":
+        stations = {f"station-{i}": f"Station {i}" for i in range(1, settings.memory_station_count + 1)}
+        return MemoryStore(stations)
+    raise ValueError(f"Unknown storage backend: {settings.storage_backend!r}")
@@ -0,0 +1,115 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence
+
+from app.simulation.patience import to_epoch
+
+
+class PassengerStore(ABC):
+    """Storage interface behind the functions in `app.core.database`.
+
+    Implementations work on plain row dictionaries (the same shape as the
+    `passengers` table); validation into Pydantic models happens above them.
+    """
+
+    @abstractmethod
+    async def get_all_passengers(self) -> List[Dict]:
+        """Returns every passenger row."""
+
+    @abstractmethod
+    async def get_passenger(self, passenger_id: str) -> Optional[Dict]:
+        """Returns a passenger row by ID, or None."""
+
+    @abstractmethod
+    async def find_passengers(
+            self,
+            status: Optional[str] = None,
+            station_id: Optional[str] = None,
+            train_id: Optional[str] = None,
+    ) -> List[Dict]:
+        """Returns the passengers matching all of the given filters."""
+
+    @abstractmethod
+    async def list_passengers(
+            self,
+            status: Optional[str] = None,
+            station_id: Optional[str] = None,
+            train_id: Optional[str] = None,
+            after: Optional[str] = None,
+            limit: int = 1000,
+            fields: Optional[Sequence[str]] = None,
+    ) -> List[Dict]:
+        """Returns one page of matching passengers ordered by ID (keyset pagination).
+
+        Only rows with an ID greater than `after` are returned. `fields`
+        limits the returned columns; `id` is always included.
+        """
+
+    @abstractmethod
+    async def create_passenger(self, data: Dict) -> Dict:
+        """Inserts one passenger and returns the stored row."""
+
+    @abstractmethod
+    async def insert_passengers(self, rows: List[Dict]) -> List[Dict]:
+        """Inserts many passengers in one operation and returns the stored rows."""
+
+    @abstractmethod
+    async def update_passenger(self, passenger_id: str, data: Dict) -> Optional[Dict]:
+        """Applies a partial update and returns the new row, or None if missing."""
+
+    @abstractmethod
+    async def delete_passenger(self, passenger_id: str) -> Optional[Dict]:
+        """Deletes a passenger and returns the deleted row, or None if missing."""
+
+    @abstractmethod
+    async def transition_passengers(self, passenger_ids: List[str], from_status: str, data: Dict) -> List[Dict]:
+        """Applies `data` to every listed passenger currently in `from_status`, in one operation.
+
+        Returns the updated rows; passengers that are missing or in another
+        status are left untouched.
+        """
+
+    @abstractmethod
+    async def get_passenger_statuses(self, passenger_ids: List[str]) -> Dict[str, str]:
+        """Returns the current status of each listed passenger that exists."""
+
+    @abstractmethod
+    async def expire_passengers(self, passenger_ids: List[str]) -> List[Dict]:
+        """Marks still-waiting passengers impatient, deletes them and returns their rows."""
+
+    @abstractmethod
+    async def get_station_ids(self) -> List[str]:
+        """Returns all station IDs."""
+
+    @abstractmethod
+    async def get_station_names(self) -> Dict[str, str]:
+        """Returns a mapping of station ID to station name."""
+
+    async def get_waiting_passengers(self, since: Optional[str] = None) -> List[Dict]:
+        """Returns waiting passengers, only those spawned at or after `since` if given."""
+        rows = await self.find_passengers(status="waiting")
+        if since is not None:
+            since_epoch = to_epoch(since)
+            rows = [row for row in rows if to_epoch(row["spawn_time"]) >= since_epoch]
+        return rows
+
+    async def update_passengers(self, passenger_ids: List[str], data: Dict) -> int:
+        """Applies the same partial update to every listed passenger; returns how many were updated."""
+        updated = 0
+        for passenger_id in passenger_ids:
+            if await self.update_passenger(passenger_id, data):
+                updated += 1
+        return updated
+
+    async def delete_passengers(self, passenger_ids: List[str]) -> int:
+        """Deletes the listed passengers; returns how many existed."""
+        deleted = 0
+        for passenger_id in passenger_ids:
+            if await self.delete_passenger(passenger_id):
+                deleted += 1
+        return deleted
+
+    async def flush(self) -> None:
+        """Writes out any buffered writes (a no-op for stores that write through)."""
+
+    def close(self) -> None:
+        """Releases any resources held by the store."""
@@ -0,0 +1,188 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from app.core.storage.base import PassengerStore
+
+
+class CachedStore(PassengerStore):
+    """Read-through LRU cache for `get_passenger` in front of another store.
+
+    Up to `max_size` rows (including "not found" answers) are kept for at
+    most `ttl` seconds. Every write that goes through this store drops or
+    refreshes exactly the rows it touched, so within a process the cache
+    never serves a row older than the last write. Changes made by other
+    processes show up once the entry expires.
+
+    Concurrent misses for the same ID share one storage query. A write that
+    lands while such a query is running keeps its (possibly older) result
+    out of the cache.
+    """
+
+    def __init__(self, store: PassengerStore, max_size: int = 10000, ttl: float = 1.0):
+        self.store = store
+        self.max_size = max_size
+        self.ttl = ttl
+        self._rows: "OrderedDict[str, Tuple[float, Optional[Dict]]]" = OrderedDict()  # ID -> (expiry, row)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._stale: Set[str] = set()  # In-flight misses invalidated by a write
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0  # Misses answered by another caller's query
+        self.evictions = 0  # Dropped to stay within `max_size`
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._rows),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
+
+    # --- Cache maintenance ---
+
+    def _put(self, passenger_id: str, row: Optional[Dict]) -> None:
+        self._rows[passenger_id] = (time.monotonic() + self.ttl, row)
+        self._rows.move_to_end(passenger_id)
+        while len(self._rows) > self.max_size:
+            self._rows.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, passenger_ids: Iterable[str]) -> None:
+        for passenger_id in passenger_ids:
+            if self._rows.pop(passenger_id, None) is not None:
+                self.invalidations += 1
+            if passenger_id in self._inflight:
+                self._stale.add(passenger_id)
+
+    def clear(self) -> None:
+        self._stale.update(self._inflight)
+        self._rows.clear()
+
+    # --- Reads ---
+
+    async def get_passenger(self, passenger_id: str) -> Optional[Dict]:
+        entry = self._rows.get(passenger_id)
+        if entry is not None:
+            expires, row = entry
+            if expires > time.monotonic():
+                self.hits += 1
+                self._rows.move_to_end(passenger_id)
+                return dict(row) if row is not None else None
+            del self._rows[passenger_id]
+            self.expirations += 1
+
+        task = self._inflight.get(passenger_id)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = self._inflight[passenger_id] = asyncio.ensure_future(self._fetch(passenger_id))
+        # Shielded: a caller giving up does not cancel the query the others are waiting for.
+        row = await asyncio.shield(task)
+        return dict(row) if row is not None else None
+
+    async def _fetch(self, passenger_id: str) -> Optional[Dict]:
+        try:
+            row = await self.store.get_passenger(passenger_id)
+            if passenger_id not in self._stale:
+                self._put(passenger_id, row)
+            return row
+        finally:
+            del self._inflight[passenger_id]
+            self._stale.discard(passenger_id)
+
+    async def get_all_passengers(self) -> List[Dict]:
+        return await self.store.get_all_passengers()
+
+    async def find_passengers(
+            self,
+            status: Optional[str] = None,
+            station_id: Optional[str] = None,
+            train_id: Optional[str] = None,
+    ) -> List[Dict]:
+        return await self.store.find_passengers(status=status, station_id=station_id, train_id=train_id)
+
+    async def list_passengers(
+            self,
+            status: Optional[str] = None,
+            station_id: Optional[str] = None,
+            train_id: Optional[str] = None,
+            after: Optional[str] = None,
+            limit: int = 1000,
+            fields: Optional[Sequence[str]] = None,
+    ) -> List[Dict]:
+        return await self.store.list_passengers(
+            status=status, station_id=station_id, train_id=train_id, after=after, limit=limit, fields=fields
+        )
+
+    async def get_waiting_passengers(self, since: Optional[str] = None) -> List[Dict]:
+        return await self.store.get_waiting_passengers(since)
+
+    async def get_passenger_statuses(self, passenger_ids: List[str]) -> Dict[str, str]:
+        return await self.store.get_passenger_statuses(passenger_ids)
+
+    async def get_station_ids(self) -> List[str]:
+        return await self.store.get_station_ids()
+
+    async def get_station_names(self) -> Dict[str, str]:
+        return await self.store.get_station_names()
+
+    # --- Writes (invalidate what they touch) ---
+    # Entries are dropped before the write and again once it returns, which also discards
+    # misses that were in flight meanwhile. Written rows are not cached: bulk inserts and
+    # transitions would otherwise push the rows that are actually being polled out.
+
+    async def _write(self, passenger_ids: List[str], call, *args):
+        self.invalidate(passenger_ids)
+        try:
+            return await call(*args)
+        finally:
+            self.invalidate(passenger_ids)
+
+    async def create_passenger(self, data: Dict) -> Dict:
+        row = await self._write([data["id"]] if data.get("id") else [], self.store.create_passenger, data)
+        self.invalidate([row["id"]])
+        return row
+
+    async def insert_passengers(self, rows: List[Dict]) -> List[Dict]:
+        stored = await self._write([row["id"] for row in rows if row.get("id")], self.store.insert_passengers, rows)
+        self.invalidate(row["id"] for row in stored)  # IDs filled in by the store
+        return stored
+
+    async def update_passenger(self, passenger_id: str, data: Dict) -> Optional[Dict]:
+        return await self._write([passenger_id], self.store.update_passenger, passenger_id, data)
+
+    async def update_passengers(self, passenger_ids: List[str], data: Dict) -> int:
+        return await self._write(passenger_ids, self.store.update_passengers, passenger_ids, data)
+
+    async def delete_passenger(self, passenger_id: str) -> Optional[Dict]:
+        return await self._write([passenger_id], self.store.delete_passenger, passenger_id)
+
+    async def delete_passengers(self, passenger_ids: List[str]) -> int:
+        return await self._write(passenger_ids, self.store.delete_passengers, passenger_ids)
+
+    async def transition_passengers(self, passenger_ids: List[str], from_status: str, data: Dict) -> List[Dict]:
+        return await self._write(passenger_ids, self.store.transition_passengers, passenger_ids, from_status, data)
+
+    async def expire_passengers(self, passenger_ids: List[str]) -> List[Dict]:
+        return await self._write(passenger_ids, self.store.expire_passengers, passenger_ids)
+
+    async def flush(self) -> None:
+        await self.store.flush()
+
+    def close(self) -> None:
+        self.store.close()
@@ -0,0 +1,119 @@
+from typing import Dict, List, Optional, Sequence
+
+from app.core.journal import DELETE, INSERT, UPDATE, PassengerJournal
+from app.core.storage.base import PassengerStore
+
+
+class JournaledStore(PassengerStore):
+    """Appends every successful write to a `PassengerJournal` in front of another store.
+
+    Writes are logged by their effect rather than by the call: inserts with
+    the stored rows (IDs and timestamps filled in), transitions as updates of
+    the passengers that actually moved, expiries as deletes of the ones that
+    actually expired. Replaying the journal with `apply_record` therefore
+    reproduces the same table, whatever store it is replayed into.
+    """
+
+    def __init__(self, store: PassengerStore, journal: PassengerJournal):
+        self.store = store
+        self.journal = journal
+
+    # --- Reads ---
+
+    async def get_all_passengers(self) -> List[Dict]:
+        return await self.store.get_all_passengers()
+
+    async def get_passenger(self, passenger_id: str) -> Optional[Dict]:
+        return await self.store.get_passenger(passenger_id)
+
+    async def find_passengers(
+            self,
+            status: Optional[str] = None,
+            station_id: Optional[str] = None,
+            train_id: Optional[str] = None,
+    ) -> List[Dict]:
+        return await self.store.find_passengers(status=status, station_id=station_id, train_id=train_id)
+
+    async def list_passengers(
+            self,
+            status: Optional[str] = None,
+            station_id: Optional[str] = None,
+            train_id: Optional[str] = None,
+            after: Optional[str] = None,
+            limit: int = 1000,
+            fields: Optional[Sequence[str]] = None,
+    ) -> List[Dict]:
+        return await self.store.list_passengers(
+            status=status, station_id=station_id, train_id=train_id, after=after, limit=limit, fields=fields
+        )
+
+    async def get_waiting_passengers(self, since: Optional[str] = None) -> List[Dict]:
+        return await self.store.get_waiting_passengers(since)
+
+    async def get_passenger_statuses(self, passenger_ids: List[str]) -> Dict[str, str]:
+        return await self.store.get_passenger_statuses(passenger_ids)
+
+    async def get_station_ids(self) -> List[str]:
+        return await self.store.get_station_ids()
+
+    async def get_station_names(self) -> Dict[str, str]:
+        return await self.store.get_station_names()
+
+    # --- Writes (logged once they succeed) ---
+
+    async def create_passenger(self, data: Dict) -> Dict:
+        row = await self.store.create_passenger(data)
+        self.journal.append(INSERT, rows=[row])
+        return row
+
+    async def insert_passengers(self, rows: List[Dict]) -> List[Dict]:
+        stored = await self.store.insert_passengers(rows)
+        if stored:
+            self.journal.append(INSERT, rows=stored)
+        return stored
+
+    async def update_passenger(self, passenger_id: str, data: Dict) -> Optional[Dict]:
+        row = await self.store.update_passenger(passenger_id, data)
+        if row is not None:
+            self.journal.append(UPDATE, ids=[passenger_id], data=data)
+        return row
+
+    async def update_passengers(self, passenger_ids: List[str], data: Dict) -> int:
+        count = await self.store.update_passengers(passenger_ids, data)
+        if count:
+            self.journal.append(UPDATE, ids=passenger_ids, data=data)  # Missing IDs are skipped on replay too
+        return count
+
+    async def transition_passengers(self, passenger_ids: List[str], from_status: str, data: Dict) -> List[Dict]:
+        updated = await self.store.transition_passengers(passenger_ids, from_status, data)
+        if updated:
+            self.journal.append(UPDATE, ids=[row["id"] for row in updated], data=data)
+        return updated
+
+    async def delete_passenger(self, passenger_id: str) -> Optional[Dict]:
+        row = await self.store.delete_passenger(passenger_id)
+        if row is not None:
+            self.journal.append(DELETE, ids=[passenger_id])
+        return row
+
+    async def delete_passengers(self, passenger_ids: List[str]) -> int:
+        count = await self.store.delete_passengers(passenger_ids)
+        if count:
+            self.journal.append(DELETE, ids=passenger_ids)
+        return count
+
+    async def expire_passengers(self, passenger_ids: List[str]) -> List[Dict]:
+        expired = await self.store.expire_passengers(passenger_ids)
+        if expired:
+            self.journal.append(DELETE, ids=[row["id"] for row in expired])
+        return expired
+
+    async def flush(self) -> None:
+        await self.store.flush()
+        self.journal.flush()
+
+    def close(self) -> None:
+        try:
+            self.journal.close()
+        finally:
+            self.store.close()
@@ -0,0 +1,399 @@
+import bisect
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from itertools import islice
+
+import numpy as np
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from app.core.storage.base import PassengerStore
+from app.simulation.patience import to_epoch
+from app.simulation.table import NONE_CODE, STATUS_CODES, PassengerTable
+
+# Columns of the `passengers` table and the defaults the database would fill in.
+PASSENGER_DEFAULTS = {
+    "first_name": None,
+    "last_name": None,
+    "age": None,
+    "ticket_type": None,
+    "luggage_size": None,
+    "email": None,
+    "phone_number": None,
+    "patience": None,
+    "status": "waiting",
+    "current_station_id": None,
+    "train_id": None,
+    "board_time": None,
+    "arrival_time": None,
+}
+
+INSERT_LOG_RETENTION = 3600  # Seconds of insert history kept for incremental reads
+
+# Columns with a secondary index (every column the store filters on).
+INDEXED_COLUMNS = ("status", "current_station_id", "train_id")
+
+WAITING = STATUS_CODES["waiting"]
+
+
+class SortedIds:
+    """A set of passenger IDs that can also be walked in ID order from a cursor.
+
+    New IDs are buffered and merged into the sorted list on the next walk,
+    and removed IDs stay in the list (skipped on the way) until they make up
+    half of it, so adding and removing are O(1) and a page costs O(limit).
+    """
+
+    def __init__(self, ids: Iterable[str] = ()):
+        self.members: Set[str] = set(ids)
+        self._sorted: List[str] = []
+        self._unsorted: List[str] = list(self.members)
+        self._stale: Set[str] = set()  # Removed, but still in one of the lists
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def __contains__(self, passenger_id: str) -> bool:
+        return passenger_id in self.members
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.members)
+
+    def add(self, passenger_id: str) -> None:
+        if passenger_id in self.members:
+            return
+        self.members.add(passenger_id)
+        if passenger_id in self._stale:
+            self._stale.discard(passenger_id)  # Still in the lists
+        else:
+            self._unsorted.append(passenger_id)
+
+    def discard(self, passenger_id: str) -> None:
+        if passenger_id in self.members:
+            self.members.discard(passenger_id)
+            self._stale.add(passenger_id)
+
+    def ordered(self) -> List[str]:
+        """Returns the sorted list, merging new IDs and dropping removed ones if due (may hold removed IDs)."""
+        if self._unsorted:
+            self._sorted.extend(self._unsorted)
+            self._sorted.sort()  # Two sorted runs: timsort merges them in linear time
+            self._unsorted = []
+        if len(self._stale) > len(self._sorted) // 2:
+            self._sorted = [pid for pid in self._sorted if pid in self.members]
+            self._stale = set()
+        return self._sorted
+
+    def after(self, cursor: Optional[str] = None) -> Iterator[str]:
+        """Yields the IDs in order, starting after `cursor`."""
+        ordered = self.ordered()
+        members = self.members
+        for i in range(bisect.bisect_right(ordered, cursor) if cursor is not None else 0, len(ordered)):
+            if ordered[i] in members:
+                yield ordered[i]
+
+
+NO_IDS = SortedIds()
+Plan = Tuple[SortedIds, List[Tuple[str, int]]]  # Candidate IDs, (column, code) checks left for the other filters
+
+
+class MemoryStore(PassengerStore):
+    """In-process passenger store with secondary indexes.
+
+    Rows live in a `PassengerTable` (compact NumPy columns, decoded to dicts
+    on the way out); `status`, `current_station_id` and `train_id` each have
+    a code -> `SortedIds` index, so lookups such as "waiting at station X"
+    cost O(result) rather than a scan of the table. A filtered page walks
+    the smallest matching index from the cursor and checks the remaining
+    filters against the table's code columns a chunk at a time, so it costs
+    O(limit) when one index selects the passengers.
+
+    For unfiltered keyset pagination all IDs are kept in a sorted list
+    maintained the same way as `SortedIds`: new IDs are buffered and merged
+    in on the next page read, and deleted IDs are skipped until they make up
+    half of the list, so writes stay O(1).
+    """
+
+    def __init__(self, stations: Optional[Dict[str, str]] = None):
+        self._table = PassengerTable()
+        self._indexes: Dict[str, Dict[int, SortedIds]] = {
+            column: defaultdict(SortedIds) for column in INDEXED_COLUMNS
+        }
+        self._stations: Dict[str, str] = dict(stations or {})
+        self._sorted_ids: List[str] = []
+        self._unsorted_ids: List[str] = []
+        self._deleted_ids: Set[str] = set()
+        # Insert times and IDs in insert order, for incremental waiting reads.
+        self._insert_times: List[float] = []
+        self._insert_ids: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    # --- Stations ---
+
+    def add_station(self, station_id: str, name: str) -> None:
+        self._stations[station_id] = name
+
+    async def get_station_ids(self) -> List[str]:
+        return list(self._stations)
+
+    async def get_station_names(self) -> Dict[str, str]:
+        return dict(self._stations)
+
+    # --- Snapshots ---
+
+    def export(self) -> Dict:
+        """Copies the passengers for a snapshot (see `PassengerTable.export`)."""
+        return self._table.export()
+
+    def restore(self, table: PassengerTable) -> None:
+        """Replaces the stored passengers with `table` and rebuilds the indexes."""
+        size = table.size
+        live = table.status[:size] != NONE_CODE
+        indexes: Dict[str, Dict[int, SortedIds]] = {}
+        for column in INDEXED_COLUMNS:
+            codes = getattr(table, column)[:size]
+            slots = np.flatnonzero(live & (codes != NONE_CODE))  # None is never indexed
+            order = slots[np.argsort(codes[slots], kind="stable")]
+            values, starts = np.unique(codes[order], return_index=True)
+            index = indexes[column] = defaultdict(SortedIds)
+            for code, group in zip(values.tolist(), np.split(order, starts[1:]) if len(order) else []):
+                index[code] = SortedIds(table.ids_at(group))  # Sorted on the first walk
+        self._table = table
+        self._indexes = indexes
+        self._sorted_ids = []
+        self._unsorted_ids = list(table.index)  # Sorted on the first page read
+        self._deleted_ids = set()
+        self._insert_times = []  # Incremental reads start over; the first read after a restart is a full one
+        self._insert_ids = []
+
+    # --- Index maintenance ---
+
+    def _index(self, passenger_id: str, slot: int) -> None:
+        for column in INDEXED_COLUMNS:
+            code = int(getattr(self._table, column)[slot])
+            if code != NONE_CODE:  # Filters never ask for None
+                self._indexes[column][code].add(passenger_id)
+
+    def _unindex(self, passenger_id: str, slot: int) -> None:
+        for column in INDEXED_COLUMNS:
+            code = int(getattr(self._table, column)[slot])
+            ids = self._indexes[column].get(code)
+            if ids is not None:
+                ids.discard(passenger_id)
+                if not ids:
+                    del self._indexes[column][code]
+
+    def _store(self, rows: List[Dict]) -> List[Dict]:
+        """Fills in database defaults, appends the rows to the table and returns them as stored."""
+        now = datetime.now(timezone.utc).isoformat()
+        prepared = []
+        for data in rows:
+            row = {**PASSENGER_DEFAULTS, **data}
+            if row.get("id") is None:
+                row["id"] = str(uuid.uuid4())
+            if row.get("spawn_time") is None:
+                row["spawn_time"] = now
+            if row.get("current_station_id") is None:
+                row["current_station_id"] = row.get("origin_station_id")
+            prepared.append(row)
+        slots = self._table.append(prepared)  # Raises on duplicate IDs before storing anything
+        inserted_at = time.time()
+        for row, slot in zip(prepared, slots.tolist()):
+            passenger_id = row["id"]
+            self._index(passenger_id, slot)
+            self._insert_times.append(inserted_at)
+            self._insert_ids.append(passenger_id)
+            if passenger_id in self._deleted_ids:
+                self._deleted_ids.discard(passenger_id)  # Still present in the sorted list
+            else:
+                self._unsorted_ids.append(passenger_id)
+        return self._table.rows(slots)
+
+    def _status(self, slot: int) -> int:
+        return int(self._table.status[slot])
+
+    def _forget(self, passenger_id: str) -> None:
+        self._deleted_ids.add(passenger_id)
+
+    def _ordered_ids(self) -> List[str]:
+        """Returns the sorted ID list, merging new IDs and dropping deleted ones if due."""
+        if self._unsorted_ids:
+            self._sorted_ids.extend(self._unsorted_ids)
+            self._sorted_ids.sort()  # Two sorted runs: timsort merges them in linear time
+            self._unsorted_ids = []
+        if len(self._deleted_ids) > len(self._sorted_ids) // 2:
+            self._sorted_ids = [pid for pid in self._sorted_ids if pid not in self._deleted_ids]
+            self._deleted_ids = set()
+        return self._sorted_ids
+
+    # --- Reads ---
+
+    async def get_all_passengers(self) -> List[Dict]:
+        return self._table.rows(self._table.live_slots())
+
+    async def get_passenger(self, passenger_id: str) -> Optional[Dict]:
+        return self._table.get(passenger_id)
+
+    def _plan(self, filters: Dict[str, Optional[str]]) -> Optional[Plan]:
+        """Picks the smallest index matching `filters` and the checks left for the others (None: no filter)."""
+        if not filters:
+            return None
+        candidates, codes = None, []
+        for column, value in filters.items():
+            code = self._table.pool(column).lookup(value)
+            ids = self._indexes[column].get(code) if code is not None else None
+            if ids is None:
+                return NO_IDS, []  # A value no live passenger has
+            codes.append((column, code, ids))
+            if candidates is None or len(ids) < len(candidates):
+                candidates = ids
+        return candidates, [(column, code) for column, code, ids in codes if ids is not candidates]
+
+    def _check(self, slots: np.ndarray, checks: List[Tuple[str, int]]) -> np.ndarray:
+        """Keeps the slots whose codes match every check."""
+        for column, code in checks:
+            slots = slots[getattr(self._table, column)[slots] == code]
+        return slots
+
+    def _walk(self, plan: Plan, after: Optional[str], limit: int) -> List[int]:
+        """Returns the slots of the first `limit` matching passengers after `after`, in ID order."""
+        candidates, checks = plan
+        index = self._table.index
+        walk = candidates.after(after)
+        chunk_size = max(limit, 1024) if checks else limit
+        slots: List[int] = []
+        while len(slots) < limit:
+            chunk = np.array([index[pid] for pid in islice(walk, chunk_size)], dtype=np.int64)
+            if not len(chunk):
+                break
+            slots.extend(self._check(chunk, checks).tolist())
+        return slots[:limit]
+
+    async def find_passengers(
+            self,
+            status: Optional[str] = None,
+            station_id: Optional[str] = None,
+            train_id: Optional[str] = None,
+    ) -> List[Dict]:
+        filters = {
+            column: value
+            for column, value in (("status", status), ("current_station_id", station_id), ("train_id", train_id))
+            if value is not None
+        }
+        plan = self._plan(filters)
+        if plan is None:
+            return await self.get_all_passengers()
+        candidates, checks = plan
+        index = self._table.index
+        slots = np.fromiter((index[pid] for pid in candidates), dtype=np.int64, count=len(candidates))
+        return self._table.rows(self._check(slots, checks))
+
+    async def list_passengers(
+            self,
+            status: Optional[str] = None,
+            station_id: Optional[str] = None,
+            train_id: Optional[str] = None,
+            after: Optional[str] = None,
+            limit: int = 1000,
+            fields: Optional[Sequence[str]] = None,
+    ) -> List[Dict]:
+        filters = {
+            column: value
+            for column, value in (("status", status), ("current_station_id", station_id), ("train_id", train_id))
+            if value is not None
+        }
+        plan = self._plan(filters)
+        if plan is not None:
+            # Filtered: walk the smallest index from the cursor.
+            return self._table.rows(self._walk(plan, after, limit), fields or None)
+        # No filter: walk the sorted ID list from the cursor.
+        ordered = self._ordered_ids()
+        index = self._table.index
+        slots = []
+        for i in range(bisect.bisect_right(ordered, after) if after is not None else 0, len(ordered)):
+            slot = index.get(ordered[i])
+            if slot is not None:
+                slots.append(slot)
+                if len(slots) == limit:
+                    break
+        return self._table.rows(slots, fields or None)
+
+    async def get_waiting_passengers(self, since: Optional[str] = None) -> List[Dict]:
+        if since is None:
+            return await self.find_passengers(status="waiting")
+        # Incremental read: walk the insert log from `since`, keeping an hour of history.
+        expired = bisect.bisect_left(self._insert_times, time.time() - INSERT_LOG_RETENTION)
+        if expired:
+            del self._insert_times[:expired]
+            del self._insert_ids[:expired]
+        start = bisect.bisect_left(self._insert_times, to_epoch(since))
+        slots = []
+        for passenger_id in self._insert_ids[start:]:
+            slot = self._table.slot(passenger_id)
+            if slot is not None and self._status(slot) == WAITING:
+                slots.append(slot)
+        return self._table.rows(slots)
+
+    # --- Writes ---
+
+    async def create_passenger(self, data: Dict) -> Dict:
+        return self._store([data])[0]
+
+    async def insert_passengers(self, rows: List[Dict]) -> List[Dict]:
+        return self._store(rows)
+
+    def _update(self, passenger_id: str, slot: int, data: Dict) -> None:
+        self._unindex(passenger_id, slot)
+        try:
+            self._table.update(slot, data)
+        finally:
+            self._index(passenger_id, slot)
+
+    async def update_passenger(self, passenger_id: str, data: Dict) -> Optional[Dict]:
+        slot = self._table.slot(passenger_id)
+        if slot is None:
+            return None
+        self._update(passenger_id, slot, data)
+        return self._table.row(slot)
+
+    def _remove(self, passenger_id: str, slot: int) -> Dict:
+        row = self._table.row(slot)
+        self._unindex(passenger_id, slot)
+        self._table.remove_slots([slot])
+        self._forget(passenger_id)
+        return row
+
+    async def delete_passenger(self, passenger_id: str) -> Optional[Dict]:
+        slot = self._table.slot(passenger_id)
+        if slot is None:
+            return None
+        return self._remove(passenger_id, slot)
+
+    async def transition_passengers(self, passenger_ids: List[str], from_status: str, data: Dict) -> List[Dict]:
+        from_code = STATUS_CODES[from_status]
+        updated = []
+        for passenger_id in passenger_ids:
+            slot = self._table.slot(passenger_id)
+            if slot is None or self._status(slot) != from_code:
+                continue
+            self._update(passenger_id, slot, data)
+            updated.append(slot)
+        return self._table.rows(updated)
+
+    async def get_passenger_statuses(self, passenger_ids: List[str]) -> Dict[str, str]:
+        slots = {pid: self._table.slot(pid) for pid in passenger_ids}
+        return {pid: self._table.value(slot, "status") for pid, slot in slots.items() if slot is not None}
+
+    async def expire_passengers(self, passenger_ids: List[str]) -> List[Dict]:
+        expired = []
+        for passenger_id in passenger_ids:
+            slot = self._table.slot(passenger_id)
+            if slot is None or self._status(slot) != WAITING:
+                continue
+            row = self._remove(passenger_id, slot)
+            row["status"] = "impatient"
+            expired.append(row)
+        return expired
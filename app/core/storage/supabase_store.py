@@ -0,0 +1,178 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence
+
+from supabase import Client
+
+from app.core.storage.base import PassengerStore
+
+IN_CHUNK_SIZE = 200  # Keeps `in.(...)` filters well under URL length limits
+PAGE_SIZE = 1000  # PostgREST cuts responses off at `max-rows` (1000 on Supabase), so long reads are paged
+# Columns the patience scheduler and the simulation engine need from waiting passengers.
+WAITING_COLUMNS = "id, spawn_time, patience, status, origin_station_id, current_station_id, destination_station_id"
+
+
+class SupabaseStore(PassengerStore):
+    """Passenger store backed by the Supabase `passengers` and `stations` tables.
+
+    The Supabase client is synchronous, so every `execute()` runs in a bounded
+    thread pool. Reads and writes get separate limits so a burst of inserts
+    cannot starve lookups (and vice versa).
+    """
+
+    def __init__(self, client: Client, max_workers: int = 32, max_reads: int = 24, max_writes: int = 8):
+        self.client = client
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="supabase")
+        self._limits = {
+            "read": asyncio.Semaphore(max_reads),
+            "write": asyncio.Semaphore(max_writes),
+        }
+
+    async def run_query(self, query, kind: str = "read"):
+        """Executes a PostgREST query builder off the event loop."""
+        async with self._limits[kind]:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, query.execute)
+
+    def _passengers(self):
+        return self.client.table("passengers")
+
+    @staticmethod
+    def _filtered(query, status: Optional[str], station_id: Optional[str], train_id: Optional[str]):
+        if status is not None:
+            query = query.eq("status", status)
+        if station_id is not None:
+            query = query.eq("current_station_id", station_id)
+        if train_id is not None:
+            query = query.eq("train_id", train_id)
+        return query
+
+    async def _select_all(self, columns: str, where: Callable = lambda query: query) -> List[Dict]:
+        """Reads every matching passenger in pages ordered by ID, until a page comes back empty.
+
+        A page can be shorter than `PAGE_SIZE` if the server's row cap is
+        lower, so only an empty page means the end.
+        """
+        rows: List[Dict] = []
+        after = None
+        while True:
+            query = where(self._passengers().select(columns))
+            if after is not None:
+                query = query.gt("id", after)
+            page = (await self.run_query(query.order("id").limit(PAGE_SIZE))).data
+            if not page:
+                return rows
+            rows.extend(page)
+            after = page[-1]["id"]
+
+    async def get_all_passengers(self) -> List[Dict]:
+        return await self._select_all("*")
+
+    async def get_passenger(self, passenger_id: str) -> Optional[Dict]:
+        data = await self.run_query(self._passengers().select("*").eq("id", passenger_id))
+        return data.data[0] if data.data else None
+
+    async def find_passengers(
+            self,
+            status: Optional[str] = None,
+            station_id: Optional[str] = None,
+            train_id: Optional[str] = None,
+    ) -> List[Dict]:
+        return await self._select_all("*", lambda query: self._filtered(query, status, station_id, train_id))
+
+    async def list_passengers(
+            self,
+            status: Optional[str] = None,
+            station_id: Optional[str] = None,
+            train_id: Optional[str] = None,
+            after: Optional[str] = None,
+            limit: int = 1000,
+            fields: Optional[Sequence[str]] = None,
+    ) -> List[Dict]:
+        columns = ", ".join(dict.fromkeys(["id", *fields])) if fields else "*"
+        query = self._filtered(self._passengers().select(columns), status, station_id, train_id)
+        if after is not None:
+            query = query.gt("id", after)
+        data = await self.run_query(query.order("id").limit(limit))
+        return data.data
+
+    async def get_waiting_passengers(self, since: Optional[str] = None) -> List[Dict]:
+        def where(query):
+            query = query.eq("status", "waiting")
+            return query.gte("spawn_time", since) if since is not None else query
+
+        return await self._select_all(WAITING_COLUMNS, where)
+
+    async def create_passenger(self, data: Dict) -> Dict:
+        result = await self.run_query(self._passengers().insert(data), "write")
+        return result.data[0]
+
+    async def insert_passengers(self, rows: List[Dict]) -> List[Dict]:
+        result = await self.run_query(self._passengers().insert(rows), "write")
+        return result.data
+
+    async def update_passenger(self, passenger_id: str, data: Dict) -> Optional[Dict]:
+        result = await self.run_query(self._passengers().update(data).eq("id", passenger_id), "write")
+        return result.data[0] if result.data else None
+
+    async def delete_passenger(self, passenger_id: str) -> Optional[Dict]:
+        result = await self.run_query(self._passengers().delete().eq("id", passenger_id), "write")
+        return result.data[0] if result.data else None
+
+    async def transition_passengers(self, passenger_ids: List[str], from_status: str, data: Dict) -> List[Dict]:
+        updated = []
+        for start in range(0, len(passenger_ids), IN_CHUNK_SIZE):
+            chunk = passenger_ids[start:start + IN_CHUNK_SIZE]
+            result = await self.run_query(
+                self._passengers().update(data).in_("id", chunk).eq("status", from_status), "write"
+            )
+            updated.extend(result.data)
+        return updated
+
+    async def get_passenger_statuses(self, passenger_ids: List[str]) -> Dict[str, str]:
+        statuses = {}
+        for start in range(0, len(passenger_ids), IN_CHUNK_SIZE):
+            chunk = passenger_ids[start:start + IN_CHUNK_SIZE]
+            result = await self.run_query(self._passengers().select("id, status").in_("id", chunk))
+            statuses.update((item["id"], item["status"]) for item in result.data)
+        return statuses
+
+    async def update_passengers(self, passenger_ids: List[str], data: Dict) -> int:
+        updated = 0
+        for start in range(0, len(passenger_ids), IN_CHUNK_SIZE):
+            chunk = passenger_ids[start:start + IN_CHUNK_SIZE]
+            result = await self.run_query(self._passengers().update(data).in_("id", chunk), "write")
+            updated += len(result.data)
+        return updated
+
+    async def delete_passengers(self, passenger_ids: List[str]) -> int:
+        deleted = 0
+        for start in range(0, len(passenger_ids), IN_CHUNK_SIZE):
+            chunk = passenger_ids[start:start + IN_CHUNK_SIZE]
+            result = await self.run_query(self._passengers().delete().in_("id", chunk), "write")
+            deleted += len(result.data)
+        return deleted
+
+    async def expire_passengers(self, passenger_ids: List[str]) -> List[Dict]:
+        expired = []
+        for start in range(0, len(passenger_ids), IN_CHUNK_SIZE):
+            chunk = passenger_ids[start:start + IN_CHUNK_SIZE]
+            # The "impatient" status would be deleted straight away, so only the conditional
+            # delete goes to the database; the returned rows carry the status instead.
+            deleted = await self.run_query(
+                self._passengers().delete().in_("id", chunk).eq("status", "waiting"), "write"
+            )
+            for row in deleted.data:
+                row["status"] = "impatient"
+            expired.extend(deleted.data)
+        return expired
+
+    async def get_station_ids(self) -> List[str]:
+        data = await self.run_query(self.client.table("stations").select("id"))
+        return [item['id'] for item in data.data]
+
+    async def get_station_names(self) -> Dict[str, str]:
+        data = await self.run_query(self.client.table("stations").select("id, name"))
+        return {item['id']: item['name'] for item in data.data}
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,291 @@
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+
+import orjson
+
+from app.core.storage.base import PassengerStore
+from app.core.storage.memory_store import PASSENGER_DEFAULTS
+
+logger = logging.getLogger(__name__)
+
+INSERT = "insert"
+UPDATE = "update"
+DELETE = "delete"
+
+MAX_ATTEMPTS = 3  # Flushes a buffered write may fail before it is dropped
+
+
+@dataclass
+class PendingWrite:
+    """The net effect of the buffered writes to one passenger."""
+    kind: str  # INSERT (data is the full row), UPDATE (data is the changed columns) or DELETE
+    data: Optional[Dict] = None
+    attempts: int = 0
+
+
+def merge(older: PendingWrite, newer: PendingWrite) -> Optional[PendingWrite]:
+    """Combines two writes to the same passenger into one (None if they cancel out)."""
+    if older.kind == INSERT:
+        if newer.kind == DELETE:
+            return None  # Never reached storage: nothing to do
+        if newer.kind == UPDATE:
+            return PendingWrite(INSERT, {**older.data, **newer.data}, older.attempts)
+    if older.kind == UPDATE and newer.kind == UPDATE:
+        return PendingWrite(UPDATE, {**older.data, **newer.data}, older.attempts)
+    return newer  # UPDATE then DELETE -> DELETE; DELETE then INSERT is flushed in between
+
+
+class WriteBehindStore(PassengerStore):
+    """Buffers single-passenger writes in front of another store.
+
+    Creates, updates and deletes of single passengers are recorded per passenger and merged
+    (insert + update -> insert, update + delete -> delete, insert + delete ->
+    nothing), then written out every `interval` seconds or once
+    `max_batch` passengers are pending:
+    - all inserts in one bulk insert
+    - updates grouped by identical changes
+    - deletes in one bulk delete
+
+    Lookups by ID see the buffered writes (read-your-writes within this
+    process). Queries over many passengers and the conditional batch
+    operations flush first, so they always run against up-to-date storage.
+    Storage errors surface in the flush loop rather than in the request that
+    made the write; failed writes are retried up to `MAX_ATTEMPTS` times.
+    A failed delete is retried on its own, ahead of any later write to the
+    same passenger. Bulk inserts (generation) are already batched and go
+    straight to storage, so their failures reach the caller.
+    """
+
+    def __init__(self, store: PassengerStore, interval: float = 0.5, max_batch: int = 500):
+        self.store = store
+        self.interval = interval
+        self.max_batch = max_batch
+        self._pending: Dict[str, PendingWrite] = {}
+        self._inflight: Dict[str, PendingWrite] = {}  # Being flushed: still visible to lookups
+        self._failed_deletes: Dict[str, PendingWrite] = {}  # Retried before anything else
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.writes = 0  # Writes accepted
+        self.round_trips = 0  # Storage calls made by flushes
+
+    def __len__(self) -> int:
+        return len(self._pending) + len(self._failed_deletes)
+
+    # --- Buffering ---
+
+    def _start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _record(self, passenger_id: str, write: PendingWrite) -> None:
+        previous = self._pending.get(passenger_id)
+        if previous is not None and previous.kind == DELETE and write.kind == INSERT:
+            await self.flush()  # Re-created after a buffered delete: keep the two in order
+            previous = self._pending.get(passenger_id)
+        merged = merge(previous, write) if previous is not None else write
+        if merged is None:
+            del self._pending[passenger_id]
+        else:
+            self._pending[passenger_id] = merged
+        self.writes += 1
+        if len(self._pending) >= self.max_batch:
+            await self.flush()
+        else:
+            self._start()
+
+    def _buffered(self, passenger_id: str) -> Optional[PendingWrite]:
+        buffered = None
+        for write in (self._failed_deletes.get(passenger_id), self._inflight.get(passenger_id),
+                      self._pending.get(passenger_id)):
+            if write is not None:
+                buffered = write if buffered is None else merge(buffered, write) or PendingWrite(DELETE)
+        return buffered
+
+    # --- Flushing ---
+
+    async def _run(self) -> None:
+        while self._pending or self._failed_deletes:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Error flushing buffered passenger writes:")
+
+    async def flush(self) -> None:
+        """Writes out everything buffered so far."""
+        async with self._lock:
+            if self._failed_deletes:
+                await self._retry_deletes()
+            if not self._pending:
+                return
+            # Later writes to a passenger whose delete still fails wait for it.
+            held = {pid: self._pending.pop(pid) for pid in self._failed_deletes if pid in self._pending}
+            self._inflight, self._pending = self._pending, held
+            try:
+                await self._write(self._inflight)
+            finally:
+                self._inflight = {}
+
+    async def _retry_deletes(self) -> None:
+        deletes = dict(self._failed_deletes)  # Stay visible to lookups until they succeed
+        self.round_trips += 1
+        try:
+            await self.store.delete_passengers(list(deletes))
+        except Exception:
+            logger.exception(f"Error retrying {len(deletes)} buffered passenger deletes:")
+            for passenger_id, write in deletes.items():
+                write.attempts += 1
+                if write.attempts >= MAX_ATTEMPTS:
+                    logger.error(f"Dropping buffered delete of passenger {passenger_id} after {write.attempts} attempts")
+                    del self._failed_deletes[passenger_id]
+            return
+        for passenger_id in deletes:
+            del self._failed_deletes[passenger_id]
+
+    async def _write(self, writes: Dict[str, PendingWrite]) -> None:
+        inserts = {pid: write for pid, write in writes.items() if write.kind == INSERT}
+        deletes = {pid: write for pid, write in writes.items() if write.kind == DELETE}
+        updates: Dict[bytes, Dict[str, PendingWrite]] = defaultdict(dict)
+        for passenger_id, write in writes.items():
+            if write.kind == UPDATE:
+                updates[orjson.dumps(write.data, option=orjson.OPT_SORT_KEYS)][passenger_id] = write
+
+        if inserts:
+            await self._apply(inserts, self.store.insert_passengers, [write.data for write in inserts.values()])
+        for group in updates.values():
+            await self._apply(group, self.store.update_passengers, list(group), next(iter(group.values())).data)
+        if deletes:
+            await self._apply(deletes, self.store.delete_passengers, list(deletes))
+
+    async def _apply(self, writes: Dict[str, PendingWrite], call, *args) -> None:
+        self.round_trips += 1
+        try:
+            await call(*args)
+        except Exception:
+            logger.exception(f"Error writing {len(writes)} buffered passenger changes:")
+            self._requeue(writes)
+
+    def _requeue(self, writes: Dict[str, PendingWrite]) -> None:
+        for passenger_id, write in writes.items():
+            write.attempts += 1
+            if write.attempts >= MAX_ATTEMPTS:
+                logger.error(f"Dropping buffered {write.kind} of passenger {passenger_id} after {write.attempts} attempts")
+                continue
+            if write.kind == DELETE:
+                # Merging would let a newer insert or update replace it; keep it apart instead.
+                self._failed_deletes[passenger_id] = write
+                continue
+            newer = self._pending.get(passenger_id)
+            merged = merge(write, newer) if newer is not None else write
+            if merged is None:
+                self._pending.pop(passenger_id, None)
+            else:
+                self._pending[passenger_id] = merged
+        self._start()  # Retried by the flush loop even if nothing else is written
+
+    # --- Single-passenger writes (buffered) ---
+
+    async def create_passenger(self, data: Dict) -> Dict:
+        row = {**PASSENGER_DEFAULTS, **data}  # Fill in what the database would
+        if row.get("id") is None:
+            row["id"] = str(uuid.uuid4())
+        if row.get("spawn_time") is None:
+            row["spawn_time"] = datetime.now(timezone.utc).isoformat()
+        if row.get("current_station_id") is None:
+            row["current_station_id"] = row.get("origin_station_id")
+        await self._record(row["id"], PendingWrite(INSERT, row))
+        return dict(row)
+
+    async def update_passenger(self, passenger_id: str, data: Dict) -> Optional[Dict]:
+        row = await self.get_passenger(passenger_id)
+        if row is None:
+            return None
+        data = {column: value for column, value in data.items() if column != "id"}
+        await self._record(passenger_id, PendingWrite(UPDATE, data))
+        return {**row, **data}
+
+    async def delete_passenger(self, passenger_id: str) -> Optional[Dict]:
+        row = await self.get_passenger(passenger_id)
+        if row is None:
+            return None
+        await self._record(passenger_id, PendingWrite(DELETE))
+        return row
+
+    # --- Reads by ID (served through the buffer) ---
+
+    async def get_passenger(self, passenger_id: str) -> Optional[Dict]:
+        write = self._buffered(passenger_id)
+        if write is None:
+            return await self.store.get_passenger(passenger_id)
+        if write.kind == DELETE:
+            return None
+        if write.kind == INSERT:
+            return dict(write.data)
+        row = await self.store.get_passenger(passenger_id)
+        return {**row, **write.data} if row is not None else None
+
+    # --- Everything else flushes first ---
+
+    async def insert_passengers(self, rows: List[Dict]) -> List[Dict]:
+        if any(self._buffered(row["id"]) is not None for row in rows if row.get("id") is not None):
+            await self.flush()  # Keep them after buffered writes to the same passengers
+        return await self.store.insert_passengers(rows)
+
+    async def get_all_passengers(self) -> List[Dict]:
+        await self.flush()
+        return await self.store.get_all_passengers()
+
+    async def find_passengers(
+            self,
+            status: Optional[str] = None,
+            station_id: Optional[str] = None,
+            train_id: Optional[str] = None,
+    ) -> List[Dict]:
+        await self.flush()
+        return await self.store.find_passengers(status=status, station_id=station_id, train_id=train_id)
+
+    async def list_passengers(
+            self,
+            status: Optional[str] = None,
+            station_id: Optional[str] = None,
+            train_id: Optional[str] = None,
+            after: Optional[str] = None,
+            limit: int = 1000,
+            fields: Optional[Sequence[str]] = None,
+    ) -> List[Dict]:
+        await self.flush()
+        return await self.store.list_passengers(
+            status=status, station_id=station_id, train_id=train_id, after=after, limit=limit, fields=fields
+        )
+
+    async def get_waiting_passengers(self, since: Optional[str] = None) -> List[Dict]:
+        await self.flush()
+        return await self.store.get_waiting_passengers(since)
+
+    async def transition_passengers(self, passenger_ids: List[str], from_status: str, data: Dict) -> List[Dict]:
+        await self.flush()
+        return await self.store.transition_passengers(passenger_ids, from_status, data)
+
+    async def get_passenger_statuses(self, passenger_ids: List[str]) -> Dict[str, str]:
+        await self.flush()
+        return await self.store.get_passenger_statuses(passenger_ids)
+
+    async def expire_passengers(self, passenger_ids: List[str]) -> List[Dict]:
+        await self.flush()
+        return await self.store.expire_passengers(passenger_ids)
+
+    async def get_station_ids(self) -> List[str]:
+        return await self.store.get_station_ids()
+
+    async def get_station_names(self) -> Dict[str, str]:
+        return await self.store.get_station_names()
+
+    def close(self) -> None:
+        if len(self):
+            logger.warning(f"Closing with {len(self)} unflushed passenger writes")
+        self.store.close()
@@ -1,15 +1,33 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import passengers  # Import the passengers router
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from app.core.config import settings
-from app.core.database import get_db
-from supabase import Client
+from app.core.logs import configure_logging
+from app.api import passengers  # Import the passengers router
+from app.core.metrics import MetricsMiddleware
+from app.core.database import get_db, shutdown_store
 import asyncio
 
+configure_logging(settings.log_level)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Starts the background loops before serving and stops them, then the store, on shutdown."""
+    await passengers.startup_event()
+    try:
+        yield
+    finally:
+        await passengers.shutdown_event()
+        await shutdown_store()
+
+
 app = FastAPI(
     title="Train Simulation API",
     description="An API for managing a train simulation using FastAPI and Supabase.",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # CORS (Cross-Origin Resource Sharing)
@@ -25,9 +43,15 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(passengers.router, prefix="/passengers", tags=["passengers"])
 
 @app.get("/")
 async def read_root():
-    return {"message": "Welcome to the Train Simulation API!"}
\ No newline at end of file
+    return {"message": "Welcome to the Train Simulation API!"}
+
+@app.get("/metrics", include_in_schema=False)
+async def read_metrics():
+    """Latency histograms, background loop timings and queue depths of this worker, for Prometheus."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, Field, validator
 from datetime import datetime
 from typing import Optional, List
 from enum import Enum
@@ -12,6 +12,13 @@ class PassengerStatus(str, Enum):
     exited = "exited"  # Add 'exited' for passengers who leave
     impatient = "impatient" # Add 'impatient' status
 
+# The lifecycle the batch endpoints enforce: each status can only move to the next one.
+STATUS_TRANSITIONS = {
+    PassengerStatus.waiting: PassengerStatus.boarding,
+    PassengerStatus.boarding: PassengerStatus.in_transit,
+    PassengerStatus.in_transit: PassengerStatus.arrived,
+}
+
 class TicketType(str, Enum):
     adult = "adult"
     child = "child"
@@ -81,4 +88,32 @@ class Passenger(PassengerBase):
     arrival_time: Optional[datetime] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+MAX_BATCH_SIZE = 5000
+
+class BatchBoardRequest(BaseModel):
+    """Boards waiting passengers onto a train (waiting -> boarding)."""
+    train_id: str
+    passenger_ids: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+class BatchDepartRequest(BaseModel):
+    """Marks boarded passengers as travelling (boarding -> in_transit)."""
+    passenger_ids: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+class BatchArriveRequest(BaseModel):
+    """Marks travelling passengers as arrived at a station (in_transit -> arrived)."""
+    station_id: str
+    passenger_ids: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+class BatchItemResult(BaseModel):
+    id: str
+    ok: bool
+    status: Optional[PassengerStatus] = None  # Status after the batch (current status on failure)
+    error: Optional[str] = None
+
+class BatchResult(BaseModel):
+    updated: int
+    failed: int
+    results: List[BatchItemResult]
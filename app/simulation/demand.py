@@ -0,0 +1,212 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+@dataclass
+class DemandWeights:
+    """How likely a passenger starting at one station is to travel to another.
+
+    The weight of destination `d` from origin `o` is the product of:
+    - `popularity[d]` (default 1)
+    - `hourly[d][hour]`, 24 UTC multipliers per station (default 1)
+    - `pairs[o][d]`, explicit multipliers for individual origin-destination pairs
+    - `distance(o, d) ** -distance_decay`, when both stations have a `position`
+
+    Destinations are then drawn in proportion to these weights. With the
+    defaults every other station is equally likely.
+    """
+    popularity: Dict[str, float] = field(default_factory=dict)
+    hourly: Dict[str, Sequence[float]] = field(default_factory=dict)
+    pairs: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    positions: Dict[str, Sequence[float]] = field(default_factory=dict)  # Station -> coordinates (e.g. km)
+    distance_decay: float = 0.0
+
+    def __post_init__(self):
+        for station_id, profile in self.hourly.items():
+            if len(profile) != 24:
+                raise ValueError(f"Hourly demand profile of {station_id} must have 24 values")
+
+
+class AliasTable:
+    """Vose's alias method: draws from a fixed discrete distribution in O(1) per sample.
+
+    Building the table is O(k) for k outcomes. `outcomes` are the values
+    returned (station indexes here); outcomes with zero weight are left out.
+    """
+
+    def __init__(self, outcomes: np.ndarray, weights: np.ndarray):
+        keep = weights > 0
+        outcomes, weights = outcomes[keep], weights[keep]
+        k = len(weights)
+        scaled = (weights * (k / weights.sum())).tolist() if k else []
+        prob = [1.0] * k
+        alias = list(range(k))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            prob[less] = scaled[less]
+            alias[less] = more
+            scaled[more] += scaled[less] - 1.0
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Whatever is left over is 1 up to rounding error and keeps prob 1.
+        self.prob = np.array(prob, dtype=np.float64)
+        self.primary = outcomes
+        self.alternate = outcomes[np.array(alias, dtype=np.intp)] if k else outcomes
+
+    def __len__(self) -> int:
+        return len(self.prob)
+
+    def sample(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        """Draws `n` outcomes."""
+        slots = rng.integers(0, len(self.prob), n)
+        return np.where(rng.random(n) < self.prob[slots], self.primary[slots], self.alternate[slots])
+
+
+SHARED_MAX_SELF_WEIGHT = 0.5  # Above this share of the shared table, an origin gets a table of its own
+
+
+class DemandMatrix:
+    """Origin-destination demand over the current stations, sampled through alias tables.
+
+    Origins without pair multipliers or distance decay all see the same
+    destination weights (minus themselves), so they share one table and
+    redraw the samples that land on the origin. Every other origin gets its
+    own table, built the first time it is sampled. Tables are kept until
+    `update` sees a different set of stations, `set_weights` is called, or
+    (with hourly profiles) the UTC hour changes, so a generation cycle costs
+    O(1) per passenger instead of rebuilding a destination list per station.
+    """
+
+    def __init__(self, weights: Optional[DemandWeights] = None):
+        self.weights = weights or DemandWeights()
+        self.station_ids: Sequence[str] = []
+        self.builds = 0  # Alias tables built so far
+        self._ids = np.empty(0, dtype=object)
+        self._index: Dict[str, int] = {}
+        self._hour: Optional[int] = None
+        self._base = np.empty(0)  # Per-destination weight shared by every origin
+        self._base_total = 0.0
+        self._positions: Optional[np.ndarray] = None  # (S, dims), NaN where unknown
+        self._tables: Dict[str, AliasTable] = {}
+        self._shared: Optional[AliasTable] = None
+
+    def set_weights(self, weights: DemandWeights) -> None:
+        """Replaces the demand weights; tables are rebuilt on next use."""
+        self.weights = weights
+        self._reset(self._hour if weights.hourly else None)
+
+    def update(self, station_ids: Sequence[str], now: Optional[datetime] = None) -> None:
+        """Points the matrix at the current stations, dropping the tables if anything changed.
+
+        Passing the same list object again costs nothing; an equal list is
+        only compared, not rebuilt.
+        """
+        hour = None
+        if self.weights.hourly:
+            hour = (now or datetime.now(timezone.utc)).hour
+        if station_ids is not self.station_ids:
+            changed = list(station_ids) != list(self.station_ids)
+            self.station_ids = station_ids
+            if changed:
+                self._ids = np.array(station_ids, dtype=object)
+                self._index = {station_id: i for i, station_id in enumerate(station_ids)}
+                self._reset(hour)
+                return
+        if hour != self._hour:
+            self._reset(hour)
+
+    def _reset(self, hour: Optional[int]) -> None:
+        self._hour = hour
+        self._tables = {}
+        self._shared = None
+        weights = self.weights
+        self._base = np.fromiter(
+            (weights.popularity.get(sid, 1.0) for sid in self.station_ids), dtype=np.float64,
+            count=len(self.station_ids),
+        )
+        if hour is not None:
+            self._base *= np.fromiter(
+                (weights.hourly[sid][hour] if sid in weights.hourly else 1.0 for sid in self.station_ids),
+                dtype=np.float64, count=len(self.station_ids),
+            )
+        self._base[~np.isfinite(self._base) | (self._base < 0)] = 0.0
+        self._base_total = float(self._base.sum())
+        self._positions = None
+        if weights.distance_decay and weights.positions:
+            dims = max(len(position) for position in weights.positions.values())
+            positions = np.full((len(self.station_ids), dims), np.nan)
+            for sid, position in weights.positions.items():
+                if sid in self._index:
+                    positions[self._index[sid], :len(position)] = position
+            self._positions = positions
+
+    def destination_weights(self, origin: str) -> np.ndarray:
+        """Returns the weight of every station as a destination from `origin` (0 for itself)."""
+        weights = self._base.copy()
+        origin_index = self._index.get(origin)
+        for destination, multiplier in self.weights.pairs.get(origin, {}).items():
+            if destination in self._index:
+                weights[self._index[destination]] *= multiplier
+        if self._positions is not None and origin_index is not None:
+            distance = np.sqrt(np.sum((self._positions - self._positions[origin_index]) ** 2, axis=1))
+            known = ~np.isnan(distance)
+            # Distances under 1 count as 1, so neighbouring stations are not infinitely attractive.
+            weights[known] *= np.maximum(distance[known], 1.0) ** -self.weights.distance_decay
+        if origin_index is not None:
+            weights[origin_index] = 0.0
+        weights[~np.isfinite(weights) | (weights < 0)] = 0.0
+        return weights
+
+    def _uses_shared(self, origin: str) -> bool:
+        if self._positions is not None or origin in self.weights.pairs:
+            return False
+        origin_index = self._index.get(origin)
+        if origin_index is None:
+            return True
+        return self._base[origin_index] <= self._base_total * SHARED_MAX_SELF_WEIGHT
+
+    def _shared_table(self) -> AliasTable:
+        if self._shared is None:
+            self._shared = AliasTable(np.arange(len(self._base)), self._base)
+            self.builds += 1
+        return self._shared
+
+    def table(self, origin: str) -> AliasTable:
+        """Returns the alias table of the destinations from `origin`, building it if needed."""
+        table = self._tables.get(origin)
+        if table is None:
+            weights = self.destination_weights(origin)
+            table = self._tables[origin] = AliasTable(np.arange(len(weights)), weights)
+            self.builds += 1
+        return table
+
+    def sample(self, origin: str, n: int, rng: np.random.Generator) -> Optional[List[str]]:
+        """Draws the destinations of `n` passengers starting at `origin` (None if there are none)."""
+        if not self._uses_shared(origin):
+            table = self.table(origin)
+            if not len(table):
+                return None
+            return self._ids[table.sample(rng, n)].tolist()
+
+        table = self._shared_table()
+        origin_index = self._index.get(origin, -1)
+        if not len(table) or (len(table) == 1 and table.primary[0] == origin_index):
+            return None
+        drawn = table.sample(rng, n)
+        redraw = np.flatnonzero(drawn == origin_index)
+        while len(redraw):  # Rejection keeps the other stations' relative weights exact
+            drawn[redraw] = table.sample(rng, len(redraw))
+            redraw = redraw[drawn[redraw] == origin_index]
+        return self._ids[drawn].tolist()
+
+    def probabilities(self, origin: str) -> Dict[str, float]:
+        """Returns each destination's probability from `origin` (for inspection)."""
+        weights = self.destination_weights(origin)
+        total = weights.sum()
+        if not total:
+            return {}
+        return {sid: float(w / total) for sid, w in zip(self.station_ids, weights) if w > 0}
@@ -0,0 +1,255 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from app.simulation.table import NONE_CODE, STATUS_CODES, STATUSES, PassengerTable
+
+# Passenger status codes (shared with `PassengerTable`).
+WAITING = STATUS_CODES["waiting"]
+BOARDING = STATUS_CODES["boarding"]
+IN_TRANSIT = STATUS_CODES["in_transit"]
+ARRIVED = STATUS_CODES["arrived"]
+
+# The only passenger columns the engine needs.
+ENGINE_COLUMNS = ("status", "current_station_id", "destination_station_id", "train_id", "spawn_time")
+
+# Train states.
+TRAVELLING = 0
+DWELLING = 1
+
+
+@dataclass
+class TrainRoute:
+    """A train running in a loop over `stations`."""
+    train_id: str
+    stations: List[str]
+    capacity: int = 300
+    travel_ticks: int = 30  # Ticks between consecutive stations
+    dwell_ticks: int = 3  # Ticks spent at each station with doors open
+    start_index: int = 0  # Position on the route at tick 0
+
+
+@dataclass
+class TickResult:
+    """State changes produced by one tick, grouped for batched write-back."""
+    boarded: Dict[str, List[str]] = field(default_factory=dict)  # train ID -> passenger IDs (waiting -> boarding)
+    departed: List[str] = field(default_factory=list)  # boarding -> in_transit
+    arrived: Dict[str, List[str]] = field(default_factory=dict)  # station ID -> passenger IDs (in_transit -> arrived)
+
+    def __bool__(self) -> bool:
+        return bool(self.boarded or self.departed or self.arrived)
+
+
+class SimulationEngine:
+    """Moves trains along their routes in fixed ticks and boards/unloads passengers.
+
+    Passengers live in a `PassengerTable` restricted to the columns the
+    engine needs and trains in NumPy arrays (station and train IDs as small
+    integer codes), so each tick is a handful of vectorised operations over
+    the active passengers rather than per-passenger Python work. Passengers
+    are added as they are generated and their slots are freed for reuse once
+    they have arrived.
+    """
+
+    def __init__(self, routes: Sequence[TrainRoute], tick_seconds: float = 1.0, initial_capacity: int = 1024):
+        for route in routes:
+            if not route.stations:
+                raise ValueError(f"Route of train {route.train_id} has no stations")
+        self.tick_seconds = tick_seconds
+        self.ticks = 0
+        self._serves_matrix: Optional[np.ndarray] = None
+
+        # --- Passengers ---
+        self.passengers = PassengerTable(ENGINE_COLUMNS, initial_capacity)
+        self.station_ids = self.passengers.stations.values  # Station code -> ID
+
+        # --- Trains ---
+        # Interned before any passenger so that the table's train codes are the train indexes.
+        self.train_ids = [route.train_id for route in routes]
+        self.train_codes = {train_id: self.passengers.trains.encode(train_id) for train_id in self.train_ids}
+        self.routes = [np.array([self.intern_station(sid) for sid in route.stations], dtype=np.int32) for route in routes]
+        self.train_capacity = np.array([route.capacity for route in routes], dtype=np.int32)
+        self.travel_ticks = np.array([route.travel_ticks for route in routes], dtype=np.int32)
+        self.dwell_ticks = np.array([route.dwell_ticks for route in routes], dtype=np.int32)
+        self.train_position = np.array(
+            [route.start_index % len(route.stations) for route in routes], dtype=np.int32
+        )
+        self.train_state = np.full(len(routes), DWELLING, dtype=np.int8)
+        self.train_timer = self.dwell_ticks.copy()
+        self.train_load = np.zeros(len(routes), dtype=np.int32)
+
+    # --- Stations and routes ---
+
+    def intern_station(self, station_id: str) -> int:
+        return self.passengers.stations.encode(station_id)
+
+    def _serves(self) -> np.ndarray:
+        """Boolean matrix: does train t stop at station s (rebuilt when stations are added)."""
+        if self._serves_matrix is None or self._serves_matrix.shape[1] != len(self.station_ids):
+            serves = np.zeros((len(self.train_ids), len(self.station_ids)), dtype=bool)
+            for code, route in enumerate(self.routes):
+                serves[code, route] = True
+            self._serves_matrix = serves
+        return self._serves_matrix
+
+    def train_stations(self) -> np.ndarray:
+        """Current station code of every train (meaningful while dwelling)."""
+        return np.array([route[pos] for route, pos in zip(self.routes, self.train_position)], dtype=np.int32)
+
+    # --- Passengers ---
+
+    @property
+    def active(self) -> int:
+        return len(self.passengers)
+
+    def add_passengers(self, rows: Iterable[Dict]) -> int:
+        """Adds passengers (row dicts) that are waiting or on one of the engine's trains."""
+        batch = []
+        for row in rows:
+            if row["id"] in self.passengers:
+                continue
+            status = STATUS_CODES.get(getattr(row.get("status"), "value", row.get("status", "waiting")))
+            train_id = row.get("train_id")
+            if train_id not in self.train_codes:
+                train_id = None  # Keeps the table's train pool limited to the engine's trains
+            if status is None or status == ARRIVED or (status != WAITING and train_id is None):
+                continue  # Nothing for the engine to do with it
+            batch.append({
+                "id": row["id"],
+                "status": STATUSES[status],
+                "current_station_id": row.get("current_station_id") or row["origin_station_id"],
+                "destination_station_id": row["destination_station_id"],
+                "train_id": train_id,
+                "spawn_time": row["spawn_time"],
+            })
+        if not batch:
+            return 0
+        slots = self.passengers.append(batch)
+        train = self.passengers.train_id[slots]
+        np.add.at(self.train_load, train[train >= 0], 1)
+        return len(batch)
+
+    def remove_passengers(self, passenger_ids: Iterable[str]) -> None:
+        """Forgets passengers that were deleted or expired elsewhere."""
+        table = self.passengers
+        for passenger_id in passenger_ids:
+            slot = table.slot(passenger_id)
+            if slot is None:
+                continue
+            if table.train_id[slot] >= 0 and table.status[slot] in (BOARDING, IN_TRANSIT):
+                self.train_load[table.train_id[slot]] -= 1
+            table.remove_slots([slot])
+
+    # --- Simulation ---
+
+    def step(self) -> TickResult:
+        """Advances the simulation by one tick."""
+        result = TickResult()
+        self.ticks += 1
+        table = self.passengers
+        n = table.size
+        status = table.status[:n]
+        train = table.train_id[:n]
+        station = table.current_station_id[:n]
+        destination = table.destination_station_id[:n]
+
+        self.train_timer -= 1
+        due = self.train_timer <= 0
+
+        # Trains whose dwell is over depart: their boarding passengers are now in transit.
+        departing = due & (self.train_state == DWELLING)
+        if departing.any():
+            departing_rows = np.flatnonzero((status == BOARDING) & departing[np.maximum(train, 0)] & (train >= 0))
+            status[departing_rows] = IN_TRANSIT
+            result.departed = table.ids_at(departing_rows)
+            self.train_state[departing] = TRAVELLING
+            self.train_timer[departing] = self.travel_ticks[departing]
+
+        # Trains that finish travelling arrive at the next station on their route.
+        arriving = due & ~departing
+        if arriving.any():
+            for code in np.flatnonzero(arriving).tolist():
+                self.train_position[code] = (self.train_position[code] + 1) % len(self.routes[code])
+            self.train_state[arriving] = DWELLING
+            self.train_timer[arriving] = self.dwell_ticks[arriving]
+            current = np.append(self.train_stations(), -1)  # Index -1 (no train) maps to no station
+            at_destination = (status == IN_TRANSIT) & (train >= 0) & arriving[np.maximum(train, 0)] \
+                & (destination == current[train])
+            unloading = np.flatnonzero(at_destination)
+            if len(unloading):
+                np.subtract.at(self.train_load, train[unloading], 1)
+                for station_code in np.unique(destination[unloading]).tolist():
+                    rows = unloading[destination[unloading] == station_code]
+                    result.arrived[self.station_ids[station_code]] = table.ids_at(rows)
+                table.remove_slots(unloading)
+
+        # Docked trains with free seats board waiting passengers headed to a stop on their route.
+        docked = np.flatnonzero((self.train_state == DWELLING) & (self.train_load < self.train_capacity))
+        if len(docked):
+            waiting = np.flatnonzero(status == WAITING)
+            if len(waiting):
+                waiting_station = station[waiting]
+                order = np.argsort(waiting_station, kind="stable")  # FIFO within a station
+                waiting, waiting_station = waiting[order], waiting_station[order]
+                serves = self._serves()
+                stations = self.train_stations()
+                for code in docked.tolist():
+                    station_code = stations[code]
+                    lo, hi = np.searchsorted(waiting_station, [station_code, station_code + 1])
+                    if lo == hi:
+                        continue
+                    candidates = waiting[lo:hi]
+                    candidates = candidates[(status[candidates] == WAITING)
+                                            & serves[code, destination[candidates]]
+                                            & (destination[candidates] != station_code)]
+                    boarding = candidates[:self.train_capacity[code] - self.train_load[code]]
+                    if not len(boarding):
+                        continue
+                    status[boarding] = BOARDING
+                    train[boarding] = code
+                    self.train_load[code] += len(boarding)
+                    result.boarded[self.train_ids[code]] = table.ids_at(boarding)
+
+        return result
+
+    def snapshot(self) -> Dict:
+        """Returns train positions and loads, and passenger counts by status."""
+        stations = self.train_stations()
+        status = self.passengers.status[:self.passengers.size]
+        counts = np.bincount(status[status != NONE_CODE], minlength=ARRIVED + 1)
+        return {
+            "tick": self.ticks,
+            "trains": {
+                train_id: {
+                    "station_id": self.station_ids[stations[code]],
+                    "state": "dwelling" if self.train_state[code] == DWELLING else "travelling",
+                    "load": int(self.train_load[code]),
+                    "capacity": int(self.train_capacity[code]),
+                }
+                for code, train_id in enumerate(self.train_ids)
+            },
+            "passengers": {
+                "waiting": int(counts[WAITING]),
+                "boarding": int(counts[BOARDING]),
+                "in_transit": int(counts[IN_TRANSIT]),
+            },
+        }
+
+
+def loop_routes(station_ids: Sequence[str], trains: int, capacity: int, travel_ticks: int,
+                dwell_ticks: int) -> List[TrainRoute]:
+    """Spreads `trains` trains evenly around one loop over all stations (no trains without stations)."""
+    if not station_ids:
+        return []
+    return [
+        TrainRoute(
+            train_id=f"train-{i + 1}",
+            stations=list(station_ids),
+            capacity=capacity,
+            travel_ticks=travel_ticks,
+            dwell_ticks=dwell_ticks,
+            start_index=i * len(station_ids) // max(1, trains),
+        )
+        for i in range(trains)
+    ]
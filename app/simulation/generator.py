@@ -0,0 +1,145 @@
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+from faker import Faker
+
+TICKET_TYPES = np.array(["adult", "child", "senior", "student", "concession"], dtype=object)
+LUGGAGE_SIZES = np.array(["none", "small", "medium", "large"], dtype=object)
+
+MIN_AGE, MAX_AGE = 5, 90
+MIN_PATIENCE, MAX_PATIENCE = 30, 120  # Seconds
+
+# Column order of a generated batch; also the key order of the row dicts.
+PASSENGER_COLUMNS = (
+    "id",
+    "origin_station_id",
+    "destination_station_id",
+    "first_name",
+    "last_name",
+    "age",
+    "ticket_type",
+    "luggage_size",
+    "email",
+    "phone_number",
+    "spawn_time",
+    "status",
+    "current_station_id",
+    "train_id",
+    "patience",
+    "board_time",
+    "arrival_time",
+)
+
+Columns = Dict[str, list]
+PassengerBatch = Union[List[Dict], Columns]
+
+
+def columns_to_rows(columns: Columns) -> List[Dict]:
+    """Converts a columnar batch into the list-of-dicts form used by the stores."""
+    keys = list(columns)
+    return [dict(zip(keys, values)) for values in zip(*columns.values())]
+
+
+def batch_size(batch: PassengerBatch) -> int:
+    """Returns the number of passengers in a row or columnar batch."""
+    if isinstance(batch, dict):
+        return len(batch["id"]) if batch else 0
+    return len(batch)
+
+
+def as_rows(batch: PassengerBatch) -> List[Dict]:
+    """Returns a batch as a list of row dicts, converting columnar batches."""
+    return columns_to_rows(batch) if isinstance(batch, dict) else batch
+
+
+class PassengerGenerator:
+    """Generates passengers N at a time.
+
+    Faker is only used once, to fill fixed-size pools of names, emails and
+    phone numbers; every batch then samples pool indexes and the numeric
+    fields as NumPy arrays. Passing a seed makes the passengers' attributes
+    reproducible. IDs never come from the seed: they are random version-4
+    UUIDs, so a restarted process or another worker with the same seed
+    does not hand out the same IDs again.
+    """
+
+    def __init__(self, seed: Optional[int] = None, pool_size: int = 2048):
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        fake = Faker()
+        if seed is not None:
+            fake.seed_instance(seed)
+        self.first_names = np.array([fake.first_name() for _ in range(pool_size)], dtype=object)
+        self.last_names = np.array([fake.last_name() for _ in range(pool_size)], dtype=object)
+        self.emails = np.array([fake.email() for _ in range(pool_size)], dtype=object)
+        self.phone_numbers = np.array([fake.phone_number() for _ in range(pool_size)], dtype=object)
+
+    def get_state(self) -> Dict:
+        """Returns the RNG state as JSON-safe data (large integers as strings)."""
+        state = self.rng.bit_generator.state
+        return {**state, "state": {key: str(value) for key, value in state["state"].items()}}
+
+    def set_state(self, state: Dict) -> None:
+        """Continues from a state returned by `get_state` (e.g. after a restart)."""
+        self.rng.bit_generator.state = {**state, "state": {key: int(value) for key, value in state["state"].items()}}
+
+    def batch_count(self, generation_rate: float) -> int:
+        """Number of passengers for one call at `generation_rate` (0.5x-1.5x jitter)."""
+        return int(generation_rate * self.rng.uniform(0.5, 1.5))
+
+    @staticmethod
+    def uuids(n: int) -> List[str]:
+        """Returns `n` random version-4 UUID strings (from `os.urandom`, like `uuid.uuid4`)."""
+        raw = np.frombuffer(os.urandom(16 * n), dtype=np.uint8).reshape(n, 16).copy()
+        raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+        raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+        digits = raw.tobytes().hex()
+        return [
+            f"{digits[i:i + 8]}-{digits[i + 8:i + 12]}-{digits[i + 12:i + 16]}-{digits[i + 16:i + 20]}-{digits[i + 20:i + 32]}"
+            for i in range(0, 32 * n, 32)
+        ]
+
+    def generate(
+            self,
+            station_id: str,
+            destination_station_ids: Sequence[str],
+            n: int,
+            columnar: bool = False,
+            destinations: Optional[List[str]] = None,
+    ) -> PassengerBatch:
+        """Generates `n` waiting passengers at `station_id`.
+
+        Destinations are drawn uniformly from `destination_station_ids`, unless
+        each passenger's destination is given in `destinations` (e.g. sampled
+        from a `DemandMatrix`). Returns a dict of column lists when `columnar`
+        is set, otherwise a list of row dicts with the same keys.
+        """
+        rng = self.rng
+        pool = len(self.first_names)
+        ids = self.uuids(n)
+        if destinations is None:
+            choices = np.asarray(destination_station_ids, dtype=object)
+            destinations = choices[rng.integers(0, len(choices), n)].tolist()
+        spawn_time = datetime.now(timezone.utc).isoformat()  # One timestamp per batch
+        columns = {
+            "id": ids,
+            "origin_station_id": [station_id] * n,
+            "destination_station_id": destinations,
+            "first_name": self.first_names[rng.integers(0, pool, n)].tolist(),
+            "last_name": self.last_names[rng.integers(0, pool, n)].tolist(),
+            "age": rng.integers(MIN_AGE, MAX_AGE + 1, n).tolist(),
+            "ticket_type": TICKET_TYPES[rng.integers(0, len(TICKET_TYPES), n)].tolist(),
+            "luggage_size": LUGGAGE_SIZES[rng.integers(0, len(LUGGAGE_SIZES), n)].tolist(),
+            "email": self.emails[rng.integers(0, pool, n)].tolist(),
+            "phone_number": self.phone_numbers[rng.integers(0, pool, n)].tolist(),
+            "spawn_time": [spawn_time] * n,
+            "status": ["waiting"] * n,
+            "current_station_id": [station_id] * n,  # Set current station to origin
+            "train_id": [None] * n,
+            "patience": rng.integers(MIN_PATIENCE, MAX_PATIENCE + 1, n).tolist(),
+            "board_time": [None] * n,
+            "arrival_time": [None] * n,
+        }
+        return columns if columnar else columns_to_rows(columns)
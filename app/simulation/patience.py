@@ -0,0 +1,95 @@
+import heapq
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+TimeLike = Union[datetime, str, float, int]
+
+
+@lru_cache(maxsize=4096)
+def _parse_iso(value: str) -> float:
+    # Generated batches share one spawn timestamp, so the same strings come back on every sync.
+    return datetime.fromisoformat(value).timestamp()
+
+
+def to_epoch(value: TimeLike) -> float:
+    """Converts a datetime, ISO string or epoch number to epoch seconds."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        return _parse_iso(value)
+    return value.timestamp()
+
+
+class PatienceScheduler:
+    """Keeps patience deadlines of waiting passengers in a min-heap.
+
+    Passengers are added as they are inserted and dropped when they stop
+    waiting, so a tick only touches the entries that are actually due.
+    Dropped passengers stay in the heap until they reach the top (lazy
+    deletion); the heap is rebuilt when stale entries start to dominate.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, str]] = []
+        self._deadlines: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def __contains__(self, passenger_id: str) -> bool:
+        return passenger_id in self._deadlines
+
+    def schedule_deadline(self, passenger_id: str, deadline: float) -> None:
+        """Schedules (or reschedules) a passenger to expire at `deadline`."""
+        self._deadlines[passenger_id] = deadline
+        heapq.heappush(self._heap, (deadline, passenger_id))
+        if len(self._heap) > 2 * len(self._deadlines) + 1024:
+            self._compact()
+
+    def schedule(self, passenger_id: str, spawn_time: TimeLike, patience: Optional[int]) -> None:
+        """Schedules a passenger from its spawn time and patience (in seconds)."""
+        if patience is None:
+            self.discard(passenger_id)  # No patience means the passenger never gives up
+            return
+        self.schedule_deadline(passenger_id, to_epoch(spawn_time) + patience)
+
+    def discard(self, passenger_id: str) -> None:
+        """Stops tracking a passenger (boarded, deleted, ...)."""
+        self._deadlines.pop(passenger_id, None)
+
+    def track(self, passenger: Dict) -> None:
+        """Schedules or discards a passenger row depending on its status."""
+        status = passenger.get("status", "waiting")
+        if hasattr(status, "value"):
+            status = status.value
+        if status == "waiting":
+            self.schedule(passenger["id"], passenger["spawn_time"], passenger.get("patience"))
+        else:
+            self.discard(passenger["id"])
+
+    def clear(self) -> None:
+        self._heap = []
+        self._deadlines = {}
+
+    def track_many(self, passengers: Iterable[Dict]) -> None:
+        for passenger in passengers:
+            self.track(passenger)
+
+    def pop_expired(self, now: float) -> List[str]:
+        """Removes and returns the IDs of all passengers whose deadline is <= `now`."""
+        expired = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            deadline, passenger_id = heapq.heappop(heap)
+            if self._deadlines.get(passenger_id) == deadline:
+                del self._deadlines[passenger_id]
+                expired.append(passenger_id)
+        return expired
+
+    def _compact(self) -> None:
+        self._heap = [(deadline, pid) for pid, deadline in self._deadlines.items()]
+        heapq.heapify(self._heap)
+
+
+patience_scheduler = PatienceScheduler()
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.core.metrics import LoopTimer
+from app.simulation.demand import DemandMatrix
+from app.simulation.generator import Columns, batch_size
+
+logger = logging.getLogger(__name__)
+
+GenerateFn = Callable[[str, List[str], int], Columns]  # (origin, destination of each passenger, n)
+InsertFn = Callable[[str, Columns], Awaitable]
+
+
+class ArrivalProfile:
+    """Per-station Poisson arrival rates, optionally shaped by hour of day.
+
+    `default_rate` and `station_rates` are in passengers per second;
+    `hourly_multipliers` (24 values, UTC) scale every station's rate.
+    """
+
+    def __init__(
+            self,
+            default_rate: float,
+            station_rates: Optional[Dict[str, float]] = None,
+            hourly_multipliers: Optional[Sequence[float]] = None,
+    ):
+        if hourly_multipliers and len(hourly_multipliers) != 24:
+            raise ValueError("hourly_multipliers must have 24 values")
+        self.default_rate = default_rate
+        self.station_rates = dict(station_rates or {})
+        self.hourly_multipliers = list(hourly_multipliers) if hourly_multipliers else None
+
+    def rates(self, station_ids: Sequence[str], now: datetime) -> np.ndarray:
+        """Returns the arrival rate of each station at `now`."""
+        rates = np.fromiter(
+            (self.station_rates.get(sid, self.default_rate) for sid in station_ids),
+            dtype=np.float64,
+            count=len(station_ids),
+        )
+        if self.hourly_multipliers:
+            rates *= self.hourly_multipliers[now.hour]
+        return rates
+
+    def sample(self, station_ids: Sequence[str], interval: float, rng: np.random.Generator,
+               now: Optional[datetime] = None) -> np.ndarray:
+        """Draws how many passengers arrive at each station during `interval` seconds."""
+        now = now or datetime.now(timezone.utc)
+        return rng.poisson(self.rates(station_ids, now) * interval)
+
+
+def merge_batches(batches: List[Columns]) -> Columns:
+    """Concatenates columnar batches into one."""
+    if len(batches) == 1:
+        return batches[0]
+    return {column: [value for batch in batches for value in batch[column]] for column in batches[0]}
+
+
+class GenerationScheduler:
+    """Generates passengers for every station each cycle and inserts them concurrently.
+
+    Inserts run as one task per station, with at most `max_inflight` running at
+    once. While a station's insert is in flight, new batches for it are queued
+    and merged into a single insert when it finishes, so a slow store sees
+    fewer, larger writes instead of an ever-growing backlog. Stations whose
+    queue reaches `max_pending` skip generation until it drains.
+
+    Destinations are drawn from `demand` (uniform over the other stations by
+    default). `station_filter` restricts which stations this process
+    generates at (destinations still cover every station). An optional `timer`
+    records the duration, lag and size of each cycle.
+    """
+
+    def __init__(
+            self,
+            generate: GenerateFn,
+            insert: InsertFn,
+            profile: ArrivalProfile,
+            rng: np.random.Generator,
+            interval: float = 10.0,
+            max_inflight: int = 8,
+            max_pending: int = 10000,
+            station_filter: Optional[Callable[[str], bool]] = None,
+            timer: Optional[LoopTimer] = None,
+            demand: Optional[DemandMatrix] = None,
+    ):
+        self.generate = generate
+        self.insert = insert
+        self.profile = profile
+        self.rng = rng
+        self.interval = interval
+        self.max_pending = max_pending
+        self.station_filter = station_filter
+        self.timer = timer
+        self.demand = demand or DemandMatrix()
+        self._semaphore = asyncio.Semaphore(max_inflight)
+        self._pending: Dict[str, List[Columns]] = {}
+        self._pending_counts: Dict[str, int] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @property
+    def pending(self) -> int:
+        """Number of generated passengers waiting to be inserted."""
+        return sum(self._pending_counts.values())
+
+    @property
+    def inflight(self) -> int:
+        """Number of stations with an insert task running."""
+        return len(self._tasks)
+
+    def run_cycle(self, station_ids: List[str]) -> int:
+        """Generates one interval's arrivals and schedules their inserts; returns the count."""
+        origins = [sid for sid in station_ids if self.station_filter(sid)] if self.station_filter else station_ids
+        counts = self.profile.sample(origins, self.interval, self.rng)
+        self.demand.update(station_ids)
+        generated = 0
+        for station_id, n in zip(origins, counts.tolist()):
+            if n == 0:
+                continue
+            if self._pending_counts.get(station_id, 0) >= self.max_pending:
+                logger.warning(f"Insert backlog full at station {station_id}; skipping generation this cycle")
+                continue
+            destinations = self.demand.sample(station_id, n, self.rng)
+            if destinations is None:
+                continue  # Skip if only one station (or no weighted destinations)
+            self._enqueue(station_id, self.generate(station_id, destinations, n))
+            generated += n
+        return generated
+
+    def _enqueue(self, station_id: str, batch: Columns) -> None:
+        self._pending.setdefault(station_id, []).append(batch)
+        self._pending_counts[station_id] = self._pending_counts.get(station_id, 0) + batch_size(batch)
+        if station_id not in self._tasks:
+            self._tasks[station_id] = asyncio.create_task(self._flush(station_id))
+
+    async def _flush(self, station_id: str) -> None:
+        """Inserts everything queued for a station, merging batches queued meanwhile."""
+        try:
+            while station_id in self._pending:
+                async with self._semaphore:
+                    batches = self._pending.pop(station_id, None)
+                    self._pending_counts.pop(station_id, None)
+                    if not batches:
+                        break
+                    try:
+                        await self.insert(station_id, merge_batches(batches))
+                    except Exception:
+                        logger.exception(f"Error inserting passengers at station {station_id}:")
+        finally:
+            del self._tasks[station_id]
+
+    async def drain(self) -> None:
+        """Waits until every queued batch has been inserted."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks.values()), return_exceptions=True)
+
+    async def run(self, get_station_ids: Callable[[], Awaitable[List[str]]]) -> None:
+        """Runs a generation cycle every `interval` seconds."""
+        while True:
+            started = time.monotonic()
+            if self.timer is not None:
+                started = self.timer.start()
+            try:
+                station_ids = await get_station_ids()
+                if not station_ids:
+                    logger.warning("No stations found.  Skipping passenger generation.")
+                    await asyncio.sleep(60)  # Wait longer if no stations
+                    continue
+                generated = self.run_cycle(station_ids)
+                logger.debug(f"Generated {generated} passengers across {len(station_ids)} stations "
+                             f"({self.pending} pending, {self.inflight} stations inserting)")
+            except Exception:
+                logger.exception("Error in continuous passenger generation:")
+                if self.timer is not None:
+                    self.timer.error()
+                await asyncio.sleep(60)  # Wait longer on error
+                continue
+            delay = max(0.0, self.interval - (time.monotonic() - started))
+            if self.timer is not None:
+                self.timer.rows("generated", generated)
+                self.timer.finish(started, delay)
+            await asyncio.sleep(delay)
@@ -0,0 +1,56 @@
+import os
+import shutil
+from typing import Dict, Tuple
+
+import numpy as np
+import orjson
+
+SNAPSHOT_VERSION = 1
+META_FILE = "meta.json"
+IDS_FILE = "ids.npy"
+
+
+def write_snapshot(directory: str, image: Dict, meta: Dict) -> None:
+    """Writes a `PassengerTable.export()` image as one `.npy` file per column plus `meta.json`.
+
+    The files are written to a temporary directory that is then renamed, so
+    a crash mid-write never leaves a partial snapshot under `directory`.
+    """
+    tmp = directory + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name, column in image["columns"].items():
+        np.save(os.path.join(tmp, f"{name}.npy"), column)
+    ids = np.array([(passenger_id or "").encode() for passenger_id in image["ids"]], dtype=bytes)
+    np.save(os.path.join(tmp, IDS_FILE), ids)
+    meta = {
+        "version": SNAPSHOT_VERSION,
+        "size": len(image["ids"]),
+        "columns": list(image["columns"]),
+        "pools": image["pools"],
+        **meta,
+    }
+    with open(os.path.join(tmp, META_FILE), "wb") as file:
+        file.write(orjson.dumps(meta))
+        file.flush()
+        os.fsync(file.fileno())
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp, directory)
+
+
+def read_snapshot(directory: str, mmap: bool = True) -> Tuple[Dict, Dict]:
+    """Reads a snapshot back into an export image and its metadata.
+
+    Columns are memory-mapped copy-on-write, so loading costs little more
+    than reading the IDs; pages are read as the table touches them and
+    changes never reach the file.
+    """
+    with open(os.path.join(directory, META_FILE), "rb") as file:
+        meta = orjson.loads(file.read())
+    if meta.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {meta.get('version')} in {directory}")
+    mode = "c" if mmap and meta["size"] else None  # Empty files cannot be mapped
+    columns = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode) for name in meta["columns"]}
+    ids = [passenger_id.decode() or None for passenger_id in np.load(os.path.join(directory, IDS_FILE)).tolist()]
+    image = {"columns": columns, "ids": ids, "pools": meta.pop("pools")}
+    return image, meta
@@ -0,0 +1,309 @@
+import math
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from app.models.passenger import LuggageSize, PassengerStatus, TicketType
+from app.simulation.patience import to_epoch
+
+NONE_CODE = -1  # Code of a missing string/enum value, and the status of a free slot
+
+
+class StringPool:
+    """Interns strings as int32 codes (-1 is None).
+
+    A pool created with fixed `values` is closed: encoding anything else
+    raises ValueError, which is how enum columns reject unknown values.
+    """
+
+    def __init__(self, values: Optional[Sequence[str]] = None):
+        self.values: List[str] = list(values or [])
+        self.codes: Dict[str, int] = {value: code for code, value in enumerate(self.values)}
+        self.closed = values is not None
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def encode(self, value) -> int:
+        if value is None:
+            return NONE_CODE
+        value = getattr(value, "value", value)  # Enum members
+        code = self.codes.get(value)
+        if code is None:
+            if self.closed:
+                raise ValueError(f"Unknown value {value!r}")
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def encode_many(self, values: Iterable) -> List[int]:
+        encode = self.encode
+        return [encode(value) for value in values]
+
+    def lookup(self, value) -> Optional[int]:
+        """Returns the code of `value` without interning it (None if never seen)."""
+        if value is None:
+            return NONE_CODE
+        return self.codes.get(getattr(value, "value", value))
+
+    def decode(self, code: int) -> Optional[str]:
+        return self.values[code] if code >= 0 else None
+
+
+STATUSES = tuple(status.value for status in PassengerStatus)
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+
+# Column name -> (kind, dtype, pool attribute). String and enum columns hold pool codes,
+# ints use -1 for None and times are epoch seconds with NaN for None.
+COLUMN_TYPES = {
+    "origin_station_id": ("string", np.int32, "stations"),
+    "destination_station_id": ("string", np.int32, "stations"),
+    "current_station_id": ("string", np.int32, "stations"),
+    "train_id": ("string", np.int32, "trains"),
+    "first_name": ("string", np.int32, "names"),
+    "last_name": ("string", np.int32, "names"),
+    "email": ("string", np.int32, "emails"),
+    "phone_number": ("string", np.int32, "phone_numbers"),
+    "status": ("enum", np.int8, "statuses"),
+    "ticket_type": ("enum", np.int8, "ticket_types"),
+    "luggage_size": ("enum", np.int8, "luggage_sizes"),
+    "age": ("int", np.int16, None),
+    "patience": ("int", np.int32, None),
+    "spawn_time": ("time", np.float64, None),
+    "board_time": ("time", np.float64, None),
+    "arrival_time": ("time", np.float64, None),
+}
+ALL_COLUMNS = tuple(COLUMN_TYPES)
+OPEN_POOLS = ("stations", "trains", "names", "emails", "phone_numbers")  # Grow as values are seen
+
+
+def iso_time(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat()
+
+
+class PassengerTable:
+    """Passengers stored column-wise in NumPy arrays, one slot per passenger.
+
+    Statuses, ticket types and luggage sizes are small integer codes, station,
+    train and other string values are interned in per-table pools, and
+    timestamps are epoch floats, so a passenger costs a few dozen bytes
+    rather than a 17-key dict of strings. Rows are decoded back into dicts
+    only when they leave the table.
+
+    Slots of removed passengers have status -1 and are reused by later
+    appends. `columns` selects a subset of the columns when a user of the
+    table only needs a few of them.
+    """
+
+    def __init__(self, columns: Sequence[str] = ALL_COLUMNS, capacity: int = 1024):
+        if "status" not in columns:
+            columns = ("status", *columns)  # Marks free slots
+        self.column_names = tuple(columns)
+        self.stations = StringPool()
+        self.trains = StringPool()
+        self.names = StringPool()
+        self.emails = StringPool()
+        self.phone_numbers = StringPool()
+        self.statuses = StringPool(STATUSES)
+        self.ticket_types = StringPool([ticket.value for ticket in TicketType])
+        self.luggage_sizes = StringPool([size.value for size in LuggageSize])
+        self.size = 0  # High-water mark of used slots
+        self.ids: List[Optional[str]] = []
+        self.index: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._capacity = capacity
+        for name in self.column_names:
+            setattr(self, name, self._empty(name, capacity))
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, passenger_id: str) -> bool:
+        return passenger_id in self.index
+
+    @staticmethod
+    def _empty(name: str, capacity: int) -> np.ndarray:
+        kind, dtype, _ = COLUMN_TYPES[name]
+        return np.full(capacity, np.nan if kind == "time" else NONE_CODE, dtype=dtype)
+
+    def pool(self, name: str) -> StringPool:
+        return getattr(self, COLUMN_TYPES[name][2])
+
+    def nbytes(self) -> int:
+        """Approximate memory used by the columns and the ID index."""
+        columns = sum(getattr(self, name).nbytes for name in self.column_names)
+        ids = sum(len(pid) + 49 for pid in self.index)  # str object header + ASCII payload
+        return columns + ids + 8 * len(self.ids) + 100 * len(self.index)  # List slot + dict entry
+
+    # --- Slots ---
+
+    def _grow(self, needed: int) -> None:
+        if needed <= self._capacity:
+            return
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        for name in self.column_names:
+            column = self._empty(name, capacity)
+            column[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, column)
+        self._capacity = capacity
+
+    def _allocate(self, n: int) -> np.ndarray:
+        reused = self._free[-n:] if n else []
+        del self._free[len(self._free) - len(reused):]
+        fresh = n - len(reused)
+        self._grow(self.size + fresh)
+        slots = np.array(reused + list(range(self.size, self.size + fresh)), dtype=np.int64)
+        self.ids.extend([None] * fresh)
+        self.size += fresh
+        return slots
+
+    def slot(self, passenger_id: str) -> Optional[int]:
+        return self.index.get(passenger_id)
+
+    def live_slots(self) -> np.ndarray:
+        return np.flatnonzero(self.status[:self.size] != NONE_CODE)
+
+    def ids_at(self, slots: Iterable[int]) -> List[str]:
+        ids = self.ids
+        return [ids[slot] for slot in np.asarray(slots).tolist()]
+
+    # --- Encoding ---
+
+    def _encode(self, name: str, values: Sequence) -> list:
+        kind, _, pool = COLUMN_TYPES[name]
+        if kind in ("string", "enum"):
+            return getattr(self, pool).encode_many(values)
+        if kind == "int":
+            return [NONE_CODE if value is None else value for value in values]
+        parsed: Dict = {}  # Batches tend to share timestamps; convert each distinct value once
+        result = []
+        for value in values:
+            if value is None:
+                result.append(math.nan)
+            elif value in parsed:
+                result.append(parsed[value])
+            else:
+                result.append(parsed.setdefault(value, to_epoch(value)))
+        return result
+
+    def _decode(self, name: str, codes: np.ndarray) -> list:
+        kind, _, pool = COLUMN_TYPES[name]
+        if kind in ("string", "enum"):
+            values = getattr(self, pool).values
+            return [values[code] if code >= 0 else None for code in codes.tolist()]
+        if kind == "int":
+            return [None if value < 0 else value for value in codes.tolist()]
+        return [None if value != value else iso_time(value) for value in codes.tolist()]
+
+    # --- Writes ---
+
+    def append_columns(self, columns: Dict[str, Sequence]) -> np.ndarray:
+        """Appends a columnar batch (must include "id"); missing columns are None. Returns the slots."""
+        ids = list(columns["id"])
+        duplicates = [pid for pid in ids if pid in self.index]
+        if duplicates or len(set(ids)) != len(ids):
+            raise ValueError(f"Duplicate passenger IDs: {(duplicates or ids)[:5]}")
+        n = len(ids)
+        encoded = {
+            name: self._encode(name, columns[name] if name in columns else [None] * n)
+            for name in self.column_names
+        }  # Encode everything first so a bad value leaves the table untouched
+        slots = self._allocate(n)
+        for name, values in encoded.items():
+            getattr(self, name)[slots] = values
+        for slot, passenger_id in zip(slots.tolist(), ids):
+            self.ids[slot] = passenger_id
+            self.index[passenger_id] = slot
+        return slots
+
+    def append(self, rows: Sequence[Dict]) -> np.ndarray:
+        """Appends row dicts; returns their slots."""
+        names = ("id", *self.column_names)
+        return self.append_columns({name: [row.get(name) for row in rows] for name in names})
+
+    def update(self, slot: int, data: Dict) -> None:
+        """Sets the given columns of one passenger; unknown columns raise ValueError."""
+        unknown = [name for name in data if name != "id" and name not in self.column_names]
+        if unknown:
+            raise ValueError(f"Unknown passenger columns: {unknown}")
+        encoded = {name: self._encode(name, [value])[0] for name, value in data.items() if name != "id"}
+        for name, value in encoded.items():
+            getattr(self, name)[slot] = value
+
+    def remove_slots(self, slots: Iterable[int]) -> List[str]:
+        """Frees the given slots and returns the IDs that were stored there."""
+        slots = np.asarray(slots, dtype=np.int64)
+        ids = self.ids_at(slots)
+        self.status[slots] = NONE_CODE
+        for slot, passenger_id in zip(slots.tolist(), ids):
+            del self.index[passenger_id]
+            self.ids[slot] = None
+            self._free.append(slot)
+        return ids
+
+    # --- Export / import (snapshots) ---
+
+    def export(self) -> Dict:
+        """Copies the table's contents: used columns, slot IDs and interned strings.
+
+        Cheap enough to call on the event loop (array and list copies), so a
+        consistent image can be taken and written to disk elsewhere.
+        """
+        return {
+            "columns": {name: getattr(self, name)[:self.size].copy() for name in self.column_names},
+            "ids": list(self.ids),
+            "pools": {attr: list(getattr(self, attr).values) for attr in OPEN_POOLS},
+        }
+
+    @classmethod
+    def from_export(cls, image: Dict) -> "PassengerTable":
+        """Builds a table around exported columns without copying them (they may be memory-mapped)."""
+        columns = image["columns"]
+        table = cls(tuple(columns))
+        size = len(image["ids"])
+        for attr, values in image["pools"].items():
+            pool = getattr(table, attr)
+            pool.values = list(values)
+            pool.codes = {value: code for code, value in enumerate(pool.values)}
+        if size == 0:
+            return table
+        for name in table.column_names:
+            column = columns[name]
+            if len(column) != size or column.dtype != COLUMN_TYPES[name][1]:
+                raise ValueError(f"Column {name} does not match the exported table")
+            setattr(table, name, column)
+        table._capacity = table.size = size
+        table.ids = list(image["ids"])
+        table.index = dict(zip(table.ids, range(size)))
+        table.index.pop(None, None)  # Free slots
+        table._free = np.flatnonzero(table.status == NONE_CODE).tolist()
+        return table
+
+    # --- Reads ---
+
+    def value(self, slot: int, name: str):
+        return self._decode(name, getattr(self, name)[slot:slot + 1])[0]
+
+    def rows(self, slots: Iterable[int], fields: Optional[Sequence[str]] = None) -> List[Dict]:
+        """Decodes the given slots into JSON-ready row dicts (all columns, or `fields` plus "id")."""
+        slots = np.asarray(slots, dtype=np.int64)
+        if fields is None:
+            names = self.column_names
+        else:
+            names = [name for name in dict.fromkeys(fields) if name != "id"]
+        columns = [self.ids_at(slots)]
+        for name in names:
+            columns.append(self._decode(name, getattr(self, name)[slots]) if name in self.column_names
+                           else [None] * len(slots))
+        keys = ("id", *names)
+        return [dict(zip(keys, values)) for values in zip(*columns)]
+
+    def row(self, slot: int, fields: Optional[Sequence[str]] = None) -> Dict:
+        return self.rows([slot], fields)[0]
+
+    def get(self, passenger_id: str) -> Optional[Dict]:
+        slot = self.index.get(passenger_id)
+        return self.row(slot) if slot is not None else None
@@ -0,0 +1,178 @@
+"""In-process stand-in for the parts of the Supabase client that `SupabaseStore` uses.
+
+Queries are evaluated against Python dicts under a lock, in the executor
+threads `SupabaseStore` runs them in. An optional per-query `latency` is
+slept in that thread to emulate the network round trip. Like PostgREST,
+selects return at most `max_rows` rows (1000 by default on Supabase).
+"""
+import copy
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from app.core.storage.memory_store import PASSENGER_DEFAULTS
+
+
+@dataclass
+class FakeResponse:
+    data: List[Dict]
+
+
+class FakeQuery:
+    """A PostgREST query builder: filters are collected and applied on `execute()`."""
+
+    def __init__(self, client: "FakeClient", table: str):
+        self.client = client
+        self.table = table
+        self.action = "select"
+        self.columns: Optional[List[str]] = None
+        self.payload = None
+        self.filters: List = []
+        self.order_by: Optional[str] = None
+        self.row_limit: Optional[int] = None
+
+    # --- Actions ---
+
+    def select(self, columns: str = "*"):
+        self.action = "select"
+        self.columns = None if columns.strip() == "*" else [c.strip() for c in columns.split(",")]
+        return self
+
+    def insert(self, rows):
+        self.action, self.payload = "insert", rows if isinstance(rows, list) else [rows]
+        return self
+
+    def update(self, data: Dict):
+        self.action, self.payload = "update", data
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    # --- Filters and modifiers ---
+
+    def eq(self, column: str, value):
+        self.filters.append((column, "eq", value))
+        return self
+
+    def in_(self, column: str, values):
+        self.filters.append((column, "in", set(values)))
+        return self
+
+    def gt(self, column: str, value):
+        self.filters.append((column, "gt", value))
+        return self
+
+    def gte(self, column: str, value):
+        self.filters.append((column, "gte", value))
+        return self
+
+    def order(self, column: str):
+        self.order_by = column
+        return self
+
+    def limit(self, n: int):
+        self.row_limit = n
+        return self
+
+    # --- Evaluation ---
+
+    def _matches(self, row: Dict) -> bool:
+        for column, op, value in self.filters:
+            current = row.get(column)
+            if op == "eq" and current != value:
+                return False
+            if op == "in" and current not in value:
+                return False
+            if op in ("gt", "gte"):
+                if current is None:
+                    return False
+                if column.endswith("_time"):  # Timestamps compare as instants, like Postgres
+                    current, value = _epoch(current), _epoch(value)
+                if current < value or (op == "gt" and current == value):
+                    return False
+        return True
+
+    def _candidates(self, rows: Dict[str, Dict]):
+        # Primary-key lookups skip the scan, like an index would.
+        for column, op, value in self.filters:
+            if column == "id" and op == "eq":
+                return [rows[value]] if value in rows else []
+            if column == "id" and op == "in":
+                return [rows[pid] for pid in value if pid in rows]
+        return rows.values()
+
+    def execute(self) -> FakeResponse:
+        if self.client.latency:
+            time.sleep(self.client.latency)
+        with self.client.lock:
+            self.client.queries += 1
+            rows = self.client.tables.setdefault(self.table, {})
+            if self.action == "insert":
+                return FakeResponse(self.client.insert(self.table, self.payload))
+            matched = [row for row in self._candidates(rows) if self._matches(row)]
+            if self.action == "update":
+                for row in matched:
+                    row.update(self.payload)
+            elif self.action == "delete":
+                for row in matched:
+                    del rows[row["id"]]
+            if self.order_by is not None:
+                matched.sort(key=lambda row: row[self.order_by])
+            if self.row_limit is not None:
+                matched = matched[:self.row_limit]
+            if self.action == "select" and self.client.max_rows is not None:
+                matched = matched[:self.client.max_rows]  # Cut short silently, as PostgREST does
+            if self.columns is not None:
+                return FakeResponse([{column: row.get(column) for column in self.columns} for row in matched])
+            return FakeResponse([dict(row) for row in matched])
+
+
+def _epoch(value) -> float:
+    return datetime.fromisoformat(value).timestamp() if isinstance(value, str) else float(value)
+
+
+class FakeClient:
+    """Holds the `passengers` and `stations` tables; `table()` starts a query like `supabase.Client`."""
+
+    def __init__(self, station_count: int = 10, latency: float = 0.0, max_rows: Optional[int] = 1000):
+        self.latency = latency
+        self.max_rows = max_rows
+        self.lock = threading.Lock()
+        self.queries = 0
+        self.tables: Dict[str, Dict[str, Dict]] = {
+            "passengers": {},
+            "stations": {
+                f"station-{i}": {"id": f"station-{i}", "name": f"Station {i}"} for i in range(1, station_count + 1)
+            },
+        }
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def insert(self, table: str, rows: List[Dict]) -> List[Dict]:
+        """Inserts rows with the database's defaults filled in (caller holds the lock)."""
+        target = self.tables.setdefault(table, {})
+        now = datetime.now(timezone.utc).isoformat()
+        stored = []
+        for data in rows:
+            row = {**PASSENGER_DEFAULTS, **copy.copy(data)} if table == "passengers" else dict(data)
+            row["id"] = row.get("id") or str(uuid.uuid4())
+            if table == "passengers":
+                row["spawn_time"] = row.get("spawn_time") or now
+                row["current_station_id"] = row.get("current_station_id") or row.get("origin_station_id")
+            if row["id"] in target:
+                raise ValueError(f"duplicate key value violates unique constraint: {row['id']}")
+            stored.append(row)
+        for row in stored:
+            target[row["id"]] = row
+        return [dict(row) for row in stored]
+
+    def load(self, rows: List[Dict]) -> None:
+        """Bulk-loads passenger rows without counting a query (benchmark setup)."""
+        with self.lock:
+            self.insert("passengers", rows)
@@ -0,0 +1,130 @@
+"""Replays a passenger journal into a fresh store.
+
+    python -m benchmarks.replay JOURNAL_DIR [--from-segment 1] [--store memory|supabase]
+                                [--latency-ms 0] [--speed 0] [--output results.json]
+
+The journal is the one written under `TRAINSIM_PERSISTENCE_DIR`. Every
+insert, update and delete is applied in order with `apply_record`, so a
+recorded run can be reproduced and timed against either store: the
+in-process `MemoryStore`, or the production stack on `FakeClient`
+(`--store supabase`). With `--speed` records are paced by their original
+timestamps (2 = twice as fast); the default replays as fast as possible.
+Results are printed (or written) as JSON.
+"""
+import os
+import tempfile
+
+# Settings are read at import time: keep the replay away from real credentials and shared files.
+_workdir = tempfile.mkdtemp(prefix="trainsim-replay-")
+os.environ["TRAINSIM_STORAGE_BACKEND"] = "memory"
+os.environ["TRAINSIM_STATS_PATH"] = os.path.join(_workdir, "stats.bin")
+os.environ["TRAINSIM_COORDINATION_DIR"] = _workdir
+os.environ["TRAINSIM_BROADCAST_PATH"] = os.path.join(_workdir, "broadcast.bin")
+os.environ.pop("TRAINSIM_PERSISTENCE_DIR", None)  # Never journal the replay itself
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import numpy as np
+
+from app.core.journal import DELETE, INSERT, UPDATE, PassengerJournal, apply_record
+from app.core.storage import MemoryStore, PassengerStore
+from benchmarks.fake_supabase import FakeClient
+from benchmarks.run import build_store, git_revision
+
+
+def summarize(timings: List[float], rows: int) -> Dict:
+    values = np.array(timings) * 1000
+    return {
+        "records": len(timings),
+        "rows": rows,
+        "total_ms": float(values.sum()),
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "max_ms": float(values.max()),
+    }
+
+
+async def replay(journal: PassengerJournal, store: PassengerStore, start: int, speed: float) -> Dict:
+    timings: Dict[str, List[float]] = {INSERT: [], UPDATE: [], DELETE: []}
+    rows = {INSERT: 0, UPDATE: 0, DELETE: 0}
+    skipped = 0
+    first_ts = None
+    began = time.perf_counter()
+    for record in journal.read(start):
+        record_type = record["type"]
+        if record_type not in timings:
+            skipped += 1
+            continue
+        if speed > 0:
+            first_ts = record["ts"] if first_ts is None else first_ts
+            delay = (record["ts"] - first_ts) / speed - (time.perf_counter() - began)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        started = time.perf_counter()
+        await apply_record(store, record)
+        timings[record_type].append(time.perf_counter() - started)
+        rows[record_type] += len(record["rows"] if record_type == INSERT else record["ids"])
+    await store.flush()
+    elapsed = time.perf_counter() - began
+    return {
+        "seconds": elapsed,
+        "records_per_second": sum(map(len, timings.values())) / elapsed if elapsed else 0.0,
+        "skipped_records": skipped,
+        "passengers": len(await store.get_all_passengers()),
+        "ops": {record_type: summarize(values, rows[record_type]) for record_type, values in timings.items() if values},
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("journal", help="Directory holding the journal-*.log segments")
+    parser.add_argument("--from-segment", type=int, default=1, help="First segment to replay")
+    parser.add_argument("--store", choices=("memory", "supabase"), default="memory")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Emulated storage round-trip time (supabase)")
+    parser.add_argument("--speed", type=float, default=0.0, help="Pace records at this multiple of real time")
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    journal = PassengerJournal(args.journal)
+    if args.store == "memory":
+        store: PassengerStore = MemoryStore()
+    else:
+        store = build_store(FakeClient(latency=args.latency_ms / 1000))
+    try:
+        results = asyncio.run(replay(journal, store, args.from_segment, args.speed))
+    finally:
+        store.close()
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": sys.version.split()[0],
+            "journal": os.path.abspath(args.journal),
+            "segments": [segment for segment in journal.segments() if segment >= args.from_segment],
+            "store": args.store,
+            "latency_ms": args.latency_ms,
+            "speed": args.speed,
+        },
+        "results": results,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
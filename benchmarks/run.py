@@ -0,0 +1,384 @@
+"""Offline benchmarks for the passenger API.
+
+    python -m benchmarks.run [--suite generation patience endpoints memory] [--quick]
+                             [--latency-ms 0] [--output results.json]
+
+Everything runs in-process: the API talks to `SupabaseStore` (with the
+configured cache/write-behind layers) on top of `FakeClient`, so results
+include the store's executor and serialisation overhead but no network
+unless `--latency-ms` is set. Results are printed (or written) as JSON.
+"""
+import os
+import tempfile
+
+# Settings are read at import time: keep the benchmark away from real credentials and shared files.
+_workdir = tempfile.mkdtemp(prefix="trainsim-bench-")
+os.environ["TRAINSIM_STORAGE_BACKEND"] = "memory"  # The default store is replaced below
+os.environ.setdefault("TRAINSIM_BACKGROUND_MODE", "all")
+os.environ.setdefault("TRAINSIM_GENERATOR_SEED", "1234")
+os.environ["TRAINSIM_STATS_PATH"] = os.path.join(_workdir, "stats.bin")
+os.environ["TRAINSIM_COORDINATION_DIR"] = _workdir
+os.environ["TRAINSIM_BROADCAST_PATH"] = os.path.join(_workdir, "broadcast.bin")
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List
+
+import httpx
+import numpy as np
+
+from app.api import passengers as api
+from app.core import database
+from app.core.aggregates import PassengerAggregates
+from app.core.config import settings
+from app.core.storage import CachedStore, MemoryStore, PassengerStore, SupabaseStore, WriteBehindStore
+from app.main import app
+from app.models.passenger import Passenger
+from app.simulation.engine import SimulationEngine, loop_routes
+from app.simulation.generator import PassengerGenerator, as_rows
+from app.simulation.patience import PatienceScheduler
+from app.simulation.table import PassengerTable
+from benchmarks.fake_supabase import FakeClient
+
+SUITES = ("generation", "patience", "endpoints", "memory")
+STATION_COUNT = 10
+
+
+def build_store(client: FakeClient) -> PassengerStore:
+    """The production store stack from `app.core.database`, on the fake client."""
+    store: PassengerStore = SupabaseStore(
+        client,
+        max_workers=settings.db_max_workers,
+        max_reads=settings.db_max_read_concurrency,
+        max_writes=settings.db_max_write_concurrency,
+    )
+    if settings.passenger_cache_size > 0:
+        store = CachedStore(store, settings.passenger_cache_size, settings.passenger_cache_ttl)
+    if settings.write_behind_enabled:
+        store = WriteBehindStore(store, settings.write_behind_interval, settings.write_behind_max_batch)
+    return store
+
+
+def station_ids() -> List[str]:
+    return [f"station-{i}" for i in range(1, STATION_COUNT + 1)]
+
+
+def waiting_rows(generator: PassengerGenerator, n: int) -> List[Dict]:
+    stations = station_ids()
+    rows = []
+    per_station = -(-n // len(stations))
+    for station_id in stations:
+        rows.extend(as_rows(generator.generate(station_id, [s for s in stations if s != station_id], per_station)))
+    return rows[:n]
+
+
+def percentiles(samples: List[float]) -> Dict:
+    values = np.asarray(samples) * 1000
+    return {
+        "count": len(samples),
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p90_ms": float(np.percentile(values, 90)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "max_ms": float(values.max()),
+    }
+
+
+def reset_patience() -> None:
+    api.patience_scheduler.clear()
+
+
+# --- Generation ---
+
+def bench_generation(quick: bool) -> Dict:
+    generator = PassengerGenerator(seed=1)
+    stations = station_ids()
+    results = {}
+    for n in ((1000, 10000) if quick else (1000, 10000, 100000)):
+        for columnar in (False, True):
+            repeats = max(1, 100000 // n // (4 if quick else 1))
+            started = time.perf_counter()
+            for _ in range(repeats):
+                generator.generate(stations[0], stations[1:], n, columnar=columnar)
+            elapsed = time.perf_counter() - started
+            results[f"{'columns' if columnar else 'rows'}_{n}"] = {
+                "batch_size": n,
+                "batches": repeats,
+                "rows_per_sec": n * repeats / elapsed,
+            }
+
+    async def end_to_end() -> Dict:
+        # Generation plus insert through the store stack and the in-process bookkeeping.
+        store = build_store(FakeClient(STATION_COUNT))
+        n, repeats = 1000, 5 if quick else 20
+        started = time.perf_counter()
+        for i in range(repeats):
+            station_id = stations[i % len(stations)]
+            await api.generate_and_insert_passengers(station_id, stations, 0, store, num_passengers=n)
+        elapsed = time.perf_counter() - started
+        await store.flush()
+        store.close()
+        return {"batch_size": n, "batches": repeats, "rows_per_sec": n * repeats / elapsed}
+
+    results["generate_and_insert_1000"] = asyncio.run(end_to_end())
+    reset_patience()
+    return results
+
+
+# --- Patience sweep ---
+
+def bench_patience(quick: bool, latency: float) -> Dict:
+    generator = PassengerGenerator(seed=2)
+    results = {}
+    for n in ((1000, 10000) if quick else (1000, 10000, 100000)):
+        rows = waiting_rows(generator, n)
+        now = datetime.now(timezone.utc)
+        for i, row in enumerate(rows):
+            if i % 10 == 0:  # 10% already out of patience
+                row["spawn_time"], row["patience"] = (now - timedelta(seconds=600)).isoformat(), 60
+            elif i % 100 == 1:  # 1% spawned since the previous sweep
+                row["spawn_time"], row["patience"] = now.isoformat(), 600
+            else:
+                row["spawn_time"], row["patience"] = (now - timedelta(seconds=120)).isoformat(), 600
+        client = FakeClient(STATION_COUNT, latency)
+        client.load(rows)
+        store = build_store(client)
+        reset_patience()
+
+        async def sweeps() -> Dict:
+            started = time.perf_counter()
+            expired = await api.sweep_patience(store)
+            seed_seconds = time.perf_counter() - started
+            since = (datetime.now(timezone.utc) - timedelta(seconds=api.PATIENCE_SYNC_OVERLAP)).isoformat()
+            started = time.perf_counter()
+            await api.sweep_patience(store, since)
+            incremental_seconds = time.perf_counter() - started
+            return {
+                "waiting": n,
+                "expired": expired,
+                "seed_sweep_ms": seed_seconds * 1000,
+                "incremental_sweep_ms": incremental_seconds * 1000,
+                "queries": client.queries,
+            }
+
+        results[f"waiting_{n}"] = asyncio.run(sweeps())
+        store.close()
+    reset_patience()
+    return results
+
+
+# --- Endpoints ---
+
+async def run_load(client: httpx.AsyncClient, make_request: Callable, requests: int, concurrency: int) -> Dict:
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        method, url, body = make_request(i)
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            latencies.append(time.perf_counter() - started)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    return {**percentiles(latencies), "requests_per_sec": requests / elapsed, "statuses": statuses}
+
+
+def bench_endpoints(quick: bool, latency: float, concurrency: int) -> Dict:
+    requests = 300 if quick else 2000
+    generator = PassengerGenerator(seed=3)
+    rows = waiting_rows(generator, 5000 if quick else 20000)
+    fake = FakeClient(STATION_COUNT, latency)
+    fake.load(rows)
+    store = build_store(fake)
+    app.dependency_overrides[database.get_db] = lambda: store
+    ids = [row["id"] for row in rows]
+    hot = ids[:1000]  # The IDs displays keep polling
+    rng = random.Random(3)
+    stations = station_ids()
+    new_passenger = {"origin_station_id": "station-1", "destination_station_id": "station-2", "patience": 60}
+
+    # Each write endpoint gets its own slice of passengers so requests do not conflict.
+    update_ids = ids[1000:1000 + requests]
+    delete_ids = ids[1000 + requests:1000 + 2 * requests]
+    board_ids = ids[1000 + 2 * requests:]
+    board_batch = max(1, len(board_ids) // requests)
+
+    scenarios = {
+        "GET /passengers/{id}": lambda i: ("GET", f"/passengers/{rng.choice(hot)}", None),
+        "GET /passengers/?limit=100": lambda i: ("GET", "/passengers/?limit=100&status=waiting", None),
+        "POST /passengers/": lambda i: ("POST", "/passengers/", new_passenger),
+        "PUT /passengers/{id}": lambda i: ("PUT", f"/passengers/{update_ids[i % len(update_ids)]}", {"age": i % 90}),
+        "DELETE /passengers/{id}": lambda i: ("DELETE", f"/passengers/{delete_ids[i % len(delete_ids)]}", None),
+        "POST /passengers/generate/{station}": lambda i: (
+            "POST", f"/passengers/generate/{stations[i % len(stations)]}",
+            {"generation_rate": 10, "destination_station_ids": stations, "num_passengers": 50},
+        ),
+        "POST /passengers/batch/board": lambda i: (
+            "POST", "/passengers/batch/board",
+            {"train_id": "train-1", "passenger_ids": board_ids[i * board_batch:(i + 1) * board_batch] or ids[:1]},
+        ),
+        "GET /passengers/aggregates": lambda i: ("GET", "/passengers/aggregates", None),
+        "GET /passengers/stats": lambda i: ("GET", "/passengers/stats", None),
+    }
+
+    async def run_all() -> Dict:
+        await api.seed_aggregates(store)
+        results = {}
+        transport = httpx.ASGITransport(app=app)  # No lifespan: the background loops stay off
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, make_request in scenarios.items():
+                results[name] = await run_load(client, make_request, requests, concurrency)
+        await store.flush()
+        return results
+
+    try:
+        results = asyncio.run(run_all())
+    finally:
+        app.dependency_overrides.pop(database.get_db, None)
+        store.close()
+    cache = store if isinstance(store, CachedStore) else getattr(store, "store", None)
+    if isinstance(cache, CachedStore):
+        results["cache"] = cache.stats()
+    results["storage_queries"] = fake.queries
+    reset_patience()
+    return results
+
+
+# --- Memory ---
+
+def measure(build: Callable[[], object]) -> int:
+    """Bytes still allocated by what `build` returns."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return used
+
+
+def bench_memory(quick: bool) -> Dict:
+    n = 20000 if quick else 100000
+    rows = waiting_rows(PassengerGenerator(seed=4), n)
+    routes = loop_routes(station_ids(), 4, 300, 30, 3)
+
+    def memory_store():
+        store = MemoryStore()
+        asyncio.run(store.insert_passengers(rows))
+        return store
+
+    def engine():
+        engine = SimulationEngine(routes)
+        engine.add_passengers(rows)
+        return engine
+
+    def scheduler():
+        scheduler = PatienceScheduler()
+        scheduler.track_many(rows)
+        return scheduler
+
+    def aggregates():
+        aggregates = PassengerAggregates()
+        aggregates.observe_many(rows, new=True)
+        return aggregates
+
+    builders = {
+        "row_dicts": lambda: [dict(row) for row in rows],
+        "passenger_models": lambda: [Passenger(**row) for row in rows],
+        "passenger_table": lambda: _table(rows),
+        "memory_store": memory_store,
+        "simulation_engine": engine,
+        "patience_scheduler": scheduler,
+        "aggregates": aggregates,
+    }
+    results = {}
+    for name, build in builders.items():
+        used = measure(build)
+        results[name] = {"bytes_per_passenger": used / n, "mb_per_100k": used / n * 100000 / 2 ** 20}
+    return results
+
+
+def _table(rows: List[Dict]) -> PassengerTable:
+    table = PassengerTable()
+    table.append(rows)
+    return table
+
+
+# --- Runner ---
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--suite", nargs="+", choices=SUITES, default=list(SUITES))
+    parser.add_argument("--quick", action="store_true", help="Smaller sizes, for a fast sanity run")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Emulated storage round-trip time")
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent requests in the endpoint suite")
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)  # Keep per-request logging out of the timings
+    latency = args.latency_ms / 1000
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "quick": args.quick,
+            "latency_ms": args.latency_ms,
+            "concurrency": args.concurrency,
+            "passenger_cache_size": settings.passenger_cache_size,
+            "write_behind_enabled": settings.write_behind_enabled,
+        },
+        "results": {},
+    }
+    runners = {
+        "generation": lambda: bench_generation(args.quick),
+        "patience": lambda: bench_patience(args.quick, latency),
+        "endpoints": lambda: bench_endpoints(args.quick, latency, args.concurrency),
+        "memory": lambda: bench_memory(args.quick),
+    }
+    for suite in args.suite:
+        started = time.perf_counter()
+        report["results"][suite] = runners[suite]()
+        print(f"{suite}: {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,32 @@
+import os
+import tempfile
+
+# Settings are read at import time: keep the tests away from real credentials and shared files.
+_workdir = tempfile.mkdtemp(prefix="trainsim-tests-")
+os.environ.setdefault("TRAINSIM_SUPABASE_URL", "http://localhost:1")
+os.environ.setdefault("TRAINSIM_SUPABASE_KEY", "test-key")
+os.environ["TRAINSIM_STORAGE_BACKEND"] = "memory"
+os.environ["TRAINSIM_STATS_PATH"] = os.path.join(_workdir, "stats.bin")
+os.environ["TRAINSIM_COORDINATION_DIR"] = _workdir
+os.environ["TRAINSIM_BROADCAST_PATH"] = os.path.join(_workdir, "broadcast.bin")
+os.environ.pop("TRAINSIM_PERSISTENCE_DIR", None)
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import passengers
+from app.core.database import get_db
+
+
+@pytest.fixture
+def api():
+    """Builds a test client for the passengers API on a given store (the app's lifespan is not run)."""
+
+    def client(store) -> TestClient:
+        app = FastAPI()
+        app.include_router(passengers.router, prefix="/passengers")
+        app.dependency_overrides[get_db] = lambda: store
+        return TestClient(app)
+
+    return client
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from app.api.passengers import seed_aggregates
+from app.core import changes, events
+from app.core.aggregates import PassengerAggregates, passenger_aggregates
+from app.core.storage import SupabaseStore
+from benchmarks.fake_supabase import FakeClient
+
+SPAWNED = "2024-01-01T00:00:00+00:00"
+BOARDED = "2024-01-01T00:01:00+00:00"
+
+
+def passenger(passenger_id: str, **fields):
+    return {"id": passenger_id, "status": "waiting", "origin_station_id": "a", "current_station_id": "a",
+            "train_id": None, "spawn_time": SPAWNED, **fields}
+
+
+def test_counts_follow_a_passenger_through_its_lifecycle():
+    aggregates = PassengerAggregates()
+    aggregates.observe(passenger("p1"), new=True)
+    aggregates.observe(passenger("p2"), new=True)
+    assert aggregates.station("a")["counts"] == {"waiting": 2}
+
+    aggregates.observe({"id": "p1", "status": "boarding", "train_id": "t1", "board_time": BOARDED})
+    assert aggregates.train_load("t1") == 1
+    aggregates.observe({"id": "p1", "status": "in_transit"})
+    aggregates.observe({"id": "p1", "status": "arrived", "current_station_id": "b"})
+    assert aggregates.train_load("t1") == 0
+    aggregates.remove("p2", impatient=True)
+
+    station = aggregates.station("a")
+    assert station["counts"] == {}
+    assert (station["generated"], station["arrived"], station["impatient"]) == (2, 1, 1)
+    assert station["satisfaction"] == 50.0
+    assert station["average_wait_seconds"] == 60.0
+    assert aggregates.station("b")["counts"] == {"arrived": 1}
+
+
+def test_repeated_updates_are_not_counted_twice():
+    aggregates = PassengerAggregates()
+    aggregates.observe(passenger("p1"), new=True)
+    aggregates.observe(passenger("p1"), new=True)
+    aggregates.observe({"id": "p1", "status": "arrived"})
+    aggregates.observe({"id": "p1", "status": "arrived"})
+
+    station = aggregates.station("a")
+    assert (station["generated"], station["arrived"], station["counts"]) == (1, 1, {"arrived": 1})
+
+
+def test_removing_an_unknown_passenger_is_a_no_op():
+    aggregates = PassengerAggregates()
+    aggregates.remove("missing", impatient=True)
+    assert aggregates.snapshot() == {"stations": {}, "trains": {}}
+
+
+@pytest.fixture
+def aggregates():
+    passenger_aggregates.clear()
+    yield passenger_aggregates
+    passenger_aggregates.clear()
+
+
+def test_changes_apply_to_the_aggregates(aggregates):
+    changes.apply(events.CREATED, [passenger("p1"), passenger("p2")])
+    changes.apply(events.BOARDED, [{"id": "p1", "status": "boarding", "train_id": "t1", "board_time": BOARDED}])
+    changes.apply(events.EXPIRED, [{"id": "p2", "status": "impatient"}])
+    # A creation broadcast by another worker after a later change must not reset the passenger.
+    changes.apply(events.CREATED, [passenger("p1")], remote=True)
+
+    assert aggregates.train_load("t1") == 1
+    assert aggregates.station("a")["impatient"] == 1
+    assert aggregates.station("a")["counts"] == {"boarding": 1}
+
+
+def test_seeding_reads_every_passenger_past_the_server_row_cap(aggregates):
+    client = FakeClient(station_count=2, max_rows=10)
+    client.load([passenger(f"p{i:02d}", origin_station_id="station-1", current_station_id="station-1")
+                 for i in range(25)])
+    store = SupabaseStore(client)
+    try:
+        asyncio.run(seed_aggregates(store))
+    finally:
+        store.close()
+
+    assert len(aggregates) == 25
+    assert aggregates.station("station-1")["counts"] == {"waiting": 25}
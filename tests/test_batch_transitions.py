@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from app.core.stations import station_registry
+from app.core.stats import passenger_stats
+from app.core.storage import MemoryStore
+from app.simulation.patience import patience_scheduler
+
+SPAWNED = "2024-01-01T00:00:00+00:00"
+
+
+@pytest.fixture
+def store():
+    store = MemoryStore({"a": "A", "b": "B"})
+    rows = asyncio.run(store.insert_passengers([
+        {"id": f"p{i}", "origin_station_id": "a", "destination_station_id": "b", "spawn_time": SPAWNED,
+         "patience": 60} for i in range(3)
+    ]))
+    patience_scheduler.track_many(rows)
+    station_registry.invalidate()  # Validate against this store's stations
+    yield store
+    station_registry.invalidate()
+    patience_scheduler.clear()
+
+
+def test_board_depart_arrive(api, store):
+    client = api(store)
+    arrived_before = passenger_stats.totals()["arrived"]
+
+    board = client.post("/passengers/batch/board", json={"train_id": "t1", "passenger_ids": ["p0", "p1"]}).json()
+    assert (board["updated"], board["failed"]) == (2, 0)
+    assert "p0" not in patience_scheduler and "p2" in patience_scheduler
+
+    depart = client.post("/passengers/batch/depart", json={"passenger_ids": ["p0", "p1"]}).json()
+    assert [item["status"] for item in depart["results"]] == ["in_transit", "in_transit"]
+
+    arrive = client.post("/passengers/batch/arrive", json={"station_id": "b", "passenger_ids": ["p0"]}).json()
+    assert arrive["updated"] == 1
+    row = asyncio.run(store.get_passenger("p0"))
+    assert (row["status"], row["current_station_id"], row["train_id"]) == ("arrived", "b", "t1")
+    assert row["board_time"] and row["arrival_time"]
+    assert passenger_stats.totals()["arrived"] == arrived_before + 1
+
+
+def test_invalid_items_fail_without_failing_the_batch(api, store):
+    client = api(store)
+    result = client.post(
+        "/passengers/batch/depart", json={"passenger_ids": ["p0", "missing", "p0"]}
+    ).json()
+
+    assert (result["updated"], result["failed"]) == (0, 2)  # Duplicates are applied once
+    assert result["results"] == [
+        {"id": "p0", "ok": False, "status": "waiting", "error": "Invalid transition: waiting -> in_transit"},
+        {"id": "missing", "ok": False, "status": None, "error": "Passenger not found"},
+    ]
+    assert asyncio.run(store.get_passenger("p0"))["status"] == "waiting"
+
+
+def test_requests_are_validated(api, store):
+    client = api(store)
+    assert client.post("/passengers/batch/board", json={"train_id": "t1", "passenger_ids": []}).status_code == 422
+    response = client.post("/passengers/batch/arrive", json={"station_id": "nowhere", "passenger_ids": ["p0"]})
+    assert response.status_code == 400
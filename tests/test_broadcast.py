@@ -0,0 +1,65 @@
+import multiprocessing
+import os
+
+import pytest
+
+from app.core.broadcast import WorkerBroadcast
+
+
+def send_in_child(path: str, messages) -> None:
+    broadcast = WorkerBroadcast(path, slots=4, capacity=64)
+    for message in messages:
+        broadcast.send(message)
+
+
+def run_in_child(path: str, messages) -> None:
+    child = multiprocessing.get_context("fork").Process(target=send_in_child, args=(path, messages))
+    child.start()
+    child.join()
+    assert child.exitcode == 0
+
+
+def test_messages_reach_the_other_processes(tmp_path):
+    path = os.path.join(tmp_path, "broadcast.bin")
+    broadcast = WorkerBroadcast(path, slots=4, capacity=64)
+    broadcast.send(b"mine")  # Never delivered back to the sender
+    run_in_child(path, [b"one", b"two" * 10, b"three"])
+
+    assert broadcast.receive() == ([b"one", b"two" * 10, b"three"], False)
+    assert broadcast.receive() == ([], False)
+
+
+def test_messages_wrap_around_the_ring(tmp_path):
+    path = os.path.join(tmp_path, "broadcast.bin")
+    broadcast = WorkerBroadcast(path, slots=4, capacity=64)
+    for round in range(5):
+        run_in_child(path, [bytes([round]) * 20, bytes([round]) * 25])
+        assert broadcast.receive() == ([bytes([round]) * 20, bytes([round]) * 25], False)
+
+
+def test_a_reader_that_falls_a_ring_behind_is_told(tmp_path):
+    path = os.path.join(tmp_path, "broadcast.bin")
+    broadcast = WorkerBroadcast(path, slots=4, capacity=64)
+    run_in_child(path, [b"x" * 40, b"y" * 40])
+
+    assert broadcast.receive() == ([], True)
+    assert broadcast.lost == 1
+    run_in_child(path, [b"z"])
+    assert broadcast.receive() == ([b"z"], False)
+
+
+def test_oversized_messages_are_rejected(tmp_path):
+    broadcast = WorkerBroadcast(os.path.join(tmp_path, "broadcast.bin"), slots=2, capacity=64)
+    with pytest.raises(ValueError):
+        broadcast.send(b"x" * 64)
+
+
+def test_peers_count_live_processes_only(tmp_path):
+    path = os.path.join(tmp_path, "broadcast.bin")
+    broadcast = WorkerBroadcast(path, slots=4, capacity=64)
+    other = WorkerBroadcast(path, slots=4, capacity=64)  # Same process: claims the same slot
+    assert other.slot == broadcast.slot and broadcast.peers == 0
+
+    run_in_child(path, [b"bye"])
+    broadcast.receive()
+    assert broadcast.peers == 0  # The child has exited
@@ -0,0 +1,113 @@
+import asyncio
+
+from app.core.storage import CachedStore, MemoryStore
+
+
+class CountingStore(MemoryStore):
+    """A memory store that counts (and can slow down) single-passenger lookups."""
+
+    def __init__(self, delay: float = 0.0):
+        super().__init__({"a": "A", "b": "B"})
+        self.lookups = 0
+        self.delay = delay
+
+    async def get_passenger(self, passenger_id):
+        self.lookups += 1
+        row = await super().get_passenger(passenger_id)
+        await asyncio.sleep(self.delay)  # The answer is already read when a write can land
+        return row
+
+
+def cached(max_size: int = 10, ttl: float = 60.0, delay: float = 0.0):
+    inner = CountingStore(delay)
+    asyncio.run(inner.insert_passengers([
+        {"id": f"p{i}", "origin_station_id": "a", "destination_station_id": "b"} for i in range(3)
+    ]))
+    return inner, CachedStore(inner, max_size=max_size, ttl=ttl)
+
+
+def test_repeated_lookups_are_served_from_the_cache():
+    inner, store = cached()
+
+    async def scenario():
+        first = await store.get_passenger("p0")
+        first["status"] = "mutated"  # Callers get copies
+        assert (await store.get_passenger("p0"))["status"] == "waiting"
+        assert await store.get_passenger("missing") is None
+        assert await store.get_passenger("missing") is None  # Not-found answers are cached too
+
+    asyncio.run(scenario())
+    assert inner.lookups == 2
+    assert store.stats()["hits"] == 2 and store.stats()["misses"] == 2 and store.stats()["hit_rate"] == 0.5
+
+
+def test_writes_invalidate_the_rows_they_touch():
+    inner, store = cached()
+
+    async def scenario():
+        await store.get_passenger("p0")
+        await store.get_passenger("p1")
+        await store.update_passenger("p0", {"current_station_id": "b"})
+        assert (await store.get_passenger("p0"))["current_station_id"] == "b"
+        await store.transition_passengers(["p1"], "waiting", {"status": "boarding", "train_id": "t1"})
+        assert (await store.get_passenger("p1"))["status"] == "boarding"
+        await store.get_passenger("p2")
+        await store.delete_passenger("p2")
+        assert await store.get_passenger("p2") is None
+
+    asyncio.run(scenario())
+    assert inner.lookups == 6
+    assert store.stats()["invalidations"] == 3
+
+
+def test_entries_expire_after_the_ttl():
+    inner, store = cached(ttl=0.01)
+
+    async def scenario():
+        await store.get_passenger("p0")
+        await asyncio.sleep(0.02)
+        await store.get_passenger("p0")
+
+    asyncio.run(scenario())
+    assert inner.lookups == 2 and store.expirations == 1
+
+
+def test_least_recently_used_entries_are_evicted():
+    inner, store = cached(max_size=2)
+
+    async def scenario():
+        await store.get_passenger("p0")
+        await store.get_passenger("p1")
+        await store.get_passenger("p0")  # p1 is now the oldest
+        await store.get_passenger("p2")
+        await store.get_passenger("p0")
+        await store.get_passenger("p1")
+
+    asyncio.run(scenario())
+    assert inner.lookups == 4
+    assert store.evictions == 2 and len(store) == 2
+
+
+def test_concurrent_misses_share_one_query():
+    inner, store = cached(delay=0.01)
+
+    async def scenario():
+        return await asyncio.gather(*(store.get_passenger("p0") for _ in range(5)))
+
+    rows = asyncio.run(scenario())
+    assert [row["id"] for row in rows] == ["p0"] * 5
+    assert inner.lookups == 1 and store.coalesced == 4
+
+
+def test_a_write_during_a_miss_keeps_the_old_row_out_of_the_cache():
+    inner, store = cached(delay=0.05)
+
+    async def scenario():
+        lookup = asyncio.ensure_future(store.get_passenger("p0"))
+        await asyncio.sleep(0.01)
+        await store.update_passenger("p0", {"current_station_id": "b"})
+        assert (await lookup)["current_station_id"] == "a"  # Read before the write landed
+        return await store.get_passenger("p0")
+
+    assert asyncio.run(scenario())["current_station_id"] == "b"
+    assert inner.lookups == 2
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import time
+
+from app.core.coordination import FileLock, WorkerCoordinator
+
+
+def test_file_lock_is_exclusive(tmp_path):
+    path = os.path.join(tmp_path, "test.lock")
+    first, second = FileLock(path), FileLock(path)
+    assert first.try_acquire()
+    assert not second.try_acquire()
+    assert first.owner_pid() == os.getpid()
+    first.release()
+    assert second.try_acquire()
+    second.release()
+
+
+def test_leader_mode_has_one_leader_until_it_releases(tmp_path):
+    first = WorkerCoordinator(str(tmp_path), mode="leader")
+    second = WorkerCoordinator(str(tmp_path), mode="leader")
+    assert first.try_acquire()
+    assert not second.try_acquire()
+    assert first.active and not second.active
+
+    first.release()
+    assert second.try_acquire()
+    assert not first.try_acquire()
+    second.release()
+
+
+def test_sharded_mode_splits_the_shards(tmp_path):
+    workers = [WorkerCoordinator(str(tmp_path), mode="sharded", shards=2, failover_grace=60) for _ in range(2)]
+    for worker in workers:
+        assert worker.try_acquire()
+    assert workers[0].owned_shards == {0}
+    assert workers[1].owned_shards == {1}
+    assert workers[0].owns_station("x") != workers[1].owns_station("x")
+
+    for worker in workers:
+        worker.release()
+
+
+def test_sharded_mode_adopts_unclaimed_shards_after_the_grace_period(tmp_path):
+    worker = WorkerCoordinator(str(tmp_path), mode="sharded", shards=3, failover_grace=0.05)
+    assert worker.try_acquire()
+    assert worker.owned_shards == {0}  # The others are left to workers that have not started yet
+
+    time.sleep(0.1)
+    worker.try_acquire()
+    assert worker.owned_shards == {0, 1, 2}
+    worker.release()
+    assert not worker.active
+
+
+def test_all_mode_is_always_active(tmp_path):
+    worker = WorkerCoordinator(str(tmp_path), mode="all")
+    assert worker.try_acquire()
+    assert worker.owns_station(None)
+
+
+def test_run_starts_once_and_again_after_adopting_shards(tmp_path):
+    async def scenario():
+        first = WorkerCoordinator(str(tmp_path), mode="sharded", shards=2, retry_interval=0.01, failover_grace=60)
+        second = WorkerCoordinator(str(tmp_path), mode="sharded", shards=2, retry_interval=0.01, failover_grace=60)
+        starts = []
+        tasks = [
+            asyncio.create_task(first.run(lambda: starts.append(("first", set(first.owned_shards))))),
+            asyncio.create_task(second.run(lambda: starts.append(("second", set(second.owned_shards))))),
+        ]
+        await asyncio.sleep(0.05)
+        assert await asyncio.wait_for(first.run(lambda: starts.append("again")), 1) is None  # Already running
+        tasks[0].cancel()  # The first worker shuts down
+        first.release()
+        second.failover_grace = 0  # Stands in for the grace period running out
+        await asyncio.sleep(0.05)
+        tasks[1].cancel()
+        second.release()
+        return starts
+
+    assert asyncio.run(scenario()) == [("first", {0}), ("second", {1}), ("second", {0, 1})]
+
+
+def test_leader_run_returns_once_started(tmp_path):
+    async def scenario():
+        coordinator = WorkerCoordinator(str(tmp_path), mode="leader", retry_interval=0.01)
+        starts = []
+        await asyncio.wait_for(coordinator.run(lambda: starts.append(1)), 1)
+        coordinator.release()
+        return starts, coordinator.started
+
+    assert asyncio.run(scenario()) == ([1], False)
@@ -0,0 +1,38 @@
+import numpy as np
+
+from app.simulation.demand import AliasTable, DemandMatrix, DemandWeights
+
+
+def test_alias_table_samples_in_proportion_to_the_weights():
+    weights = np.array([1.0, 2.0, 3.0, 4.0])
+    table = AliasTable(np.arange(4), weights)
+    drawn = table.sample(np.random.default_rng(1), 200_000)
+    frequencies = np.bincount(drawn, minlength=4) / len(drawn)
+    np.testing.assert_allclose(frequencies, weights / weights.sum(), atol=0.005)
+
+
+def test_alias_table_never_draws_zero_weights():
+    table = AliasTable(np.array([10, 20, 30]), np.array([0.0, 5.0, 0.0]))
+    assert len(table) == 1
+    assert set(table.sample(np.random.default_rng(2), 1000).tolist()) == {20}
+
+
+def test_alias_table_without_weights_is_empty():
+    assert len(AliasTable(np.arange(3), np.zeros(3))) == 0
+
+
+def test_demand_matrix_never_sends_a_passenger_to_their_origin():
+    stations = [f"station-{i}" for i in range(1, 6)]
+    matrix = DemandMatrix(DemandWeights(popularity={"station-1": 50.0}))
+    matrix.update(stations)
+    rng = np.random.default_rng(3)
+    for origin in stations:
+        assert origin not in matrix.sample(origin, 500, rng)
+
+
+def test_demand_matrix_follows_pair_multipliers():
+    stations = ["a", "b", "c"]
+    matrix = DemandMatrix(DemandWeights(pairs={"a": {"b": 3.0}}))
+    matrix.update(stations)
+    drawn = matrix.sample("a", 40_000, np.random.default_rng(4))
+    assert abs(drawn.count("b") / len(drawn) - 0.75) < 0.01
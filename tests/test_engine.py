@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from app.api import passengers
+from app.core.storage import SupabaseStore
+from app.simulation.engine import SimulationEngine, TrainRoute, loop_routes
+from benchmarks.fake_supabase import FakeClient
+
+SPAWNED = "2024-01-01T00:00:00+00:00"
+
+
+def waiting(passenger_id: str, origin: str, destination: str):
+    return {"id": passenger_id, "status": "waiting", "origin_station_id": origin, "current_station_id": origin,
+            "destination_station_id": destination, "train_id": None, "spawn_time": SPAWNED}
+
+
+def run_until_empty(engine: SimulationEngine, max_ticks: int = 100):
+    boarded, departed, arrived = {}, [], {}
+    for _ in range(max_ticks):
+        result = engine.step()
+        for train_id, ids in result.boarded.items():
+            boarded.setdefault(train_id, []).append(ids)
+        departed += result.departed
+        for station_id, ids in result.arrived.items():
+            arrived.setdefault(station_id, []).extend(ids)
+        if not engine.active:
+            break
+    return boarded, departed, arrived
+
+
+def test_passengers_ride_to_their_destination_within_capacity():
+    engine = SimulationEngine([TrainRoute("t1", ["a", "b", "c"], capacity=2, travel_ticks=2, dwell_ticks=1)])
+    engine.add_passengers([waiting("p1", "a", "b"), waiting("p2", "a", "c"), waiting("p3", "a", "b")])
+    boarded, departed, arrived = run_until_empty(engine)
+
+    assert boarded["t1"][0] == ["p1", "p2"]  # First come, first served, up to capacity
+    assert sorted(departed) == ["p1", "p2", "p3"]
+    assert sorted(arrived["b"]) == ["p1", "p3"] and arrived["c"] == ["p2"]
+    assert engine.snapshot()["trains"]["t1"]["load"] == 0
+
+
+def test_trains_only_board_passengers_for_stops_on_their_route():
+    engine = SimulationEngine([TrainRoute("t1", ["a", "b"], travel_ticks=1, dwell_ticks=1)])
+    engine.add_passengers([waiting("p1", "a", "elsewhere")])
+    for _ in range(10):
+        assert not engine.step().boarded
+    assert engine.snapshot()["passengers"]["waiting"] == 1
+
+
+def test_removed_passengers_free_their_seat():
+    engine = SimulationEngine([TrainRoute("t1", ["a", "b"], travel_ticks=5, dwell_ticks=1)])
+    engine.add_passengers([{**waiting("p1", "a", "b"), "status": "in_transit", "train_id": "t1"}])
+    assert engine.train_load.tolist() == [1]
+    engine.remove_passengers(["p1", "unknown"])
+    assert engine.train_load.tolist() == [0]
+    assert engine.active == 0
+
+
+def test_passengers_the_engine_cannot_move_are_ignored():
+    engine = SimulationEngine([TrainRoute("t1", ["a", "b"])])
+    added = engine.add_passengers([
+        {**waiting("p1", "a", "b"), "status": "arrived"},
+        {**waiting("p2", "a", "b"), "status": "boarding", "train_id": "other-train"},
+        waiting("p3", "a", "b"),
+    ])
+    assert added == 1
+    assert engine.add_passengers([waiting("p3", "a", "b")]) == 0  # Already known
+
+
+def test_routes_without_stations_are_rejected():
+    assert loop_routes([], 4, 300, 30, 3) == []
+    with pytest.raises(ValueError):
+        SimulationEngine([TrainRoute("t1", [])])
+
+
+def test_loop_routes_spread_trains_around_the_loop():
+    routes = loop_routes(["a", "b", "c", "d"], 2, 300, 30, 3)
+    assert [route.start_index for route in routes] == [0, 2]
+    engine = SimulationEngine(routes)
+    assert [train["station_id"] for train in engine.snapshot()["trains"].values()] == ["a", "c"]
+
+
+def test_load_simulation_reads_every_passenger_past_the_server_row_cap(monkeypatch):
+    client = FakeClient(station_count=2, max_rows=10)
+    client.load([waiting(f"p{i:02d}", "station-1", "station-2") for i in range(25)])
+    store = SupabaseStore(client)
+    passengers.station_registry.invalidate()
+    try:
+        engine = asyncio.run(passengers.load_simulation(store))
+        monkeypatch.setattr(passengers.settings, "simulation_routes", {"t1": []})
+        assert asyncio.run(passengers.load_simulation(store)) is None
+    finally:
+        store.close()
+        passengers.station_registry.invalidate()
+
+    assert engine.active == 25
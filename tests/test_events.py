@@ -0,0 +1,94 @@
+import asyncio
+
+import orjson
+
+from app.core import changes
+from app.core.aggregates import passenger_aggregates
+from app.core.events import ARRIVED, BOARDED, CREATED, DELETED, RESYNC, EventHub
+
+
+def frames(subscriber):
+    decoded = []
+    while not subscriber.queue.empty():
+        frame = subscriber.queue.get_nowait()
+        decoded.append(frame if frame is RESYNC else orjson.loads(frame.split(b"data: ")[1]))
+    return decoded
+
+
+def row(passenger_id: str, **data):
+    return {"id": passenger_id, "status": "waiting", "current_station_id": "a", "train_id": None, **data}
+
+
+def test_events_reach_the_subscribers_of_their_station_or_train():
+    async def scenario():
+        hub = EventHub(window=60)
+        everyone, at_b, on_t1 = hub.subscribe(), hub.subscribe(stations=["b"]), hub.subscribe(trains=["t1"])
+        hub.publish(BOARDED, row("p1", status="boarding", train_id="t1"))
+        hub.publish(ARRIVED, row("p2", status="arrived", current_station_id="b"))
+        assert hub.flush() == 2
+        assert [[event["id"] for event in frame] for frame in frames(everyone)] == [["p1", "p2"]]
+        assert [[event["id"] for event in frame] for frame in frames(at_b)] == [["p2"]]
+        assert [[event["id"] for event in frame] for frame in frames(on_t1)] == [["p1"]]
+
+        for subscriber in (everyone, at_b, on_t1):
+            hub.unsubscribe(subscriber)
+        assert not hub.active
+        hub.publish(CREATED, row("p3"))  # Nobody listening: nothing is kept
+        assert hub.pending == 0
+
+    asyncio.run(scenario())
+
+
+def test_events_within_a_window_are_coalesced():
+    async def scenario():
+        hub = EventHub(window=60)
+        subscriber = hub.subscribe()
+        hub.publish(CREATED, row("p1"))
+        hub.publish(BOARDED, row("p1", status="boarding", train_id="t1"))
+        hub.publish(CREATED, row("p2"))
+        hub.publish(DELETED, row("p2"))  # Created and removed in one window: never sent
+        hub.flush()
+        assert frames(subscriber) == [[{**row("p1", status="boarding", train_id="t1"), "type": CREATED}]]
+
+    asyncio.run(scenario())
+
+
+def test_a_slow_subscriber_is_resynced_instead_of_growing_its_queue():
+    async def scenario():
+        hub = EventHub(window=60, max_queue=2)
+        subscriber = hub.subscribe()
+        for i in range(3):
+            hub.publish(CREATED, row(f"p{i}"))
+            hub.flush()
+        assert frames(subscriber) == [RESYNC]
+        assert subscriber.dropped == 3
+
+        hub.publish(CREATED, row("p9"))
+        hub.resync()  # Pending events are dropped: the snapshot covers them
+        assert frames(subscriber) == [RESYNC] and hub.flush() == 0
+
+    asyncio.run(scenario())
+
+
+def test_the_stream_starts_with_a_snapshot_and_ends_with_the_client():
+    async def scenario():
+        hub = EventHub(window=0.01)
+        stream = hub.stream(lambda subscriber: asyncio.sleep(0, {"passengers": []}), stations=["a"])
+        assert await stream.__anext__() == hub.encode({"passengers": []}, event="snapshot")
+        hub.publish(CREATED, row("p1"))
+        assert orjson.loads((await stream.__anext__()).split(b"data: ")[1])[0]["id"] == "p1"
+        await stream.aclose()
+        assert not hub.active
+
+    asyncio.run(scenario())
+
+
+def test_remote_creations_do_not_overwrite_later_local_state():
+    passenger_aggregates.observe(row("remote-1", status="boarding", train_id="remote-train"), new=True)
+    try:
+        changes.apply(CREATED, [row("remote-1")], remote=True)
+        assert passenger_aggregates.train_load("remote-train") == 1
+        changes.apply(DELETED, [row("remote-1")], remote=True)
+        assert "remote-1" not in passenger_aggregates
+    finally:
+        passenger_aggregates.remove("remote-1")
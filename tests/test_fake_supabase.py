@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+from app.core.storage import SupabaseStore
+from benchmarks.fake_supabase import FakeClient
+
+
+def test_insert_fills_in_database_defaults():
+    client = FakeClient(station_count=2)
+    row = client.table("passengers").insert({"origin_station_id": "station-1"}).execute().data[0]
+    assert row["id"]
+    assert row["status"] == "waiting"
+    assert row["current_station_id"] == "station-1"
+    assert row["spawn_time"]
+
+
+def test_duplicate_ids_are_rejected():
+    client = FakeClient()
+    client.load([{"id": "p", "origin_station_id": "station-1"}])
+    with pytest.raises(ValueError):
+        client.table("passengers").insert({"id": "p", "origin_station_id": "station-1"}).execute()
+    assert client.queries == 1
+
+
+def test_supabase_store_runs_against_the_fake_client():
+    async def scenario():
+        store = SupabaseStore(FakeClient(station_count=3))
+        try:
+            await store.insert_passengers([{"id": f"p{i}", "origin_station_id": "station-1"} for i in range(5)])
+            await store.transition_passengers(["p1", "p2"], "waiting", {"status": "boarding", "train_id": "t1"})
+            page = await store.list_passengers(status="waiting", after="p0", limit=2, fields=["status"])
+            return page, await store.get_passenger_statuses(["p1", "p4", "missing"]), await store.get_station_ids()
+        finally:
+            store.close()
+
+    page, statuses, stations = asyncio.run(scenario())
+    assert page == [{"id": "p3", "status": "waiting"}, {"id": "p4", "status": "waiting"}]
+    assert statuses == {"p1": "boarding", "p4": "waiting"}
+    assert sorted(stations) == ["station-1", "station-2", "station-3"]
@@ -0,0 +1,74 @@
+import uuid
+
+import orjson
+
+from app.simulation.generator import (
+    MAX_AGE, MAX_PATIENCE, MIN_AGE, MIN_PATIENCE, PASSENGER_COLUMNS, PassengerGenerator, as_rows, batch_size,
+)
+
+DESTINATIONS = ["b", "c", "d"]
+
+
+def attributes(rows):
+    return [{key: value for key, value in row.items() if key not in ("id", "spawn_time")} for row in rows]
+
+
+def test_a_seed_reproduces_attributes_but_not_ids():
+    first = PassengerGenerator(seed=7, pool_size=64).generate("a", DESTINATIONS, 50)
+    second = PassengerGenerator(seed=7, pool_size=64).generate("a", DESTINATIONS, 50)
+
+    assert attributes(first) == attributes(second)
+    assert not {row["id"] for row in first} & {row["id"] for row in second}
+
+
+def test_ids_are_unique_version_4_uuids():
+    ids = PassengerGenerator.uuids(1000)
+    assert len(set(ids)) == 1000
+    for passenger_id in ids[:50]:
+        parsed = uuid.UUID(passenger_id)
+        assert parsed.version == 4
+        assert str(parsed) == passenger_id
+
+
+def test_generated_passengers_are_waiting_at_their_origin():
+    rows = PassengerGenerator(seed=1, pool_size=64).generate("a", DESTINATIONS, 200)
+
+    assert [list(row) for row in rows[:1]] == [list(PASSENGER_COLUMNS)]
+    for row in rows:
+        assert row["status"] == "waiting"
+        assert row["origin_station_id"] == row["current_station_id"] == "a"
+        assert row["destination_station_id"] in DESTINATIONS
+        assert MIN_AGE <= row["age"] <= MAX_AGE
+        assert MIN_PATIENCE <= row["patience"] <= MAX_PATIENCE
+    orjson.dumps(rows)  # Plain Python values, not NumPy scalars
+
+
+def test_columnar_batches_hold_the_same_passengers():
+    columns = PassengerGenerator(seed=3, pool_size=64).generate("a", DESTINATIONS, 20, columnar=True)
+    rows = PassengerGenerator(seed=3, pool_size=64).generate("a", DESTINATIONS, 20)
+
+    assert batch_size(columns) == batch_size(rows) == 20
+    assert attributes(as_rows(columns)) == attributes(rows)
+
+
+def test_given_destinations_are_used_in_order():
+    destinations = ["d", "b", "d", "c"]
+    rows = PassengerGenerator(seed=1, pool_size=64).generate("a", [], 4, destinations=destinations)
+    assert [row["destination_station_id"] for row in rows] == destinations
+
+
+def test_restored_state_continues_the_attribute_stream():
+    generator = PassengerGenerator(seed=5, pool_size=64)
+    generator.generate("a", DESTINATIONS, 10)
+    state = orjson.loads(orjson.dumps(generator.get_state()))  # As journaled
+    expected = generator.generate("a", DESTINATIONS, 10)
+
+    restarted = PassengerGenerator(seed=5, pool_size=64)
+    restarted.set_state(state)
+    assert attributes(restarted.generate("a", DESTINATIONS, 10)) == attributes(expected)
+
+
+def test_batch_count_jitters_around_the_rate():
+    generator = PassengerGenerator(seed=2, pool_size=64)
+    counts = [generator.batch_count(100) for _ in range(200)]
+    assert min(counts) >= 50 and max(counts) <= 150
@@ -0,0 +1,189 @@
+import asyncio
+import multiprocessing
+import os
+
+from app.core.journal import DELETE, INSERT, STATE, UPDATE, PassengerJournal, read_segment
+from app.core.persistence import Persistence
+from app.core.stats import GENERATED, IMPATIENT, SharedStats
+from app.core.storage import JournaledStore, MemoryStore
+
+
+def test_journal_round_trip(tmp_path):
+    journal = PassengerJournal(str(tmp_path))
+    journal.append(INSERT, rows=[{"id": "p", "status": "waiting"}])
+    journal.append(UPDATE, ids=["p"], data={"status": "boarded"})
+    journal.append(DELETE, ids=["p"])
+    journal.close()
+
+    records = list(PassengerJournal(str(tmp_path)).read())
+    assert [record["type"] for record in records] == [INSERT, UPDATE, DELETE]
+    assert records[1]["data"] == {"status": "boarded"}
+
+
+def test_journal_ignores_a_torn_last_record(tmp_path):
+    journal = PassengerJournal(str(tmp_path))
+    journal.append(DELETE, ids=["p"])
+    journal.append(DELETE, ids=["q"])
+    journal.close()
+    path = journal.path(journal.segment)
+    os.truncate(path, os.path.getsize(path) - 3)
+
+    assert [record["ids"] for record in read_segment(path)] == [["p"]]
+
+
+def test_journal_roll_and_prune(tmp_path):
+    journal = PassengerJournal(str(tmp_path))
+    journal.append(DELETE, ids=["p"])
+    assert journal.roll() == 2
+    journal.append(DELETE, ids=["q"])
+    journal.flush()
+    journal.prune(2)
+    journal.close()
+
+    assert journal.segments() == [2]
+    assert [record["ids"] for record in journal.read()] == [["q"]]
+
+
+async def _write_and_crash(directory: str) -> list:
+    """Writes passengers around a snapshot, then stops without a clean shutdown."""
+    journal = PassengerJournal(os.path.join(directory, "journal"))
+    memory = MemoryStore({"a": "A", "b": "B"})
+    persistence = Persistence(directory, journal, memory)
+    seed = {"value": 1}
+    persistence.register_state("seed", lambda: seed["value"], lambda value: seed.update(value=value))
+    store = JournaledStore(memory, journal)
+    await store.insert_passengers([
+        {"id": f"p{i}", "origin_station_id": "a", "destination_station_id": "b"} for i in range(10)
+    ])
+    await persistence.snapshot()
+    await store.update_passengers(["p1", "p2"], {"status": "in_transit", "train_id": "t1"})
+    await store.delete_passengers(["p3"])
+    seed["value"] = 42
+    persistence.record_state("seed")
+    journal.flush()
+    return await memory.get_all_passengers()
+
+
+async def _restore(directory: str, store=None):
+    persistence = Persistence(directory, PassengerJournal(os.path.join(directory, "journal")), store)
+    seed = {"value": None}
+    persistence.register_state("seed", lambda: seed["value"], lambda value: seed.update(value=value))
+    summary = await persistence.restore()
+    return summary, seed["value"]
+
+
+def test_restore_replays_the_journal_after_the_snapshot(tmp_path):
+    before = asyncio.run(_write_and_crash(str(tmp_path)))
+    restored = MemoryStore({"a": "A", "b": "B"})
+    summary, seed = asyncio.run(_restore(str(tmp_path), restored))
+
+    assert summary["snapshot"] is not None
+    assert summary["replayed"] == 2
+    assert seed == 42
+    after = asyncio.run(restored.get_all_passengers())
+    assert sorted(after, key=lambda row: row["id"]) == sorted(before, key=lambda row: row["id"])
+
+
+def test_restore_without_a_store_recovers_the_state(tmp_path):
+    journal = PassengerJournal(os.path.join(tmp_path, "journal"))
+    persistence = Persistence(str(tmp_path), journal)
+    seed = {"value": 7}
+    persistence.register_state("seed", lambda: seed["value"], lambda value: seed.update(value=value))
+    for _ in range(3):
+        asyncio.run(persistence.snapshot())
+    journal.close()
+
+    assert journal.segments() == [3, 4]
+    assert all(record["type"] == STATE for record in journal.read())
+    summary, restored = asyncio.run(_restore(str(tmp_path)))
+    assert restored == 7
+    assert summary["replayed"] == 0
+
+
+def test_writers_follow_a_roll_made_by_another_journal(tmp_path):
+    owner, writer = PassengerJournal(str(tmp_path)), PassengerJournal(str(tmp_path))
+    writer.append(DELETE, ids=["before"])
+    writer.flush()
+    owner.roll()
+    writer.append(DELETE, ids=["after"])
+    writer.flush()
+    assert writer.segment == 2
+
+    owner.roll()
+    owner.prune(3)  # The writer's open segment is gone
+    writer.append(DELETE, ids=["pruned"])
+    writer.flush()
+    writer.close()
+
+    assert writer.segment == 3 and owner.segments() == [3]
+    assert [record["ids"] for record in owner.read()] == [["pruned"]]
+
+
+def append_in_child(directory: str, count: int) -> None:
+    journal = PassengerJournal(directory, flush_interval=0)
+    for i in range(count):
+        journal.append(DELETE, ids=[f"{os.getpid()}-{i}"])
+        journal.flush()
+    journal.close()
+
+
+def test_records_from_other_processes_survive_rolls_and_prunes(tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    owner = PassengerJournal(directory)
+    pruned = []
+    remove = os.remove
+
+    def counting_remove(path):
+        pruned.extend(read_segment(path))  # Under the segment's lock: nothing can be added after this
+        remove(path)
+
+    context = multiprocessing.get_context("fork")
+    children = [context.Process(target=append_in_child, args=(directory, 300)) for _ in range(2)]
+    for child in children:
+        child.start()
+    with monkeypatch.context() as patch:
+        patch.setattr(os, "remove", counting_remove)
+        while any(child.is_alive() for child in children):
+            owner.prune(owner.roll())
+    for child in children:
+        child.join()
+        assert child.exitcode == 0
+
+    assert len(pruned) + len(list(owner.read())) == 600
+
+
+def test_only_the_owner_rolls_and_prunes(tmp_path):
+    journal = PassengerJournal(os.path.join(tmp_path, "journal"))
+    persistence = Persistence(str(tmp_path), journal, interval=0.01)
+    assert not persistence.owner
+
+    async def snapshots():
+        task = asyncio.ensure_future(persistence.run())
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+    asyncio.run(snapshots())
+    assert persistence.owner and journal.segment > 1
+
+
+def test_stats_are_restored_once_when_the_file_was_lost(tmp_path):
+    directory, stats_dir = str(tmp_path), os.path.join(tmp_path, "stats")
+    os.makedirs(stats_dir)
+    stats = SharedStats(os.path.join(stats_dir, "first.bin"), slots=4, window=60)
+    stats.add(GENERATED, 10)
+    stats.add(IMPATIENT, 2)
+    persistence = Persistence(directory, PassengerJournal(os.path.join(directory, "journal")))
+    persistence.register_state("stats", stats.totals, stats.restore)
+    persistence.record_state("stats")
+    persistence.journal.close()
+
+    fresh = SharedStats(os.path.join(stats_dir, "second.bin"), slots=4, window=60)  # The file did not survive
+    for _ in range(2):  # Every worker restores
+        restored = Persistence(directory, PassengerJournal(os.path.join(directory, "journal")))
+        restored.register_state("stats", fresh.totals, fresh.restore)
+        asyncio.run(restored.restore())
+    assert fresh.totals() == {"generated": 10, "arrived": 0, "impatient": 2}
+
+    fresh.add(GENERATED, 5)
+    fresh.restore({"generated": 10})  # The file survived: nothing to add
+    assert fresh.totals()["generated"] == 15
@@ -0,0 +1,91 @@
+import asyncio
+import random
+
+import orjson
+import pytest
+
+from app.core.storage import MemoryStore, SupabaseStore
+from app.simulation.generator import PassengerGenerator, as_rows
+from benchmarks.fake_supabase import FakeClient
+
+STATIONS = [f"s{i}" for i in range(5)]
+
+
+@pytest.fixture
+def capped_store():
+    """A Supabase store whose server returns at most 5 rows per request, holding 12 passengers."""
+    client = FakeClient(station_count=2, max_rows=5)
+    client.load([{"id": f"p{i:02d}", "origin_station_id": "station-1"} for i in range(12)])
+    store = SupabaseStore(client)
+    yield store
+    store.close()
+
+
+def test_pages_shorter_than_the_limit_still_have_a_cursor(api, capped_store):
+    client = api(capped_store)
+    ids, after, requests = [], None, 0
+    while True:
+        response = client.get("/passengers/", params={"limit": 10, **({"after": after} if after else {})})
+        requests += 1
+        assert response.status_code == 200
+        ids += [row["id"] for row in response.json()]
+        after = response.headers.get("X-Next-Cursor")
+        if after is None:
+            break
+    assert ids == [f"p{i:02d}" for i in range(12)]
+    assert requests == 4  # Three capped pages and the empty one that ends the walk
+
+
+def test_stream_reads_past_the_server_row_cap(api, capped_store):
+    response = api(capped_store).get("/passengers/", params={"stream": "true", "limit": 10, "fields": "status"})
+    rows = [orjson.loads(line) for line in response.content.splitlines()]
+    assert [row["id"] for row in rows] == [f"p{i:02d}" for i in range(12)]
+    assert set(rows[0]) == {"id", "status"}
+
+
+def test_supabase_store_reads_everything_past_the_server_row_cap(capped_store):
+    rows = asyncio.run(capped_store.find_passengers(status="waiting"))
+    assert len(rows) == 12
+
+
+async def _page_through(store: MemoryStore, limit: int, **filters) -> list:
+    ids, after = [], None
+    while True:
+        page = await store.list_passengers(after=after, limit=limit, **filters)
+        if not page:
+            return ids
+        ids += [row["id"] for row in page]
+        after = page[-1]["id"]
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_memory_store_pages_match_a_full_scan(seed):
+    async def scenario():
+        rng = random.Random(seed)
+        generator = PassengerGenerator(seed=seed)
+        store = MemoryStore()
+        for _ in range(8):
+            origin = rng.choice(STATIONS)
+            destinations = [station for station in STATIONS if station != origin]
+            await store.insert_passengers(as_rows(generator.generate(origin, destinations, rng.randint(1, 60))))
+            ids = [row["id"] for row in await store.get_all_passengers()]
+            rng.shuffle(ids)
+            await store.transition_passengers(ids[:20], "waiting", {"status": "boarding", "train_id": rng.choice(["T1", "T2"])})
+            await store.transition_passengers(ids[20:30], "boarding", {"status": "in_transit"})
+            await store.transition_passengers(ids[30:40], "in_transit", {"status": "arrived", "current_station_id": "s1"})
+            await store.delete_passengers(ids[40:45])
+
+            rows = await store.get_all_passengers()
+            for status in (None, "waiting", "boarding", "arrived"):
+                for station_id in (None, "s1", "unknown"):
+                    for train_id in (None, "T1"):
+                        filters = {"status": status, "station_id": station_id, "train_id": train_id}
+                        expected = sorted(
+                            row["id"] for row in rows
+                            if status in (None, row["status"])
+                            and station_id in (None, row["current_station_id"])
+                            and train_id in (None, row["train_id"])
+                        )
+                        assert await _page_through(store, rng.choice([1, 7, 50]), **filters) == expected, filters
+
+    asyncio.run(scenario())
@@ -0,0 +1,84 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.storage import MemoryStore, create_store
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def store():
+    store = MemoryStore({"a": "Station A", "b": "Station B"})
+    run(store.insert_passengers([
+        {"id": f"p{i}", "origin_station_id": "a", "destination_station_id": "b", "patience": 60} for i in range(4)
+    ]))
+    return store
+
+
+def test_create_store_builds_the_memory_backend_with_synthetic_stations():
+    class Settings:
+        storage_backend = "memory"
+        memory_station_count = 3
+
+    store = create_store(Settings())
+    assert isinstance(store, MemoryStore)
+    assert run(store.get_station_names()) == {f"station-{i}": f"Station {i}" for i in range(1, 4)}
+
+
+def test_inserted_rows_get_database_defaults(store):
+    row = run(store.create_passenger({"origin_station_id": "a", "destination_station_id": "b"}))
+    assert row["id"]
+    assert row["status"] == "waiting"
+    assert row["current_station_id"] == "a"
+    assert row["spawn_time"]
+    assert run(store.get_passenger(row["id"])) == row
+
+
+def test_duplicate_ids_are_rejected_without_storing_the_batch(store):
+    with pytest.raises(ValueError):
+        run(store.insert_passengers([{"id": "new", "origin_station_id": "a"}, {"id": "p0", "origin_station_id": "a"}]))
+    assert run(store.get_passenger("new")) is None
+    assert len(store) == 4
+
+
+def test_update_and_delete(store):
+    assert run(store.update_passenger("p0", {"current_station_id": "b"}))["current_station_id"] == "b"
+    assert [row["id"] for row in run(store.find_passengers(station_id="b"))] == ["p0"]
+    assert run(store.update_passenger("missing", {"status": "arrived"})) is None
+
+    assert run(store.delete_passenger("p0"))["id"] == "p0"
+    assert run(store.delete_passenger("p0")) is None
+    assert run(store.find_passengers(station_id="b")) == []
+
+
+def test_transition_only_moves_passengers_in_the_expected_status(store):
+    run(store.transition_passengers(["p0"], "waiting", {"status": "boarding", "train_id": "t1"}))
+    updated = run(store.transition_passengers(["p0", "p1", "missing"], "waiting", {"status": "boarding", "train_id": "t2"}))
+
+    assert [row["id"] for row in updated] == ["p1"]
+    assert run(store.get_passenger_statuses(["p0", "p1", "p2", "missing"])) == {
+        "p0": "boarding", "p1": "boarding", "p2": "waiting",
+    }
+    assert {row["id"] for row in run(store.find_passengers(train_id="t1"))} == {"p0"}
+
+
+def test_expire_removes_only_waiting_passengers(store):
+    run(store.transition_passengers(["p0"], "waiting", {"status": "boarding", "train_id": "t1"}))
+    expired = run(store.expire_passengers(["p0", "p1"]))
+
+    assert [(row["id"], row["status"]) for row in expired] == [("p1", "impatient")]
+    assert run(store.get_passenger("p1")) is None
+    assert run(store.get_passenger("p0")) is not None
+
+
+def test_incremental_waiting_reads_only_return_recent_waiting_passengers(store):
+    since = (datetime.now(timezone.utc) - timedelta(minutes=1)).isoformat()
+    run(store.transition_passengers(["p0"], "waiting", {"status": "boarding", "train_id": "t1"}))
+
+    assert {row["id"] for row in run(store.get_waiting_passengers(since))} == {"p1", "p2", "p3"}
+    later = (datetime.now(timezone.utc) + timedelta(minutes=1)).isoformat()
+    assert run(store.get_waiting_passengers(later)) == []
@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from prometheus_client import CollectorRegistry, generate_latest
+from prometheus_client.core import REGISTRY
+
+from app.core.metrics import CacheCollector, LoopTimer, MetricsMiddleware, db_errors, db_latency, timed
+from app.core.storage import CachedStore, MemoryStore
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_requests_are_recorded_by_route_template():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/things/{thing_id}")
+    async def read_thing(thing_id: str):
+        if thing_id == "missing":
+            raise HTTPException(status_code=404)
+        return {"id": thing_id}
+
+    labels = {"method": "GET", "route": "/things/{thing_id}"}
+    before = sample("trainsim_http_request_duration_seconds_count", **labels)
+    client = TestClient(app)
+    for thing_id in ("a", "b", "missing"):
+        client.get(f"/things/{thing_id}")
+    client.get("/nowhere")
+
+    assert sample("trainsim_http_request_duration_seconds_count", **labels) == before + 3
+    assert sample("trainsim_http_requests_total", **labels, status="404") >= 1
+    assert sample("trainsim_http_requests_total", method="GET", route="unmatched", status="404") >= 1
+
+
+def test_timed_records_durations_and_failures():
+    calls = {"ok": 0}
+
+    @timed(db_latency.labels("test_operation"), db_errors.labels("test_operation"))
+    async def operation(fail: bool):
+        if fail:
+            raise RuntimeError("storage unavailable")
+        calls["ok"] += 1
+
+    asyncio.run(operation(False))
+    with pytest.raises(RuntimeError):
+        asyncio.run(operation(True))
+    assert sample("trainsim_db_operation_duration_seconds_count", operation="test_operation") == 2
+    assert sample("trainsim_db_operation_errors_total", operation="test_operation") == 1
+
+
+def test_loop_timer_records_lag_but_not_error_back_off():
+    timer = LoopTimer("test_loop")
+    timer.finish(timer.start(), delay=0.0)
+    time.sleep(0.01)
+    timer.start()  # Started 10ms past its due time
+    timer.error()
+    timer.start()
+    timer.rows("read", 5)
+
+    assert sample("trainsim_loop_iteration_duration_seconds_count", loop="test_loop") == 1
+    assert sample("trainsim_loop_lag_seconds_count", loop="test_loop") == 1
+    assert sample("trainsim_loop_lag_seconds_sum", loop="test_loop") >= 0.01
+    assert sample("trainsim_loop_errors_total", loop="test_loop") == 1
+    assert sample("trainsim_loop_rows_bucket", loop="test_loop", kind="read", le="10.0") == 1
+
+
+def test_cache_counters_are_exported():
+    cache = CachedStore(MemoryStore(), max_size=1, ttl=60)
+
+    async def scenario():
+        for passenger_id in ("p0", "p1", "p1"):
+            await cache.get_passenger(passenger_id)
+
+    asyncio.run(scenario())
+    registry = CollectorRegistry()
+    registry.register(CacheCollector(cache))
+
+    assert registry.get_sample_value("trainsim_passenger_cache_lookups_total", {"result": "hits"}) == 1
+    assert registry.get_sample_value("trainsim_passenger_cache_lookups_total", {"result": "misses"}) == 2
+    assert registry.get_sample_value("trainsim_passenger_cache_evictions_total") == 1
+    assert registry.get_sample_value("trainsim_passenger_cache_expirations_total") == 0
+    assert registry.get_sample_value("trainsim_passenger_cache_entries") == 1
+    assert b"trainsim_passenger_cache_evictions_total 1.0" in generate_latest(registry)
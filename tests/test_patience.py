@@ -0,0 +1,85 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.api.passengers import sweep_patience
+from app.core.coordination import coordinator
+from app.core.storage import SupabaseStore
+from app.simulation.patience import PatienceScheduler, patience_scheduler, to_epoch
+from benchmarks.fake_supabase import FakeClient
+
+SPAWNED = "2024-01-01T00:00:00+00:00"
+
+
+def test_to_epoch_accepts_strings_datetimes_and_numbers():
+    moment = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    assert to_epoch(SPAWNED) == to_epoch(moment) == to_epoch(moment.timestamp())
+
+
+def test_pop_expired_returns_due_passengers_in_deadline_order():
+    scheduler = PatienceScheduler()
+    scheduler.schedule("late", SPAWNED, 90)
+    scheduler.schedule("early", SPAWNED, 30)
+    scheduler.schedule("middle", SPAWNED, 60)
+    start = to_epoch(SPAWNED)
+
+    assert scheduler.pop_expired(start + 29) == []
+    assert scheduler.pop_expired(start + 60) == ["early", "middle"]
+    assert list(scheduler._deadlines) == ["late"]
+
+
+def test_rescheduled_and_discarded_passengers_do_not_expire_early():
+    scheduler = PatienceScheduler()
+    scheduler.schedule_deadline("moved", 10.0)
+    scheduler.schedule_deadline("moved", 50.0)
+    scheduler.schedule_deadline("gone", 10.0)
+    scheduler.discard("gone")
+
+    assert scheduler.pop_expired(20.0) == []
+    assert scheduler.pop_expired(50.0) == ["moved"]
+    assert len(scheduler) == 0
+
+
+def test_track_follows_the_status_and_patience_of_a_row():
+    scheduler = PatienceScheduler()
+    scheduler.track({"id": "p", "status": "waiting", "spawn_time": SPAWNED, "patience": 30})
+    assert "p" in scheduler
+    scheduler.track({"id": "p", "status": "boarding", "spawn_time": SPAWNED, "patience": 30})
+    assert "p" not in scheduler
+    scheduler.track({"id": "q", "status": "waiting", "spawn_time": SPAWNED, "patience": None})
+    assert "q" not in scheduler
+
+
+def test_compaction_keeps_only_live_deadlines():
+    scheduler = PatienceScheduler()
+    for i in range(3000):
+        scheduler.schedule_deadline("p", float(i))  # Each call leaves a stale entry behind
+    assert len(scheduler._heap) < 3000
+    assert scheduler.pop_expired(2998.0) == []
+    assert scheduler.pop_expired(2999.0) == ["p"]
+
+
+@pytest.fixture
+def leader():
+    """Makes this process the background leader, so it schedules every station's passengers."""
+    assert coordinator.try_acquire()
+    yield
+    coordinator.release()
+    patience_scheduler.clear()
+
+
+def test_sweep_expires_waiting_passengers_past_the_server_row_cap(leader):
+    client = FakeClient(station_count=2, max_rows=10)
+    old = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+    client.load([
+        {"id": f"p{i:02d}", "origin_station_id": "station-1", "spawn_time": old, "patience": 30} for i in range(25)
+    ])
+    store = SupabaseStore(client)
+    try:
+        expired = asyncio.run(sweep_patience(store))
+    finally:
+        store.close()
+
+    assert expired == 25
+    assert client.tables["passengers"] == {}
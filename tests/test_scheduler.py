@@ -0,0 +1,117 @@
+import asyncio
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from app.simulation.generator import PassengerGenerator
+from app.simulation.scheduler import ArrivalProfile, GenerationScheduler, merge_batches
+
+STATIONS = ["a", "b", "c"]
+NOON = datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+
+
+def test_rates_come_from_stations_defaults_and_the_hourly_profile():
+    profile = ArrivalProfile(0.5, {"b": 2.0}, [1.0] * 12 + [3.0] * 12)
+    np.testing.assert_allclose(profile.rates(STATIONS, NOON), [1.5, 6.0, 1.5])
+
+
+def test_hourly_profile_needs_24_values():
+    with pytest.raises(ValueError):
+        ArrivalProfile(1.0, hourly_multipliers=[1.0] * 23)
+
+
+def test_arrivals_are_poisson_with_the_mean_rate_times_interval():
+    counts = ArrivalProfile(0.2).sample(["a"] * 20000, 10.0, np.random.default_rng(1), NOON)
+    assert abs(counts.mean() - 2.0) < 0.05
+    assert abs(counts.var() - 2.0) < 0.1
+
+
+def test_merge_batches_concatenates_columns():
+    merged = merge_batches([{"id": ["1"], "age": [5]}, {"id": ["2", "3"], "age": [6, 7]}])
+    assert merged == {"id": ["1", "2", "3"], "age": [5, 6, 7]}
+
+
+def make_scheduler(insert, **options) -> GenerationScheduler:
+    generator = PassengerGenerator(seed=1, pool_size=16)
+    return GenerationScheduler(
+        generate=lambda station_id, destinations, n: generator.generate(
+            station_id, [], n, columnar=True, destinations=destinations),
+        insert=insert,
+        profile=ArrivalProfile(1.0),
+        rng=np.random.default_rng(1),
+        interval=10.0,
+        **options,
+    )
+
+
+def test_batches_queued_during_a_slow_insert_are_merged():
+    inserted = []
+    release = asyncio.Event()
+
+    async def insert(station_id, batch):
+        await release.wait()
+        inserted.append((station_id, len(batch["id"])))
+
+    async def scenario():
+        scheduler = make_scheduler(insert, station_filter=lambda station_id: station_id == "a")
+        first = scheduler.run_cycle(STATIONS)
+        await asyncio.sleep(0)  # The first insert starts and blocks
+        second = scheduler.run_cycle(STATIONS)
+        assert scheduler.pending == second and scheduler.inflight == 1
+        release.set()
+        await scheduler.drain()
+        return first, second, scheduler
+
+    first, second, scheduler = asyncio.run(scenario())
+    assert inserted == [("a", first), ("a", second)]  # Two inserts for two cycles, nothing from b or c
+    assert scheduler.pending == 0 and scheduler.inflight == 0
+
+
+def test_inserts_run_concurrently_up_to_max_inflight():
+    running = peak = 0
+
+    async def insert(station_id, batch):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    async def scenario():
+        scheduler = make_scheduler(insert, max_inflight=2)
+        scheduler.run_cycle([f"s{i}" for i in range(6)])
+        await scheduler.drain()
+
+    asyncio.run(scenario())
+    assert peak == 2
+
+
+def test_a_full_backlog_skips_generation_at_that_station():
+    release = asyncio.Event()
+
+    async def insert(station_id, batch):
+        await release.wait()
+
+    async def scenario():
+        scheduler = make_scheduler(insert, max_pending=1)
+        scheduler.run_cycle(STATIONS)
+        await asyncio.sleep(0)
+        scheduler.run_cycle(STATIONS)  # Queued behind the blocked inserts
+        backlog = scheduler.pending
+        assert scheduler.run_cycle(STATIONS) == 0
+        assert scheduler.pending == backlog
+        release.set()
+        await scheduler.drain()
+
+    asyncio.run(scenario())
+
+
+def test_no_passengers_are_generated_without_a_destination():
+    async def insert(station_id, batch):
+        raise AssertionError("nothing should be inserted")
+
+    async def scenario():
+        return make_scheduler(insert).run_cycle(["only"])
+
+    assert asyncio.run(scenario()) == 0
@@ -0,0 +1,70 @@
+import asyncio
+from datetime import datetime, timezone
+
+import orjson
+
+from app.core.serialization import RowsResponse, dumps, dumps_ndjson, model_response
+from app.core.storage import MemoryStore
+from app.models.passenger import Passenger, PassengerStatus
+from app.simulation.patience import to_epoch
+
+ROW = {
+    "id": "p1",
+    "origin_station_id": "a",
+    "destination_station_id": "b",
+    "first_name": "Ada",
+    "last_name": "Lovelace",
+    "age": 36,
+    "ticket_type": "adult",
+    "luggage_size": "small",
+    "email": "ada@example.com",
+    "phone_number": "555-0100",
+    "spawn_time": "2024-01-01T12:00:00+00:00",
+    "status": "waiting",
+    "current_station_id": "a",
+    "train_id": None,
+    "patience": 60,
+    "board_time": None,
+    "arrival_time": None,
+}
+
+
+def test_dumps_handles_datetimes_enums_and_models():
+    moment = datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+    passenger = Passenger(**ROW)
+    decoded = orjson.loads(dumps({"at": moment, "status": PassengerStatus.boarding, "passenger": passenger}))
+    assert decoded["at"] == "2024-01-01T12:00:00+00:00"
+    assert decoded["status"] == "boarding"
+    assert decoded["passenger"] == orjson.loads(passenger.model_dump_json())
+
+
+def test_ndjson_puts_one_row_per_line():
+    data = dumps_ndjson([{"id": "p1"}, {"id": "p2"}])
+    assert data == b'{"id":"p1"}\n{"id":"p2"}\n'
+
+
+def test_rows_response_encodes_rows_as_they_are():
+    response = RowsResponse([ROW], headers={"X-Next-Cursor": "p1"})
+    assert response.media_type == "application/json"
+    assert orjson.loads(response.body) == [ROW]
+    assert response.headers["X-Next-Cursor"] == "p1"
+
+
+def test_model_response_matches_the_validated_model():
+    passenger = Passenger(**ROW)
+    response = model_response(passenger, status_code=201)
+    assert response.status_code == 201
+    assert orjson.loads(response.body) == orjson.loads(passenger.model_dump_json())
+
+
+def test_lookups_and_pages_return_the_fields_of_the_model(api):
+    store = MemoryStore({"a": "A", "b": "B"})
+    asyncio.run(store.insert_passengers([ROW]))
+    client = api(store)
+    expected = orjson.loads(Passenger(**ROW).model_dump_json())
+
+    for row in (client.get("/passengers/p1").json(), client.get("/passengers/").json()[0]):
+        assert set(row) == set(expected)
+        assert {key: value for key, value in row.items() if key != "spawn_time"} == \
+            {key: value for key, value in expected.items() if key != "spawn_time"}
+        assert to_epoch(row["spawn_time"]) == to_epoch(expected["spawn_time"])
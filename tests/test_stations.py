@@ -0,0 +1,79 @@
+import asyncio
+
+from app.core.stations import StationRegistry
+from app.core.storage import MemoryStore
+
+
+class CountingStore(MemoryStore):
+    """A memory store that counts station reads and can make them slow."""
+
+    def __init__(self, stations, delay: float = 0.0):
+        super().__init__(stations)
+        self.delay = delay
+        self.reads = 0
+
+    async def get_station_names(self):
+        self.reads += 1
+        await asyncio.sleep(self.delay)
+        return await super().get_station_names()
+
+
+def test_first_get_loads_and_later_gets_are_cached():
+    async def scenario():
+        store = CountingStore({"a": "A", "b": "B"})
+        registry = StationRegistry(ttl=60)
+        await registry.get(store)
+        await registry.get(store)
+        return store, registry
+
+    store, registry = asyncio.run(scenario())
+    assert store.reads == 1
+    assert "a" in registry and "z" not in registry
+    assert registry.ids == ["a", "b"]
+    assert registry.names == {"a": "A", "b": "B"}
+
+
+def test_concurrent_first_loads_share_one_read():
+    async def scenario():
+        store = CountingStore({"a": "A"}, delay=0.01)
+        registry = StationRegistry(ttl=60)
+        await asyncio.gather(*(registry.get(store) for _ in range(10)))
+        return store
+
+    assert asyncio.run(scenario()).reads == 1
+
+
+def test_expired_stations_are_served_while_one_refresh_runs():
+    async def scenario():
+        store = CountingStore({"a": "A"}, delay=0.01)
+        registry = StationRegistry(ttl=0)
+        await registry.get(store)
+        store.add_station("b", "B")
+        await asyncio.sleep(0.001)
+        stale = [list((await registry.get(store)).ids) for _ in range(5)]  # Never waits on the refresh
+        await asyncio.sleep(0.05)
+        return store, registry, stale
+
+    store, registry, stale = asyncio.run(scenario())
+    assert stale == [["a"]] * 5
+    assert store.reads == 2
+    assert registry.ids == ["a", "b"]
+
+
+def test_invalidate_reloads_and_bumps_the_version_on_changes():
+    async def scenario():
+        store = CountingStore({"a": "A"})
+        registry = StationRegistry(ttl=60)
+        await registry.get(store)
+        first = registry.version
+        registry.invalidate()
+        await registry.get(store)
+        unchanged = registry.version
+        store.add_station("b", "B")
+        registry.invalidate()
+        await registry.get(store)
+        return first, unchanged, registry.version
+
+    first, unchanged, changed = asyncio.run(scenario())
+    assert unchanged == first
+    assert changed == first + 1
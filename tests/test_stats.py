@@ -0,0 +1,62 @@
+import asyncio
+import multiprocessing
+import os
+
+from app.core.stats import ARRIVED, GENERATED, IMPATIENT, SharedStats, passenger_stats
+from app.core.storage import MemoryStore
+
+
+def add_in_child(stats: SharedStats, n: int) -> None:
+    stats.add(GENERATED, n)
+    stats.add(IMPATIENT, 1)
+
+
+def run_in_child(stats: SharedStats, n: int) -> None:
+    child = multiprocessing.get_context("fork").Process(target=add_in_child, args=(stats, n))
+    child.start()
+    child.join()
+    assert child.exitcode == 0
+
+
+def test_counts_from_every_process_are_summed(tmp_path):
+    stats = SharedStats(os.path.join(tmp_path, "stats.bin"), slots=4, window=60)
+    stats.add(GENERATED, 5)
+    stats.add(ARRIVED)
+    run_in_child(stats, 10)
+
+    assert stats.totals() == {"generated": 15, "arrived": 1, "impatient": 1}
+    assert stats.window_totals(60) == {"generated": 15, "arrived": 1, "impatient": 1}
+    assert stats.rate_per_minute(30)["generated"] == 30.0
+
+
+def test_exited_processes_leave_their_counts_and_free_their_slot(tmp_path):
+    stats = SharedStats(os.path.join(tmp_path, "stats.bin"), slots=2, window=60)
+    for _ in range(3):  # More processes than slots over time: dead ones are reclaimed
+        run_in_child(stats, 1)
+    assert stats.totals()["generated"] == 3
+
+
+def test_another_process_opening_the_file_sees_the_counts(tmp_path):
+    path = os.path.join(tmp_path, "stats.bin")
+    SharedStats(path, slots=4, window=60).add(GENERATED, 7)
+    assert SharedStats(path, slots=4, window=60).totals()["generated"] == 7
+    assert SharedStats(path, slots=8, window=60).totals()["generated"] == 0  # Another layout starts over
+
+
+def test_non_positive_amounts_are_ignored(tmp_path):
+    stats = SharedStats(os.path.join(tmp_path, "stats.bin"), slots=2, window=60)
+    stats.add(GENERATED, 0)
+    stats.add(GENERATED, -3)
+    assert stats.totals()["generated"] == 0
+
+
+def test_put_counts_a_status_change_once(api):
+    store = MemoryStore({"a": "A", "b": "B"})
+    asyncio.run(store.insert_passengers([{"id": "p", "origin_station_id": "a", "destination_station_id": "b"}]))
+    client = api(store)
+    before = passenger_stats.totals()["arrived"]
+
+    for _ in range(2):
+        assert client.put("/passengers/p", json={"status": "arrived"}).status_code == 200
+    assert passenger_stats.totals()["arrived"] == before + 1
+    assert client.put("/passengers/missing", json={"status": "arrived"}).status_code == 404
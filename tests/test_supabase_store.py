@@ -0,0 +1,74 @@
+import asyncio
+import threading
+import time
+
+from app.core.storage import SupabaseStore
+from benchmarks.fake_supabase import FakeClient
+
+
+def test_queries_run_off_the_event_loop():
+    async def scenario():
+        store = SupabaseStore(FakeClient(latency=0.2))
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        try:
+            await store.get_station_ids()
+        finally:
+            task.cancel()
+            store.close()
+        return ticks
+
+    assert asyncio.run(scenario()) >= 10  # The loop kept running during the 200 ms query
+
+
+def test_reads_and_writes_have_separate_limits():
+    class CountingClient(FakeClient):
+        """Records the most queries running at once, split by action."""
+
+        def __init__(self):
+            super().__init__(latency=0.05)
+            self.running = {"select": 0, "insert": 0}
+            self.peak = {"select": 0, "insert": 0}
+            self.counts_lock = threading.Lock()
+
+        def table(self, name):
+            query = super().table(name)
+            execute = query.execute
+
+            def counted():
+                action = query.action
+                with self.counts_lock:
+                    self.running[action] += 1
+                    self.peak[action] = max(self.peak[action], self.running[action])
+                try:
+                    return execute()
+                finally:
+                    with self.counts_lock:
+                        self.running[action] -= 1
+
+            query.execute = counted
+            return query
+
+    async def scenario(client):
+        store = SupabaseStore(client, max_workers=16, max_reads=3, max_writes=2)
+        try:
+            started = time.perf_counter()
+            await asyncio.gather(
+                *(store.get_passenger(f"p{i}") for i in range(9)),
+                *(store.insert_passengers([{"id": f"p{i}", "origin_station_id": "station-1"}]) for i in range(4)),
+            )
+            return time.perf_counter() - started
+        finally:
+            store.close()
+
+    client = CountingClient()
+    elapsed = asyncio.run(scenario(client))
+    assert client.peak == {"select": 3, "insert": 2}
+    assert elapsed < 9 * 0.05  # Reads overlapped with each other and with the writes
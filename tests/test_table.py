@@ -0,0 +1,137 @@
+import asyncio
+import random
+
+import numpy as np
+import pytest
+
+from app.core.storage import MemoryStore
+from app.simulation.generator import PassengerGenerator, as_rows
+from app.simulation.table import PassengerTable, StringPool
+
+STATIONS = [f"s{i}" for i in range(5)]
+
+
+def passenger(passenger_id: str, **data):
+    return {"id": passenger_id, "origin_station_id": "a", "destination_station_id": "b", "status": "waiting",
+            "spawn_time": "2024-01-01T00:00:00+00:00", **data}
+
+
+def test_rows_round_trip_through_the_columns():
+    generator = PassengerGenerator(seed=3)
+    rows = as_rows(generator.generate("a", ["b", "c"], 50))
+    table = PassengerTable(capacity=4)  # Forces the columns to grow
+    table.append(rows)
+
+    assert len(table) == 50
+    for row in rows:
+        stored = table.get(row["id"])
+        assert {name: stored[name] for name in row if name != "spawn_time"} == {
+            name: value for name, value in row.items() if name != "spawn_time"
+        }
+
+
+def test_removed_slots_are_reused_and_free_slots_are_skipped():
+    table = PassengerTable()
+    table.append([passenger("p0"), passenger("p1"), passenger("p2")])
+    assert table.remove_slots([table.slot("p1")]) == ["p1"]
+    assert "p1" not in table and table.get("p1") is None
+    assert table.ids_at(table.live_slots()) == ["p0", "p2"]
+
+    slots = table.append([passenger("p3")])
+    assert slots.tolist() == [1] and table.size == 3
+
+
+def test_bad_batches_leave_the_table_untouched():
+    table = PassengerTable()
+    table.append([passenger("p0")])
+    with pytest.raises(ValueError):
+        table.append([passenger("p1"), passenger("p0")])
+    with pytest.raises(ValueError):
+        table.append([passenger("p1"), passenger("p1")])
+    with pytest.raises(ValueError):
+        table.append([passenger("p1", status="lost")])  # Enum columns are closed
+    with pytest.raises(ValueError):
+        table.update(table.slot("p0"), {"unknown": 1})
+    assert len(table) == 1 and table.size == 1
+
+
+def test_column_subsets_and_projections():
+    table = PassengerTable(("current_station_id", "train_id"))
+    table.append([passenger("p0", current_station_id="a", train_id="t1")])
+    assert table.column_names == ("status", "current_station_id", "train_id")
+    assert table.get("p0") == {"id": "p0", "status": "waiting", "current_station_id": "a", "train_id": "t1"}
+    assert table.rows([0], ["train_id", "name"]) == [{"id": "p0", "train_id": "t1", "name": None}]
+
+
+def test_string_pools_intern_values():
+    pool = StringPool()
+    assert pool.encode_many(["a", "b", "a", None]) == [0, 1, 0, -1]
+    assert pool.lookup("c") is None and len(pool) == 2
+    with pytest.raises(ValueError):
+        StringPool(["x"]).encode("y")
+
+
+def test_export_round_trip():
+    table = PassengerTable()
+    table.append([passenger(f"p{i}", train_id=f"t{i % 2}") for i in range(5)])
+    table.remove_slots([table.slot("p2")])
+    restored = PassengerTable.from_export(table.export())
+
+    assert len(restored) == 4 and "p2" not in restored
+    assert [restored.get(f"p{i}") for i in (0, 1, 3, 4)] == [table.get(f"p{i}") for i in (0, 1, 3, 4)]
+    assert restored.append([passenger("p5")]).tolist() == [2]  # The freed slot survives the export
+    assert np.isnan(PassengerTable.from_export(PassengerTable().export()).spawn_time).all()
+
+
+async def _page_through(store: MemoryStore, limit: int, **filters) -> list:
+    ids, after = [], None
+    while True:
+        page = await store.list_passengers(after=after, limit=limit, **filters)
+        ids += [row["id"] for row in page]
+        if len(page) < limit:
+            return ids
+        after = page[-1]["id"]
+
+
+async def _check_queries(store: MemoryStore, rng: random.Random) -> None:
+    rows = await store.get_all_passengers()
+    for status in (None, "waiting", "boarding", "arrived"):
+        for station_id in (None, "s1", "unknown"):
+            for train_id in (None, "T1"):
+                filters = {"status": status, "station_id": station_id, "train_id": train_id}
+                expected = sorted(
+                    row["id"] for row in rows
+                    if status in (None, row["status"])
+                    and station_id in (None, row["current_station_id"])
+                    and train_id in (None, row["train_id"])
+                )
+                assert await _page_through(store, rng.choice([1, 7, 50]), **filters) == expected, filters
+                if status or station_id or train_id:
+                    found = await store.find_passengers(**filters)
+                    assert sorted(row["id"] for row in found) == expected, filters
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_store_pages_match_a_full_scan_across_restores(seed):
+    async def scenario():
+        rng = random.Random(seed)
+        generator = PassengerGenerator(seed=seed)
+        store = MemoryStore()
+        for step in range(12):
+            origin = rng.choice(STATIONS)
+            destinations = [station for station in STATIONS if station != origin]
+            await store.insert_passengers(as_rows(generator.generate(origin, destinations, rng.randint(1, 60))))
+            ids = [row["id"] for row in await store.get_all_passengers()]
+            rng.shuffle(ids)
+            await store.transition_passengers(ids[:20], "waiting", {"status": "boarding", "train_id": rng.choice(["T1", "T2"])})
+            await store.transition_passengers(ids[20:30], "boarding", {"status": "in_transit"})
+            await store.transition_passengers(ids[30:40], "in_transit", {"status": "arrived", "current_station_id": "s1"})
+            await store.expire_passengers(ids[40:45])
+            await store.delete_passengers(ids[45:50])
+            if step % 4 == 3:
+                restored = MemoryStore()
+                restored.restore(PassengerTable.from_export(store.export()))
+                store = restored
+            await _check_queries(store, rng)
+
+    asyncio.run(scenario())
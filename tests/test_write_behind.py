@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+
+from app.core.storage import MemoryStore, WriteBehindStore
+from app.core.storage.write_behind import DELETE, INSERT, MAX_ATTEMPTS, UPDATE, PendingWrite, merge
+
+
+class FlakyStore(MemoryStore):
+    """A memory store whose deletes and inserts can be made to fail."""
+
+    def __init__(self):
+        super().__init__()
+        self.failing_deletes = 0
+        self.failing_inserts = False
+
+    async def delete_passengers(self, passenger_ids):
+        if self.failing_deletes:
+            self.failing_deletes -= 1
+            raise RuntimeError("storage unavailable")
+        return await super().delete_passengers(passenger_ids)
+
+    async def insert_passengers(self, rows):
+        if self.failing_inserts:
+            raise RuntimeError("storage unavailable")
+        return await super().insert_passengers(rows)
+
+
+def test_merge_insert_then_update_stays_an_insert():
+    merged = merge(PendingWrite(INSERT, {"id": "p", "status": "waiting"}), PendingWrite(UPDATE, {"status": "boarded"}))
+    assert merged == PendingWrite(INSERT, {"id": "p", "status": "boarded"})
+
+
+def test_merge_insert_then_delete_cancels_out():
+    assert merge(PendingWrite(INSERT, {"id": "p"}), PendingWrite(DELETE)) is None
+
+
+def test_merge_updates_combine_and_keep_attempts():
+    merged = merge(PendingWrite(UPDATE, {"status": "boarded", "train_id": "t1"}, attempts=1),
+                   PendingWrite(UPDATE, {"status": "arrived"}))
+    assert merged == PendingWrite(UPDATE, {"status": "arrived", "train_id": "t1"}, attempts=1)
+
+
+def test_merge_update_then_delete_is_a_delete():
+    assert merge(PendingWrite(UPDATE, {"status": "boarded"}), PendingWrite(DELETE)).kind == DELETE
+
+
+def test_requeue_merges_a_failed_update_under_a_newer_one():
+    async def scenario():
+        store = WriteBehindStore(MemoryStore(), interval=60)
+        store._pending["p"] = PendingWrite(UPDATE, {"status": "arrived"})
+        store._requeue({"p": PendingWrite(UPDATE, {"status": "boarded", "train_id": "t1"})})
+        return store._pending["p"]
+
+    assert asyncio.run(scenario()) == PendingWrite(UPDATE, {"status": "arrived", "train_id": "t1"}, attempts=1)
+
+
+def test_requeue_keeps_a_failed_delete_apart_from_a_newer_insert():
+    async def scenario():
+        store = WriteBehindStore(MemoryStore(), interval=60)
+        store._pending["p"] = PendingWrite(INSERT, {"id": "p"})
+        store._requeue({"p": PendingWrite(DELETE)})
+        return store
+
+    store = asyncio.run(scenario())
+    assert store._failed_deletes["p"].kind == DELETE
+    assert store._pending["p"].kind == INSERT
+    assert len(store) == 2
+
+
+def test_requeue_drops_a_write_after_max_attempts():
+    async def scenario():
+        store = WriteBehindStore(MemoryStore(), interval=60)
+        store._requeue({"p": PendingWrite(UPDATE, {"status": "boarded"}, attempts=MAX_ATTEMPTS - 1)})
+        return store
+
+    assert len(asyncio.run(scenario())) == 0
+
+
+def test_failed_delete_is_retried_before_a_recreate():
+    async def scenario():
+        inner = FlakyStore()
+        store = WriteBehindStore(inner, interval=60)
+        await inner.insert_passengers([{"id": "p", "origin_station_id": "a"}])
+        inner.failing_deletes = 1
+        await store.delete_passenger("p")
+        await store.flush()
+        assert await store.get_passenger("p") is None  # Still deleted as far as readers can tell
+        assert await inner.get_passenger("p") is not None
+        await store.create_passenger({"id": "p", "origin_station_id": "b"})
+        await store.flush()
+        return await inner.get_passenger("p"), len(store)
+
+    row, queued = asyncio.run(scenario())
+    assert row["origin_station_id"] == "b"
+    assert queued == 0
+
+
+def test_bulk_insert_errors_reach_the_caller():
+    async def scenario():
+        inner = FlakyStore()
+        inner.failing_inserts = True
+        store = WriteBehindStore(inner, interval=60)
+        with pytest.raises(RuntimeError):
+            await store.insert_passengers([{"id": "p", "origin_station_id": "a"}])
+        return len(store)
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_flush_endpoint_writes_out_buffered_writes(api):
+    inner = MemoryStore({"a": "A", "b": "B"})
+    asyncio.run(inner.insert_passengers([{"id": "p", "origin_station_id": "a", "destination_station_id": "b"}]))
+    with api(WriteBehindStore(inner, interval=60)) as client:
+        assert client.put("/passengers/p", json={"current_station_id": "b"}).status_code == 200
+        assert asyncio.run(inner.get_passenger("p"))["current_station_id"] == "a"
+
+        assert client.post("/passengers/writes/flush").status_code == 204
+        assert asyncio.run(inner.get_passenger("p"))["current_station_id"] == "b"
+
+
+def test_flush_endpoint_reports_storage_errors(api):
+    class BrokenStore(MemoryStore):
+        async def flush(self):
+            raise RuntimeError("storage unavailable")
+
+    assert api(BrokenStore()).post("/passengers/writes/flush").status_code == 500